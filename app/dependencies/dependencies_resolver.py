@@ -1,16 +1,27 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import ClassVar
 
-from app.dependencies.timer_repo_client import get_redis_db_client
+from redis.asyncio import Redis
+
+from app.dependencies.timer_repo_client import get_redis_db_client, get_redis_pool_stats
 from app.models.settings import AppSettings
+from app.repositories.shard_coordinator import ShardCoordinator
+from app.repositories.timer_repo import TimerRepository
+from app.services.cached_timer_repository import CachedTimerRepository, TimerCache
+from app.services.in_memory_timer_repository import InMemoryTimerRepository
+from app.services.redis_shard_coordinator import RedisShardCoordinator
 from app.services.redis_timer_repository import RedisTimerRepository
+from app.services.sqlite_timer_repository import SqliteTimerRepository
+from app.services.timer_codec import CODECS
 from app.services.timer_executor import TimerExecutor
 
 
 @dataclass
 class Dependencies:
-    timer_repository: RedisTimerRepository
+    timer_repository: TimerRepository
     timer_executor: TimerExecutor
+    timer_cache: TimerCache | None = None
+    redis_clients: dict[str, Redis] = field(default_factory=dict)
 
 
 class DependenciesResolver:
@@ -18,11 +29,93 @@ class DependenciesResolver:
 
     @classmethod
     async def init_dependencies(cls, settings: AppSettings) -> None:
-        timer_repo = RedisTimerRepository(redis_client=get_redis_db_client(settings))
+        timer_repo: TimerRepository
+        executor_timer_repo: TimerRepository | None = None
+        shard_coordinator: ShardCoordinator | None = None
+        redis_clients: dict[str, Redis] = {}
+        if settings.timer_backend == "memory":
+            timer_repo = InMemoryTimerRepository(
+                executed_ttl_seconds=settings.executed_timer_ttl_seconds,
+                executed_max_count=settings.executed_timer_max_count,
+                dead_letter_ttl_seconds=settings.dead_letter_ttl_seconds,
+                dead_letter_max_count=settings.dead_letter_max_count,
+            )
+        elif settings.timer_backend == "sqlite":
+            timer_repo = SqliteTimerRepository(
+                path=settings.timer_sqlite_path,
+                executed_ttl_seconds=settings.executed_timer_ttl_seconds,
+                executed_max_count=settings.executed_timer_max_count,
+                lease_seconds=settings.timer_delivery_lease_seconds,
+                dead_letter_ttl_seconds=settings.dead_letter_ttl_seconds,
+                dead_letter_max_count=settings.dead_letter_max_count,
+            )
+        else:
+            redis_clients["api"] = get_redis_db_client(settings)
+            timer_repo = await cls._redis_timer_repository(settings, redis_clients["api"])
+            if settings.redis_executor_max_connections is not None:
+                redis_clients["executor"] = get_redis_db_client(settings, settings.redis_executor_max_connections)
+                executor_timer_repo = await cls._redis_timer_repository(settings, redis_clients["executor"])
+            shard_coordinator = RedisShardCoordinator(
+                redis_client=redis_clients.get("executor", redis_clients["api"]),
+                shard_count=settings.timer_shard_count,
+                worker_id=settings.executor_worker_id,
+                lease_ttl_seconds=settings.executor_lease_ttl_seconds,
+            )
+        timer_cache = None
+        # Local backends answer lookups without a network round trip, a cache would only duplicate them.
+        if settings.timer_backend == "redis" and settings.timer_cache_max_entries > 0:
+            timer_cache = TimerCache(
+                max_entries=settings.timer_cache_max_entries,
+                ttl_seconds=settings.timer_cache_ttl_seconds,
+            )
+            timer_repo = CachedTimerRepository(timer_repository=timer_repo, cache=timer_cache)
+            if executor_timer_repo is not None:
+                # Both share the cache, so timers claimed by an executor in this process are still invalidated.
+                executor_timer_repo = CachedTimerRepository(timer_repository=executor_timer_repo, cache=timer_cache)
         cls._dependencies = Dependencies(
             timer_repository=timer_repo,
-            timer_executor=TimerExecutor(timer_repository=timer_repo),
+            timer_cache=timer_cache,
+            redis_clients=redis_clients,
+            timer_executor=TimerExecutor(
+                timer_repository=executor_timer_repo or timer_repo,
+                claim_batch_size=settings.executor_claim_batch_size,
+                max_in_flight=settings.executor_max_in_flight,
+                max_in_flight_per_host=settings.executor_max_in_flight_per_host,
+                max_idle_seconds=settings.executor_max_idle_seconds,
+                shard_coordinator=shard_coordinator,
+                max_retry_in_flight=settings.executor_max_retry_in_flight,
+                retry_max_attempts=settings.executor_retry_max_attempts,
+                retry_base_seconds=settings.executor_retry_base_seconds,
+                retry_max_seconds=settings.executor_retry_max_seconds,
+                breaker_failure_threshold=settings.executor_breaker_failure_threshold,
+                breaker_cooldown_seconds=settings.executor_breaker_cooldown_seconds,
+                http_max_connections=settings.http_max_connections,
+                http_max_connections_per_host=settings.http_max_connections_per_host,
+                http_dns_cache_ttl_seconds=settings.http_dns_cache_ttl_seconds,
+                http_keepalive_seconds=settings.http_keepalive_seconds,
+                catchup_after_seconds=settings.executor_catchup_after_seconds,
+                catchup_max_rate=settings.executor_catchup_max_rate,
+                catchup_drop_after_seconds=settings.executor_catchup_drop_after_seconds,
+                lease_seconds=settings.timer_delivery_lease_seconds,
+                defer_max_seconds=settings.executor_defer_max_seconds,
+            ),
+        )
+
+    @staticmethod
+    async def _redis_timer_repository(settings: AppSettings, redis_client: Redis) -> RedisTimerRepository:
+        timer_repo = RedisTimerRepository(
+            redis_client=redis_client,
+            shard_count=settings.timer_shard_count,
+            codec=CODECS[settings.timer_storage_format],
+            executed_ttl_seconds=settings.executed_timer_ttl_seconds,
+            executed_max_count=settings.executed_timer_max_count,
+            lease_seconds=settings.timer_delivery_lease_seconds,
+            dead_letter_ttl_seconds=settings.dead_letter_ttl_seconds,
+            dead_letter_max_count=settings.dead_letter_max_count,
         )
+        await timer_repo.load_scripts()
+        await timer_repo.check_shard_count()
+        return timer_repo
 
     @classmethod
     def _get_deps(cls) -> Dependencies:
@@ -31,13 +124,23 @@ class DependenciesResolver:
         return cls._dependencies
 
     @classmethod
-    def get_timer_repository(cls) -> RedisTimerRepository:
+    def get_timer_repository(cls) -> TimerRepository:
         return cls._get_deps().timer_repository
 
+    @classmethod
+    def get_timer_cache(cls) -> TimerCache | None:
+        return cls._get_deps().timer_cache
+
     @classmethod
     def get_timer_executor(cls) -> TimerExecutor:
         return cls._get_deps().timer_executor
 
+    @classmethod
+    def get_redis_pool_stats(cls) -> dict[str, dict[str, int]]:
+        return {
+            name: get_redis_pool_stats(redis_client) for name, redis_client in cls._get_deps().redis_clients.items()
+        }
+
     @classmethod
     async def destroy(cls) -> None:
         if cls._dependencies is None:
@@ -45,4 +148,7 @@ class DependenciesResolver:
 
         if cls._dependencies.timer_executor is not None:
             await cls._dependencies.timer_executor.close()
+        await cls._dependencies.timer_repository.close()
+        for redis_client in cls._dependencies.redis_clients.values():
+            await redis_client.aclose()
         cls._dependencies = None
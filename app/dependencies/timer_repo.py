@@ -1,9 +1,9 @@
 from app.dependencies.dependencies_resolver import DependenciesResolver
-from app.services.redis_timer_repository import RedisTimerRepository
+from app.repositories.timer_repo import TimerRepository
 from app.services.timer_executor import TimerExecutor
 
 
-def get_timer_repo_service() -> RedisTimerRepository:
+def get_timer_repo_service() -> TimerRepository:
     return DependenciesResolver.get_timer_repository()
 
 
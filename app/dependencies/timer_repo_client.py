@@ -1,16 +1,41 @@
-from redis.asyncio import Redis
+from typing import Any
+
+from redis.asyncio import BlockingConnectionPool, Redis, SSLConnection
 
 from app.models.settings import AppSettings
 
 DEFAULT_REDIS_TIMEOUT_SECONDS = 5
 
 
-def get_redis_db_client(settings: AppSettings) -> Redis:
-    return Redis(
-        host=settings.timer_db_endpoint,
-        port=settings.timer_db_port,
-        ssl=settings.timer_db_ssl_enabled,
-        ssl_cert_reqs="none",
-        socket_timeout=DEFAULT_REDIS_TIMEOUT_SECONDS,
-        decode_responses=True,
+def get_redis_db_client(settings: AppSettings, max_connections: int | None = None) -> Redis:
+    connection_kwargs: dict[str, Any] = {
+        "host": settings.timer_db_endpoint,
+        "port": settings.timer_db_port,
+        "socket_timeout": DEFAULT_REDIS_TIMEOUT_SECONDS,
+        "health_check_interval": settings.redis_health_check_interval_seconds,
+        "decode_responses": True,
+    }
+    if settings.timer_db_ssl_enabled:
+        connection_kwargs.update(connection_class=SSLConnection, ssl_cert_reqs="none")
+    # A saturated pool makes callers wait for a free connection instead of failing right away.
+    pool = BlockingConnectionPool(
+        max_connections=max_connections or settings.redis_max_connections,
+        timeout=DEFAULT_REDIS_TIMEOUT_SECONDS,
+        **connection_kwargs,
     )
+    return Redis.from_pool(pool)
+
+
+def get_redis_pool_stats(redis_client: Redis) -> dict[str, int]:
+    pool = redis_client.connection_pool
+    # redis-py has no public accessors for the pool's connections.
+    in_use = len(pool._in_use_connections)
+    # Callers waiting for a connection of a saturated blocking pool wait on its condition.
+    condition = getattr(pool, "_condition", None)
+    return {
+        "max_connections": pool.max_connections,
+        "in_use": in_use,
+        "idle": len(pool._available_connections),
+        "free": pool.max_connections - in_use,
+        "waiting": len(condition._waiters) if condition is not None else 0,
+    }
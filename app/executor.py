@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+
+from app.dependencies.dependencies_resolver import DependenciesResolver
+from app.dependencies.log_config import configure_logging, stop_logging
+from app.dependencies.settings import get_app_settings
+from app.models.settings import AppSettings
+from app.services.metrics import CONTENT_TYPE, render_metrics
+
+# Named explicitly since the module usually runs as __main__, outside the app logger.
+logger = logging.getLogger("app.executor")
+
+
+async def healthcheck(_request: web.Request) -> web.Response:
+    if not DependenciesResolver.get_timer_executor().is_running():
+        return web.json_response({"message": "TimerExecutor is not running"}, status=503)
+    return web.json_response({"message": "OK"})
+
+
+async def metrics(_request: web.Request) -> web.Response:
+    content = await render_metrics(DependenciesResolver.get_timer_repository())
+    return web.Response(text=content, headers={"Content-Type": CONTENT_TYPE})
+
+
+def create_app() -> web.Application:
+    # The executor has no API, only what probes and Prometheus need.
+    app = web.Application()
+    app.router.add_get("/healthcheck", healthcheck)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def run(settings: AppSettings) -> None:
+    if settings.timer_backend == "memory":
+        # It would start with an empty store of its own, while the timers stay in the API process.
+        raise RuntimeError("The in-memory backend is fired by the API process, not a separate executor")
+    configure_logging(settings)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    runner = web.AppRunner(create_app(), access_log=None)
+    try:
+        await DependenciesResolver.init_dependencies(settings)
+        await DependenciesResolver.get_timer_executor().start()
+        logger.info("TimerExecutor started")
+        await runner.setup()
+        if settings.executor_port:
+            await web.TCPSite(runner, "0.0.0.0", settings.executor_port).start()
+        await stopping.wait()
+        logger.info("Stopping TimerExecutor")
+    finally:
+        await runner.cleanup()
+        # Lets the callbacks of claimed timers finish before the connections are closed.
+        await DependenciesResolver.destroy()
+        stop_logging()
+
+
+def main() -> None:
+    asyncio.run(run(get_app_settings()))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,19 @@ import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
+from dataclasses import asdict
 from enum import Enum
 
 import fastapi
 from fastapi import Depends, FastAPI, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.dependencies.dependencies_resolver import DependenciesResolver
+from app.dependencies.log_config import configure_logging, stop_logging
 from app.dependencies.settings import get_app_settings
 from app.models.settings import AppSettings
 from app.routes.timer import timer_router
+from app.services.metrics import CONTENT_TYPE, render_metrics
 
 
 class Tag(str, Enum):
@@ -20,18 +23,21 @@ class Tag(str, Enum):
 
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):  # pylint: disable=unused-argument
     app_settings: AppSettings = get_app_settings()
+    configure_logging(app_settings)
     await DependenciesResolver.init_dependencies(app_settings)
-    await DependenciesResolver.get_timer_executor().start()
-    logger.info("TimerExecutor started")
+    # With API_RUN_EXECUTOR=false timers are dispatched by `python -m app.executor` processes instead.
+    if app_settings.api_run_executor:
+        await DependenciesResolver.get_timer_executor().start()
+        logger.info("TimerExecutor started")
     yield
     # Clean up context managers pushed to the exit stack
     await DependenciesResolver.destroy()
+    stop_logging()
 
 
 app = fastapi.FastAPI(
@@ -56,8 +62,37 @@ app = fastapi.FastAPI(
     status_code=status.HTTP_200_OK,
 )
 async def healthcheck():
-    logger.info("Healthcheck OK")
+    logger.debug("Healthcheck OK")
     return {"message": "OK"}
 
 
+@app.get(
+    "/stats",
+    tags=[Tag.HEALTHCHECK.value],
+    include_in_schema=False,
+    status_code=status.HTTP_200_OK,
+)
+async def stats():
+    timer_cache = DependenciesResolver.get_timer_cache()
+    return {
+        "timer_cache": (
+            {**asdict(timer_cache.stats), "hit_rate": timer_cache.stats.hit_rate} if timer_cache is not None else None
+        ),
+        "redis_pools": DependenciesResolver.get_redis_pool_stats(),
+        "http_pool": DependenciesResolver.get_timer_executor().http_pool_stats(),
+    }
+
+
+@app.get(
+    "/metrics",
+    tags=[Tag.HEALTHCHECK.value],
+    include_in_schema=False,
+    status_code=status.HTTP_200_OK,
+    response_class=PlainTextResponse,
+)
+async def metrics():
+    content = await render_metrics(DependenciesResolver.get_timer_repository())
+    return PlainTextResponse(content, media_type=CONTENT_TYPE)
+
+
 app.include_router(timer_router, tags=[Tag.TIMER], prefix="/timer")
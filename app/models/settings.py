@@ -1,12 +1,86 @@
-from pydantic import ConfigDict, Field
+import os
+import socket
+import uuid
+from typing import Literal
+
+from pydantic import ConfigDict, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class AppSettings(BaseSettings):
     stage: str = Field(default="dev", validation_alias="STAGE")
+    log_level: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = Field(default="INFO", validation_alias="LOG_LEVEL")
+    log_format: Literal["json", "text"] = Field(default="json", validation_alias="LOG_FORMAT")
     timer_db_endpoint: str = Field(..., validation_alias="TIMER_DB_ENDPOINT")
     timer_db_port: int = Field(..., validation_alias="TIMER_DB_PORT")
     timer_db_ssl_enabled: bool = Field(default=True, validation_alias="TIMER_DB_SSL_ENABLED")
+    api_run_executor: bool = Field(default=True, validation_alias="API_RUN_EXECUTOR")
+    executor_port: int = Field(default=8001, ge=0, validation_alias="EXECUTOR_PORT")
+    timer_backend: Literal["redis", "memory", "sqlite"] = Field(default="redis", validation_alias="TIMER_BACKEND")
+    timer_sqlite_path: str = Field(default="timers.db", validation_alias="TIMER_SQLITE_PATH")
+    timer_shard_count: int = Field(default=1, gt=0, validation_alias="TIMER_SHARD_COUNT")
+    timer_storage_format: Literal["json", "compact"] = Field(default="json", validation_alias="TIMER_STORAGE_FORMAT")
+    executed_timer_ttl_seconds: float | None = Field(default=None, gt=0, validation_alias="EXECUTED_TIMER_TTL_SECONDS")
+    executed_timer_max_count: int | None = Field(default=None, gt=0, validation_alias="EXECUTED_TIMER_MAX_COUNT")
+    dead_letter_ttl_seconds: float | None = Field(
+        default=7 * 24 * 3600, gt=0, validation_alias="DEAD_LETTER_TTL_SECONDS"
+    )
+    dead_letter_max_count: int | None = Field(default=100_000, gt=0, validation_alias="DEAD_LETTER_MAX_COUNT")
+    # How long a claimed timer may go without its delivery being recorded before another executor delivers it again.
+    timer_delivery_lease_seconds: float = Field(default=30.0, gt=0, validation_alias="TIMER_DELIVERY_LEASE_SECONDS")
+    redis_max_connections: int = Field(default=50, gt=0, validation_alias="REDIS_MAX_CONNECTIONS")
+    # When set, the executor gets a Redis pool of its own so a burst of API requests cannot starve it.
+    redis_executor_max_connections: int | None = Field(
+        default=None, gt=0, validation_alias="REDIS_EXECUTOR_MAX_CONNECTIONS"
+    )
+    redis_health_check_interval_seconds: int = Field(
+        default=30, ge=0, validation_alias="REDIS_HEALTH_CHECK_INTERVAL_SECONDS"
+    )
+    http_max_connections: int = Field(default=100, ge=0, validation_alias="HTTP_MAX_CONNECTIONS")
+    http_max_connections_per_host: int = Field(default=0, ge=0, validation_alias="HTTP_MAX_CONNECTIONS_PER_HOST")
+    http_dns_cache_ttl_seconds: int = Field(default=10, ge=0, validation_alias="HTTP_DNS_CACHE_TTL_SECONDS")
+    http_keepalive_seconds: float = Field(default=15.0, gt=0, validation_alias="HTTP_KEEPALIVE_SECONDS")
+    timer_cache_max_entries: int = Field(default=10_000, ge=0, validation_alias="TIMER_CACHE_MAX_ENTRIES")
+    # Also bounds how long changes made by other processes, e.g. other API replicas or a separate executor,
+    # may go unseen, since the cache is only invalidated by changes made through its own process.
+    timer_cache_ttl_seconds: float = Field(default=5.0, gt=0, validation_alias="TIMER_CACHE_TTL_SECONDS")
+    executor_worker_id: str = Field(
+        default_factory=lambda: f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}",
+        validation_alias="EXECUTOR_WORKER_ID",
+    )
+    executor_lease_ttl_seconds: float = Field(default=10.0, gt=0, validation_alias="EXECUTOR_LEASE_TTL_SECONDS")
+    # The claim scripts unpack the claimed ids into one Redis call, which Lua caps at about 8000 arguments.
+    executor_claim_batch_size: int = Field(default=100, gt=0, le=5000, validation_alias="EXECUTOR_CLAIM_BATCH_SIZE")
+    executor_max_in_flight: int = Field(default=100, gt=0, validation_alias="EXECUTOR_MAX_IN_FLIGHT")
+    executor_max_in_flight_per_host: int = Field(default=10, gt=0, validation_alias="EXECUTOR_MAX_IN_FLIGHT_PER_HOST")
+    executor_max_idle_seconds: float = Field(default=5.0, gt=0, validation_alias="EXECUTOR_MAX_IDLE_SECONDS")
+    executor_max_retry_in_flight: int = Field(default=25, gt=0, validation_alias="EXECUTOR_MAX_RETRY_IN_FLIGHT")
+    executor_retry_max_attempts: int = Field(default=5, gt=0, validation_alias="EXECUTOR_RETRY_MAX_ATTEMPTS")
+    executor_retry_base_seconds: float = Field(default=1.0, gt=0, validation_alias="EXECUTOR_RETRY_BASE_SECONDS")
+    executor_retry_max_seconds: float = Field(default=300.0, gt=0, validation_alias="EXECUTOR_RETRY_MAX_SECONDS")
+    executor_breaker_failure_threshold: int = Field(
+        default=5, gt=0, validation_alias="EXECUTOR_BREAKER_FAILURE_THRESHOLD"
+    )
+    executor_breaker_cooldown_seconds: float = Field(
+        default=30.0, gt=0, validation_alias="EXECUTOR_BREAKER_COOLDOWN_SECONDS"
+    )
+    # Callbacks deferred by an open circuit or a busy host are dead-lettered once their timer is this late.
+    executor_defer_max_seconds: float = Field(default=3600.0, gt=0, validation_alias="EXECUTOR_DEFER_MAX_SECONDS")
+    # Catch-up mode is off unless EXECUTOR_CATCHUP_AFTER_SECONDS is set.
+    executor_catchup_after_seconds: float | None = Field(
+        default=None, gt=0, validation_alias="EXECUTOR_CATCHUP_AFTER_SECONDS"
+    )
+    executor_catchup_max_rate: float | None = Field(default=None, gt=0, validation_alias="EXECUTOR_CATCHUP_MAX_RATE")
+    executor_catchup_drop_after_seconds: float | None = Field(
+        default=None, gt=0, validation_alias="EXECUTOR_CATCHUP_DROP_AFTER_SECONDS"
+    )
+
+    @model_validator(mode="after")
+    def check_memory_backend_runs_executor(self) -> "AppSettings":
+        # In-memory timers only exist inside the API process, so no other process could fire them.
+        if self.timer_backend == "memory" and not self.api_run_executor:
+            raise ValueError("TIMER_BACKEND=memory needs API_RUN_EXECUTOR=true")
+        return self
 
     model_config = SettingsConfigDict(
         extra="allow",
@@ -1,13 +1,36 @@
+import math
 from datetime import datetime
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, model_validator
 
+# Tags are stored next to the URL in compact records, so they are kept to a safe character set.
+TAG_PATTERN = r"^[A-Za-z0-9_.:-]+$"
+CRON_PATTERN = r"^[0-9*,/ -]+$"
 
-class SetTimerRequest(BaseModel):
+
+class TimerDuration(BaseModel):
     hours: int = Field(ge=0)
     minutes: int = Field(ge=0, le=59)
     seconds: int = Field(ge=0, le=59)
+
+
+class SetTimerRequest(TimerDuration):
     url: HttpUrl
+    tag: str | None = Field(default=None, max_length=128, pattern=TAG_PATTERN)
+    # A recurring timer fires every interval_seconds or on the cron schedule until cancelled.
+    interval_seconds: int | None = Field(default=None, gt=0)
+    cron: str | None = Field(default=None, max_length=128, pattern=CRON_PATTERN)
+
+
+class CancelTimersRequest(BaseModel):
+    ids: list[str] | None = None
+    tag: str | None = Field(default=None, max_length=128, pattern=TAG_PATTERN)
+
+    @model_validator(mode="after")
+    def check_selector(self) -> "CancelTimersRequest":
+        if (self.ids is None) == (self.tag is None):
+            raise ValueError("Exactly one of ids or tag must be given")
+        return self
 
 
 class GetTimerResponse(BaseModel):
@@ -19,7 +42,16 @@ class TimerTask(BaseModel):
     timer_id: str
     url: HttpUrl
     expires_at: datetime
+    tag: str | None = None
+    interval_seconds: int | None = None
+    cron: str | None = None
 
     @property
     def id(self):
         return self.timer_id
+
+    @property
+    def occurrence(self) -> str:
+        # A recurring timer can be claimed again while an earlier occurrence is still being
+        # delivered, so the records of claimed timers are keyed by the microsecond it was due.
+        return str(math.floor(self.expires_at.timestamp() * 1_000_000 + 0.5))
@@ -0,0 +1,17 @@
+import abc
+from typing import Callable, Sequence
+
+
+class ShardCoordinator(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    async def start(self, on_change: Callable[[], None] | None = None) -> None:
+        # on_change is called whenever the owned shards change.
+        ...
+
+    @abc.abstractmethod
+    def owned_shards(self) -> Sequence[int]:
+        ...
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        ...
@@ -1,7 +1,13 @@
 import abc
+from datetime import datetime
+from typing import AsyncIterator, Sequence
 
 from app.models.timer import TimerTask
 
+# Claimed timers are leased to the executor for this long. One whose outcome is not
+# recorded in time, e.g. because its executor died, is handed out again.
+DEFAULT_LEASE_SECONDS = 30.0
+
 
 class TimerRepository(metaclass=abc.ABCMeta):
     @abc.abstractmethod
@@ -12,18 +18,87 @@ class TimerRepository(metaclass=abc.ABCMeta):
     async def delete_timer(self, timer_id: str) -> TimerTask | None:
         ...
 
+    @abc.abstractmethod
+    async def delete_timers(self, timer_ids: Sequence[str]) -> list[TimerTask]:
+        ...
+
+    @abc.abstractmethod
+    async def delete_timers_by_tag(self, tag: str) -> list[TimerTask]:
+        ...
+
+    @abc.abstractmethod
+    async def reschedule_timer(self, timer_id: str, expires_at: datetime) -> TimerTask | None:
+        ...
+
     @abc.abstractmethod
     async def create_timer(self, timer: TimerTask) -> None:
         ...
 
     @abc.abstractmethod
-    async def get_scheduled_task_id(self) -> str | None:
+    async def create_timers(self, timers: Sequence[TimerTask]) -> list[Exception | None]:
+        # Returns the error each timer failed with, None for those created. Raises when none were.
+        ...
+
+    @abc.abstractmethod
+    async def claim_due_timers(
+        self,
+        now: datetime,
+        limit: int,
+        shards: Sequence[int] | None = None,
+        after: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[TimerTask]:
+        # Claims timers that expired after `after` (exclusive) and by `until`, which defaults to now.
+        ...
+
+    @abc.abstractmethod
+    async def get_next_expiry(self, shards: Sequence[int] | None = None) -> datetime | None:
+        ...
+
+    @abc.abstractmethod
+    def watch_new_timers(self) -> AsyncIterator[tuple[int, datetime]]:
         ...
 
     @abc.abstractmethod
     async def add_executed_task(self, timer: TimerTask) -> None:
         ...
 
+    @abc.abstractmethod
+    async def add_retry(self, timer: TimerTask, attempts: int, retry_at: datetime) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def claim_due_retries(self, now: datetime, limit: int) -> list[tuple[TimerTask, int]]:
+        ...
+
+    @abc.abstractmethod
+    async def extend_leases(self, timers: Sequence[TimerTask], now: datetime) -> None:
+        # Renews the leases of claimed occurrences whose outcome is still to be recorded.
+        ...
+
+    @abc.abstractmethod
+    async def requeue_expired_leases(self, now: datetime, limit: int) -> int:
+        ...
+
+    @abc.abstractmethod
+    async def add_dead_letter(self, timer: TimerTask, attempts: int) -> None:
+        ...
+
     @abc.abstractmethod
     async def get_executed_task(self, timer_id: str) -> TimerTask | None:
         ...
+
+    @abc.abstractmethod
+    async def lookup_timer(self, timer_id: str) -> TimerTask | None:
+        ...
+
+    @abc.abstractmethod
+    async def lookup_timers(self, timer_ids: Sequence[str]) -> dict[str, TimerTask]:
+        ...
+
+    @abc.abstractmethod
+    async def get_timer_counts(self, now: datetime) -> dict[str, int]:
+        ...
+
+    async def close(self) -> None:
+        return None
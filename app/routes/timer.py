@@ -1,91 +1,343 @@
-import logging
-import sys
 import uuid
-from datetime import datetime, timezone
-from typing import Any
+from datetime import datetime, timedelta, timezone
+from typing import Any, Sequence
 
-from fastapi import APIRouter, Depends, Response
-from pydantic import BaseModel
+from fastapi import APIRouter, Body, Depends, Query
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
 
 from app.dependencies.timer_repo import (
     get_timer_executor_service,
     get_timer_repo_service,
 )
 from app.models.api import ApiResponse, ErrorCode, ErrorResponse
-from app.models.timer import GetTimerResponse, SetTimerRequest, TimerTask
+from app.models.timer import (
+    CancelTimersRequest,
+    GetTimerResponse,
+    SetTimerRequest,
+    TimerDuration,
+    TimerTask,
+)
 from app.repositories.timer_repo import TimerRepository
+from app.services.recurrence import parse_cron
 from app.services.timer_executor import TimerExecutor
 
-timer_router = APIRouter()
+MAX_TIMER_BATCH_SIZE = 10_000
+MAX_TIMER_LOOKUP_SIZE = 1_000
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-stream_handler = logging.StreamHandler(sys.stdout)
-log_formatter = logging.Formatter(
-    "%(asctime)s [%(processName)s: %(process)d] [%(threadName)s: %(thread)d] [%(levelname)s] %(name)s: %(message)s"
-)
-stream_handler.setFormatter(log_formatter)
-logger.addHandler(stream_handler)
+timer_router = APIRouter()
 
 
 @timer_router.post("", response_model=ApiResponse[dict, dict])
 async def set_timer(
     request: SetTimerRequest,
-    response: Response,
     timer_repo: TimerRepository = Depends(get_timer_repo_service),
     timer_executor: TimerExecutor = Depends(get_timer_executor_service),
-) -> ApiResponse[dict, dict]:
+) -> JSONResponse:
     timer_id = str(uuid.uuid4())
-    total_seconds = request.hours * 3600 + request.minutes * 60 + request.seconds
-    if total_seconds <= 0:
-        response.status_code = 400
-        return ApiResponse(
+    now = datetime.now(timezone.utc)
+    try:
+        expires_at = get_first_expiry(request, now)
+    except ValueError as e:
+        return api_response(
             errors=[
                 ErrorResponse(
                     code=ErrorCode.INVALID_REQUEST,
-                    message="Timer duration must be greater than 0",
-                ).model_dump()
+                    message=str(e),
+                )
             ],
+            status_code=400,
         )
 
-    expires_at = datetime.now(timezone.utc).timestamp() + total_seconds
-
-    timer = TimerTask(timer_id=timer_id, url=request.url, expires_at=datetime.fromtimestamp(expires_at, timezone.utc))
+    timer = TimerTask(
+        timer_id=timer_id,
+        url=request.url,
+        expires_at=expires_at,
+        tag=request.tag,
+        interval_seconds=request.interval_seconds,
+        cron=request.cron,
+    )
     await timer_repo.create_timer(timer)
 
-    response.status_code = 201
-    return ApiResponse(
-        data=[{"id": timer_id, "time_left": total_seconds}],
+    return api_response(
+        data=[{"id": timer_id, "time_left": get_time_left(timer, now)}],
+        status_code=201,
+    )
+
+
+@timer_router.post("/batch", response_model=ApiResponse[dict, dict])
+async def set_timers(
+    timer_requests: list[Any] = Body(...),
+    timer_repo: TimerRepository = Depends(get_timer_repo_service),
+) -> JSONResponse:
+    if not timer_requests:
+        return api_response(
+            errors=[
+                ErrorResponse(
+                    code=ErrorCode.INVALID_REQUEST,
+                    message="A batch must contain at least one timer",
+                )
+            ],
+            status_code=400,
+        )
+    if len(timer_requests) > MAX_TIMER_BATCH_SIZE:
+        return api_response(
+            errors=[
+                ErrorResponse(
+                    code=ErrorCode.INVALID_REQUEST,
+                    message=f"A batch can contain at most {MAX_TIMER_BATCH_SIZE} timers",
+                )
+            ],
+            status_code=400,
+        )
+
+    now = datetime.now(timezone.utc)
+    timers: list[TimerTask] = []
+    indexes: list[int] = []
+    errors: list[ErrorResponse] = []
+    for index, item in enumerate(timer_requests):
+        try:
+            request = SetTimerRequest.model_validate(item)
+        except ValidationError as e:
+            errors.append(
+                ErrorResponse(
+                    code=ErrorCode.INVALID_REQUEST,
+                    message="Invalid timer request",
+                    detail={"index": index, "errors": e.errors(include_url=False, include_context=False)},
+                )
+            )
+            continue
+        try:
+            expires_at = get_first_expiry(request, now)
+        except ValueError as e:
+            errors.append(
+                ErrorResponse(
+                    code=ErrorCode.INVALID_REQUEST,
+                    message=str(e),
+                    detail={"index": index},
+                )
+            )
+            continue
+        timer = TimerTask(
+            timer_id=str(uuid.uuid4()),
+            url=request.url,
+            expires_at=expires_at,
+            tag=request.tag,
+            interval_seconds=request.interval_seconds,
+            cron=request.cron,
+        )
+        timers.append(timer)
+        indexes.append(index)
+
+    if not timers:
+        return api_response(errors=errors, status_code=400)
+
+    # Writes can fail for some timers only, so each is reported with the outcome of its own write.
+    data: list[dict] = []
+    for index, timer, error in zip(indexes, timers, await timer_repo.create_timers(timers)):
+        if error is None:
+            data.append({"index": index, "id": timer.timer_id, "time_left": get_time_left(timer, now)})
+        else:
+            errors.append(
+                ErrorResponse(code=ErrorCode.UNKNOWN, message="Failed to create timer", detail={"index": index})
+            )
+    errors.sort(key=lambda error: error.detail["index"])
+    return api_response(data=data, errors=errors, status_code=201 if data else 500)
+
+
+@timer_router.post("/cancel", response_model=ApiResponse[GetTimerResponse, Any])
+async def cancel_timers(
+    request: CancelTimersRequest,
+    timer_repo: TimerRepository = Depends(get_timer_repo_service),
+) -> JSONResponse:
+    if request.tag is not None:
+        timers = await timer_repo.delete_timers_by_tag(request.tag)
+        return api_response(data=get_timer_responses(timers))
+
+    timer_ids = list(dict.fromkeys(request.ids or []))
+    if len(timer_ids) > MAX_TIMER_BATCH_SIZE:
+        return api_response(
+            errors=[
+                ErrorResponse(
+                    code=ErrorCode.INVALID_REQUEST,
+                    message=f"At most {MAX_TIMER_BATCH_SIZE} timers can be cancelled at once",
+                )
+            ],
+            status_code=400,
+        )
+
+    timers = await timer_repo.delete_timers(timer_ids)
+    cancelled = {timer.timer_id for timer in timers}
+    return api_response(
+        data=get_timer_responses(timers),
+        errors=[
+            ErrorResponse(
+                code=ErrorCode.NOT_FOUND,
+                message=f"Pending timer with id {timer_id} not found",
+                detail={"id": timer_id},
+            )
+            for timer_id in timer_ids
+            if timer_id not in cancelled
+        ],
+    )
+
+
+@timer_router.get("", response_model=ApiResponse[GetTimerResponse, Any])
+async def get_timers(
+    ids: list[str] = Query(...),
+    timer_repo: TimerRepository = Depends(get_timer_repo_service),
+) -> JSONResponse:
+    # Accept both ?ids=a&ids=b and ?ids=a,b, keeping the first occurrence of each id.
+    timer_ids = list(dict.fromkeys(timer_id for value in ids for timer_id in value.split(",") if timer_id))
+    if len(timer_ids) > MAX_TIMER_LOOKUP_SIZE:
+        return api_response(
+            errors=[
+                ErrorResponse(
+                    code=ErrorCode.INVALID_REQUEST,
+                    message=f"At most {MAX_TIMER_LOOKUP_SIZE} timers can be looked up at once",
+                )
+            ],
+            status_code=400,
+        )
+
+    timers = await timer_repo.lookup_timers(timer_ids)
+    now = datetime.now(timezone.utc)
+    return api_response(
+        data=[
+            {"id": timer_id, "time_left": get_time_left(timers[timer_id], now)}
+            for timer_id in timer_ids
+            if timer_id in timers
+        ],
+        errors=[
+            ErrorResponse(
+                code=ErrorCode.NOT_FOUND,
+                message=f"Timer with id {timer_id} not found",
+                detail={"id": timer_id},
+            )
+            for timer_id in timer_ids
+            if timer_id not in timers
+        ],
     )
 
 
 @timer_router.get("/{timer_id}", response_model=ApiResponse[GetTimerResponse, Any])
 async def get_timer(
     timer_id: str,
-    response: Response,
     timer_repo: TimerRepository = Depends(get_timer_repo_service),
-) -> ApiResponse[Any, Any]:
-    timer = await timer_repo.get_timer(timer_id)
-    timer_excuted = await timer_repo.get_executed_task(timer_id)
-    if not timer and not timer_excuted:
-        response.status_code = 404
-        return ApiResponse(
+) -> JSONResponse:
+    timer = await timer_repo.lookup_timer(timer_id)
+    if not timer:
+        return api_response(
             errors=[
                 ErrorResponse(
                     code=ErrorCode.NOT_FOUND,
                     message=f"Timer with id {timer_id} not found",
                 )
-            ]
+            ],
+            status_code=404,
         )
 
-    timer = timer if timer else timer_excuted
-
-    seconds_remaining = (
-        (timer.expires_at - datetime.now(timezone.utc)).total_seconds()  # type: ignore
-        if timer.expires_at > datetime.now(timezone.utc)  # type: ignore
-        else 0
+    return api_response(
+        data=[{"id": timer_id, "time_left": get_time_left(timer, datetime.now(timezone.utc))}],
     )
 
-    return ApiResponse(
-        data=[GetTimerResponse(id=timer_id, time_left=int(seconds_remaining))],
+
+@timer_router.delete("/{timer_id}", response_model=ApiResponse[GetTimerResponse, Any])
+async def cancel_timer(
+    timer_id: str,
+    timer_repo: TimerRepository = Depends(get_timer_repo_service),
+) -> JSONResponse:
+    timer = await timer_repo.delete_timer(timer_id)
+    if not timer:
+        return api_response(
+            errors=[
+                ErrorResponse(
+                    code=ErrorCode.NOT_FOUND,
+                    message=f"Pending timer with id {timer_id} not found",
+                )
+            ],
+            status_code=404,
+        )
+
+    return api_response(data=get_timer_responses([timer]))
+
+
+@timer_router.patch("/{timer_id}", response_model=ApiResponse[GetTimerResponse, Any])
+async def reschedule_timer(
+    timer_id: str,
+    request: TimerDuration,
+    timer_repo: TimerRepository = Depends(get_timer_repo_service),
+) -> JSONResponse:
+    total_seconds = get_total_seconds(request)
+    if total_seconds <= 0:
+        return api_response(
+            errors=[
+                ErrorResponse(
+                    code=ErrorCode.INVALID_REQUEST,
+                    message="Timer duration must be greater than 0",
+                )
+            ],
+            status_code=400,
+        )
+
+    expires_at = datetime.fromtimestamp(datetime.now(timezone.utc).timestamp() + total_seconds, timezone.utc)
+    timer = await timer_repo.reschedule_timer(timer_id, expires_at)
+    if not timer:
+        return api_response(
+            errors=[
+                ErrorResponse(
+                    code=ErrorCode.NOT_FOUND,
+                    message=f"Pending timer with id {timer_id} not found",
+                )
+            ],
+            status_code=404,
+        )
+
+    return api_response(data=[{"id": timer_id, "time_left": total_seconds}])
+
+
+def api_response(
+    data: Sequence[dict] = (), errors: Sequence[ErrorResponse] = (), status_code: int = 200
+) -> JSONResponse:
+    # Handlers only put plain values they produced themselves into responses, so the body is
+    # written directly instead of being validated again against the route's response_model,
+    # which is kept for the OpenAPI schema.
+    return JSONResponse(
+        {"errors": [error.model_dump(mode="json") for error in errors], "data": list(data)},
+        status_code=status_code,
     )
+
+
+def get_timer_responses(timers: list[TimerTask]) -> list[dict]:
+    now = datetime.now(timezone.utc)
+    return [{"id": timer.timer_id, "time_left": get_time_left(timer, now)} for timer in timers]
+
+
+def get_time_left(timer: TimerTask, now: datetime) -> int:
+    if timer.expires_at <= now:
+        return 0
+    return int((timer.expires_at - now).total_seconds())
+
+
+def get_total_seconds(request: TimerDuration) -> int:
+    return request.hours * 3600 + request.minutes * 60 + request.seconds
+
+
+def get_first_expiry(request: SetTimerRequest, now: datetime) -> datetime:
+    # A recurring timer without a duration first fires at its first occurrence.
+    if request.interval_seconds is not None and request.cron is not None:
+        raise ValueError("Only one of interval_seconds and cron can be given")
+    first_occurrence = None
+    if request.cron is not None:
+        try:
+            first_occurrence = parse_cron(request.cron).next_after(now)
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression: {e}") from e
+    elif request.interval_seconds is not None:
+        first_occurrence = now + timedelta(seconds=request.interval_seconds)
+    total_seconds = get_total_seconds(request)
+    if total_seconds > 0:
+        return now + timedelta(seconds=total_seconds)
+    if first_occurrence is None:
+        raise ValueError("Timer duration must be greater than 0")
+    return first_occurrence
@@ -0,0 +1,168 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Sequence
+
+from app.models.timer import TimerTask
+from app.repositories.timer_repo import TimerRepository
+
+DEFAULT_CACHE_MAX_ENTRIES = 10_000
+DEFAULT_CACHE_TTL_SECONDS = 5.0
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class TimerCache:
+    def __init__(
+        self, max_entries: int = DEFAULT_CACHE_MAX_ENTRIES, ttl_seconds: float = DEFAULT_CACHE_TTL_SECONDS
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[str, tuple[float, TimerTask]] = OrderedDict()
+        self.stats = CacheStats()
+
+    def get(self, timer_id: str) -> TimerTask | None:
+        entry = self.entries.get(timer_id)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        valid_until, timer = entry
+        if time.monotonic() >= valid_until:
+            self.invalidate(timer_id)
+            self.stats.misses += 1
+            return None
+        self.entries.move_to_end(timer_id)
+        self.stats.hits += 1
+        return timer
+
+    def put(self, timer: TimerTask) -> None:
+        # A pending timer changes state once it fires, so never keep it past its expiry.
+        ttl = self.ttl_seconds
+        seconds_to_expiry = (timer.expires_at - datetime.now(timezone.utc)).total_seconds()
+        if seconds_to_expiry > 0:
+            ttl = min(ttl, seconds_to_expiry)
+        self.entries[timer.timer_id] = (time.monotonic() + ttl, timer)
+        self.entries.move_to_end(timer.timer_id)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+        self.stats.size = len(self.entries)
+
+    def invalidate(self, timer_id: str) -> None:
+        if self.entries.pop(timer_id, None) is not None:
+            self.stats.size = len(self.entries)
+
+
+class CachedTimerRepository(TimerRepository):
+    def __init__(self, timer_repository: TimerRepository, cache: TimerCache) -> None:
+        self.timer_repository = timer_repository
+        self.cache = cache
+
+    async def get_timer(self, timer_id: str) -> TimerTask | None:
+        return await self.timer_repository.get_timer(timer_id)
+
+    async def delete_timer(self, timer_id: str) -> TimerTask | None:
+        self.cache.invalidate(timer_id)
+        return await self.timer_repository.delete_timer(timer_id)
+
+    async def delete_timers(self, timer_ids: Sequence[str]) -> list[TimerTask]:
+        for timer_id in timer_ids:
+            self.cache.invalidate(timer_id)
+        return await self.timer_repository.delete_timers(timer_ids)
+
+    async def delete_timers_by_tag(self, tag: str) -> list[TimerTask]:
+        timers = await self.timer_repository.delete_timers_by_tag(tag)
+        for timer in timers:
+            self.cache.invalidate(timer.timer_id)
+        return timers
+
+    async def reschedule_timer(self, timer_id: str, expires_at: datetime) -> TimerTask | None:
+        self.cache.invalidate(timer_id)
+        return await self.timer_repository.reschedule_timer(timer_id, expires_at)
+
+    async def create_timer(self, timer: TimerTask) -> None:
+        self.cache.invalidate(timer.timer_id)
+        await self.timer_repository.create_timer(timer)
+
+    async def create_timers(self, timers: Sequence[TimerTask]) -> list[Exception | None]:
+        for timer in timers:
+            self.cache.invalidate(timer.timer_id)
+        return await self.timer_repository.create_timers(timers)
+
+    async def claim_due_timers(
+        self,
+        now: datetime,
+        limit: int,
+        shards: Sequence[int] | None = None,
+        after: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[TimerTask]:
+        timers = await self.timer_repository.claim_due_timers(now, limit, shards, after, until)
+        for timer in timers:
+            self.cache.invalidate(timer.timer_id)
+        return timers
+
+    async def get_next_expiry(self, shards: Sequence[int] | None = None) -> datetime | None:
+        return await self.timer_repository.get_next_expiry(shards)
+
+    def watch_new_timers(self) -> AsyncIterator[tuple[int, datetime]]:
+        return self.timer_repository.watch_new_timers()
+
+    async def close(self) -> None:
+        await self.timer_repository.close()
+
+    async def add_executed_task(self, timer: TimerTask) -> None:
+        self.cache.invalidate(timer.timer_id)
+        await self.timer_repository.add_executed_task(timer)
+
+    async def add_retry(self, timer: TimerTask, attempts: int, retry_at: datetime) -> None:
+        await self.timer_repository.add_retry(timer, attempts, retry_at)
+
+    async def claim_due_retries(self, now: datetime, limit: int) -> list[tuple[TimerTask, int]]:
+        return await self.timer_repository.claim_due_retries(now, limit)
+
+    async def extend_leases(self, timers: Sequence[TimerTask], now: datetime) -> None:
+        await self.timer_repository.extend_leases(timers, now)
+
+    async def requeue_expired_leases(self, now: datetime, limit: int) -> int:
+        return await self.timer_repository.requeue_expired_leases(now, limit)
+
+    async def add_dead_letter(self, timer: TimerTask, attempts: int) -> None:
+        await self.timer_repository.add_dead_letter(timer, attempts)
+
+    async def get_timer_counts(self, now: datetime) -> dict[str, int]:
+        return await self.timer_repository.get_timer_counts(now)
+
+    async def get_executed_task(self, timer_id: str) -> TimerTask | None:
+        return await self.timer_repository.get_executed_task(timer_id)
+
+    async def lookup_timer(self, timer_id: str) -> TimerTask | None:
+        return (await self.lookup_timers([timer_id])).get(timer_id)
+
+    async def lookup_timers(self, timer_ids: Sequence[str]) -> dict[str, TimerTask]:
+        timers: dict[str, TimerTask] = {}
+        missing = []
+        for timer_id in timer_ids:
+            timer = self.cache.get(timer_id)
+            if timer is None:
+                missing.append(timer_id)
+            else:
+                timers[timer_id] = timer
+        if missing:
+            found = await self.timer_repository.lookup_timers(missing)
+            for timer in found.values():
+                self.cache.put(timer)
+            timers.update(found)
+        return timers
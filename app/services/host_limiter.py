@@ -0,0 +1,105 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_COOLDOWN_SECONDS = 30.0
+# While the half-open probe is in flight, other callbacks to the host are held back for a short while only.
+PROBE_DEFER_SECONDS = 1.0
+DECREASE_FACTOR = 0.5
+
+
+class BreakerState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class HostLimiter:
+    # Concurrency limit and circuit breaker for the callbacks to a single host. The limit
+    # follows AIMD: it grows by one per limit's worth of successful callbacks and is
+    # halved on every failed one. After failure_threshold failures in a row the breaker
+    # opens and callbacks are turned away until the cooldown has passed, when a single
+    # probe decides whether the host is back.
+    def __init__(
+        self,
+        max_limit: int,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS,
+    ) -> None:
+        self.max_limit = max_limit
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.limit = float(max_limit)
+        self.in_use = 0
+        self.users = 0
+        self.condition = asyncio.Condition()
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.failed_at = 0.0
+        self.probing = False
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_use < int(self.limit))
+            self.in_use += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.in_use -= 1
+                self.condition.notify(max(int(self.limit) - self.in_use, 0))
+
+    def admit(self) -> float | None:
+        # Returns None when a callback may be sent now, otherwise how many seconds to defer it by.
+        if self.state == BreakerState.CLOSED:
+            return None
+        now = time.monotonic()
+        if self.state == BreakerState.OPEN:
+            if now < self.open_until:
+                return self.open_until - now
+            self.state = BreakerState.HALF_OPEN
+        if self.probing:
+            return PROBE_DEFER_SECONDS
+        self.probing = True
+        return None
+
+    def record(self, failed: bool) -> None:
+        if self.state == BreakerState.HALF_OPEN:
+            self.probing = False
+            if failed:
+                self._open()
+            else:
+                self.state = BreakerState.CLOSED
+                self.failures = 0
+            return
+        if self.state == BreakerState.OPEN:
+            # Callbacks sent before the breaker opened carry no new information.
+            return
+        if failed:
+            self.failures += 1
+            self.failed_at = time.monotonic()
+            self.limit = max(self.limit * DECREASE_FACTOR, 1.0)
+            if self.failures >= self.failure_threshold:
+                self._open()
+        else:
+            self.failures = 0
+            self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+
+    def is_idle(self) -> bool:
+        # Nothing is waiting on the host and nothing recent is known about it, so it can be forgotten.
+        if self.users or self.state == BreakerState.HALF_OPEN:
+            return False
+        if self.state == BreakerState.OPEN:
+            return time.monotonic() >= self.open_until + self.cooldown_seconds
+        if self.failures == 0 and self.limit == self.max_limit:
+            return True
+        return time.monotonic() - self.failed_at >= self.cooldown_seconds
+
+    def _open(self) -> None:
+        self.state = BreakerState.OPEN
+        self.open_until = time.monotonic() + self.cooldown_seconds
@@ -0,0 +1,242 @@
+import asyncio
+import math
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import AsyncIterator, Sequence
+
+from app.models.timer import TimerTask
+from app.repositories.timer_repo import TimerRepository
+from app.services.recurrence import next_timer
+from app.services.timing_wheel import HierarchicalTimingWheel
+
+# The process holds every timer, so there is a single shard for the executor to own.
+SHARD = 0
+
+
+class InMemoryTimerRepository(TimerRepository):
+    def __init__(
+        self,
+        executed_ttl_seconds: float | None = None,
+        executed_max_count: int | None = None,
+        dead_letter_ttl_seconds: float | None = None,
+        dead_letter_max_count: int | None = None,
+    ) -> None:
+        self.executed_ttl_seconds = executed_ttl_seconds
+        self.executed_max_count = executed_max_count
+        self.dead_letter_ttl_seconds = dead_letter_ttl_seconds
+        self.dead_letter_max_count = dead_letter_max_count
+        self.timers: dict[str, TimerTask] = {}
+        self.tags: dict[str, set[str]] = {}
+        self.executed: OrderedDict[str, tuple[float, TimerTask]] = OrderedDict()
+        self.wheel = HierarchicalTimingWheel(start=datetime.now(timezone.utc).timestamp())
+        # Retries and claimed timers are kept per occurrence, since a recurring timer can be claimed
+        # again before the outcome of its previous occurrence is recorded.
+        self.retries: dict[str, dict[str, tuple[TimerTask, int]]] = {}
+        self.retry_wheel = HierarchicalTimingWheel(start=datetime.now(timezone.utc).timestamp())
+        self.dead_letters: OrderedDict[str, tuple[float, TimerTask, int]] = OrderedDict()
+        # Claimed timers until the outcome of their callback is recorded, only kept for lookups.
+        self.inflight: dict[str, dict[str, TimerTask]] = {}
+        self.watchers: set[asyncio.Queue[tuple[int, datetime]]] = set()
+
+    async def get_timer(self, timer_id: str) -> TimerTask | None:
+        return self.timers.get(timer_id)
+
+    async def delete_timer(self, timer_id: str) -> TimerTask | None:
+        self.wheel.remove(timer_id)
+        return self._pop_timer(timer_id)
+
+    async def delete_timers(self, timer_ids: Sequence[str]) -> list[TimerTask]:
+        timers = [await self.delete_timer(timer_id) for timer_id in timer_ids]
+        return [timer for timer in timers if timer is not None]
+
+    async def delete_timers_by_tag(self, tag: str) -> list[TimerTask]:
+        return await self.delete_timers(list(self.tags.get(tag, ())))
+
+    async def reschedule_timer(self, timer_id: str, expires_at: datetime) -> TimerTask | None:
+        timer = self.timers.get(timer_id)
+        if timer is None:
+            return None
+        timer = timer.model_copy(update={"expires_at": expires_at})
+        self.timers[timer_id] = timer
+        self.wheel.add(timer_id, expires_at.timestamp())
+        self._notify(expires_at)
+        return timer
+
+    def _pop_timer(self, timer_id: str) -> TimerTask | None:
+        timer = self.timers.pop(timer_id, None)
+        if timer is not None and timer.tag is not None:
+            tagged = self.tags[timer.tag]
+            tagged.discard(timer_id)
+            if not tagged:
+                del self.tags[timer.tag]
+        return timer
+
+    async def create_timer(self, timer: TimerTask) -> None:
+        self._add_timer(timer)
+        self._notify(timer.expires_at)
+
+    async def create_timers(self, timers: Sequence[TimerTask]) -> list[Exception | None]:
+        if not timers:
+            return []
+        for timer in timers:
+            self._add_timer(timer)
+        self._notify(min(timer.expires_at for timer in timers))
+        return [None] * len(timers)
+
+    def _add_timer(self, timer: TimerTask) -> None:
+        self._pop_timer(timer.timer_id)
+        self.timers[timer.timer_id] = timer
+        if timer.tag is not None:
+            self.tags.setdefault(timer.tag, set()).add(timer.timer_id)
+        self.wheel.add(timer.timer_id, timer.expires_at.timestamp())
+
+    def _notify(self, expires_at: datetime) -> None:
+        for queue in self.watchers:
+            queue.put_nowait((SHARD, expires_at))
+
+    async def claim_due_timers(
+        self,
+        now: datetime,
+        limit: int,
+        shards: Sequence[int] | None = None,
+        after: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[TimerTask]:
+        if shards is not None and SHARD not in shards:
+            return []
+        due = self.wheel.pop_due(
+            now.timestamp(),
+            limit,
+            after.timestamp() if after is not None else -math.inf,
+            (until or now).timestamp(),
+        )
+        claimed = [self._pop_timer(timer_id) for timer_id in due]
+        timers = [timer for timer in claimed if timer is not None]
+        for timer in timers:
+            self.inflight.setdefault(timer.timer_id, {})[timer.occurrence] = timer
+            # Recurring timers are re-armed with their next occurrence in the same step.
+            following = next_timer(timer, now)
+            if following is not None:
+                self._add_timer(following)
+        return timers
+
+    async def get_next_expiry(self, shards: Sequence[int] | None = None) -> datetime | None:
+        if shards is not None and SHARD not in shards:
+            return None
+        deadline = self.wheel.next_deadline()
+        if deadline is None:
+            return None
+        return datetime.fromtimestamp(deadline, timezone.utc)
+
+    async def watch_new_timers(self) -> AsyncIterator[tuple[int, datetime]]:
+        queue: asyncio.Queue[tuple[int, datetime]] = asyncio.Queue()
+        self.watchers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.watchers.discard(queue)
+
+    async def add_executed_task(self, timer: TimerTask) -> None:
+        now = datetime.now(timezone.utc).timestamp()
+        self.executed.pop(timer.timer_id, None)
+        self.executed[timer.timer_id] = (now, timer)
+        _pop_occurrence(self.inflight, timer)
+        self._prune_executed(now)
+
+    def _prune_executed(self, now: float) -> None:
+        _prune(self.executed, self.executed_ttl_seconds, self.executed_max_count, now)
+
+    def _prune_dead_letters(self, now: float) -> None:
+        _prune(self.dead_letters, self.dead_letter_ttl_seconds, self.dead_letter_max_count, now)
+
+    async def add_retry(self, timer: TimerTask, attempts: int, retry_at: datetime) -> None:
+        self.retries.setdefault(timer.timer_id, {})[timer.occurrence] = (timer, attempts)
+        self.retry_wheel.add(f"{timer.timer_id}:{timer.occurrence}", retry_at.timestamp())
+        _pop_occurrence(self.inflight, timer)
+
+    async def claim_due_retries(self, now: datetime, limit: int) -> list[tuple[TimerTask, int]]:
+        retries = []
+        for key in self.retry_wheel.pop_due(now.timestamp(), limit):
+            timer_id, occurrence = key.rsplit(":", 1)
+            timer, attempts = self.retries[timer_id].pop(occurrence)
+            if not self.retries[timer_id]:
+                del self.retries[timer_id]
+            self.inflight.setdefault(timer_id, {})[occurrence] = timer
+            retries.append((timer, attempts))
+        return retries
+
+    async def extend_leases(self, timers: Sequence[TimerTask], now: datetime) -> None:
+        return None
+
+    async def requeue_expired_leases(self, now: datetime, limit: int) -> int:
+        # Claimed timers live and die with the process, there are no leases to outlive it.
+        return 0
+
+    async def add_dead_letter(self, timer: TimerTask, attempts: int) -> None:
+        now = datetime.now(timezone.utc).timestamp()
+        self.dead_letters.pop(timer.timer_id, None)
+        self.dead_letters[timer.timer_id] = (now, timer, attempts)
+        _pop_occurrence(self.inflight, timer)
+        self._prune_dead_letters(now)
+
+    async def get_timer_counts(self, now: datetime) -> dict[str, int]:
+        self._prune_executed(now.timestamp())
+        self._prune_dead_letters(now.timestamp())
+        return {
+            "pending": len(self.timers),
+            "due": sum(1 for timer in self.timers.values() if timer.expires_at <= now),
+            "retrying": sum(len(occurrences) for occurrences in self.retries.values()),
+            "dead_letter": len(self.dead_letters),
+            "executed": len(self.executed),
+        }
+
+    async def get_executed_task(self, timer_id: str) -> TimerTask | None:
+        record = self.executed.get(timer_id)
+        if record is None:
+            return None
+        executed_at, timer = record
+        if self.executed_ttl_seconds is not None:
+            if executed_at + self.executed_ttl_seconds <= datetime.now(timezone.utc).timestamp():
+                return None
+        return timer
+
+    async def lookup_timer(self, timer_id: str) -> TimerTask | None:
+        # Timers being delivered, retried or given up on have fired as well.
+        timer = self.timers.get(timer_id) or next(iter(self.inflight.get(timer_id, {}).values()), None)
+        if timer is None and timer_id in self.retries:
+            timer, _ = next(iter(self.retries[timer_id].values()))
+        if timer is None and timer_id in self.dead_letters:
+            self._prune_dead_letters(datetime.now(timezone.utc).timestamp())
+            if timer_id in self.dead_letters:
+                _, timer, _ = self.dead_letters[timer_id]
+        return timer or await self.get_executed_task(timer_id)
+
+    async def lookup_timers(self, timer_ids: Sequence[str]) -> dict[str, TimerTask]:
+        timers = {}
+        for timer_id in timer_ids:
+            timer = await self.lookup_timer(timer_id)
+            if timer is not None:
+                timers[timer_id] = timer
+        return timers
+
+
+def _prune(records: OrderedDict, ttl_seconds: float | None, max_count: int | None, now: float) -> None:
+    # Records are kept in the order they were added, so the expired and excess ones are at the front.
+    if ttl_seconds is not None:
+        while records:
+            added_at = next(iter(records.values()))[0]
+            if added_at + ttl_seconds > now:
+                break
+            records.popitem(last=False)
+    if max_count is not None:
+        while len(records) > max_count:
+            records.popitem(last=False)
+
+
+def _pop_occurrence(records: dict[str, dict[str, TimerTask]], timer: TimerTask) -> None:
+    occurrences = records.get(timer.timer_id)
+    if occurrences is not None:
+        occurrences.pop(timer.occurrence, None)
+        if not occurrences:
+            del records[timer.timer_id]
@@ -0,0 +1,198 @@
+import bisect
+import functools
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Coroutine, ParamSpec, Sequence, TypeVar
+
+from app.repositories.timer_repo import TimerRepository
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+# Minimal Prometheus text exposition, enough for counters, gauges and histograms
+# without pulling in prometheus_client.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENESS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+BATCH_SIZE_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def _label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, label_names)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._label_values(labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self._label_values(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: the count of observations in each bucket (not cumulative), then the sum.
+        self.values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        entry = self.values.get(key)
+        if entry is None:
+            entry = self.values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def _samples(self) -> list[str]:
+        samples = []
+        label_names = (*self.label_names, "le")
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                labels = _format_labels(label_names, (*key, _format_value(bound)))
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+            samples.append(f"{self.name}_count{labels} {cumulative}")
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        counter = Counter(name, help_text, label_names)
+        self.register(counter)
+        return counter
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        gauge = Gauge(name, help_text, label_names)
+        self.register(gauge)
+        return gauge
+
+    def histogram(
+        self, name: str, help_text: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        histogram = Histogram(name, help_text, label_names, buckets)
+        self.register(histogram)
+        return histogram
+
+    def render(self) -> str:
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+FIRING_LATENESS = REGISTRY.histogram(
+    "timer_firing_lateness_seconds",
+    "Seconds between a timer's expiry and the first attempt to call its URL.",
+    buckets=LATENESS_BUCKETS,
+)
+CLAIM_BATCH_SIZE = REGISTRY.histogram(
+    "timer_claim_batch_size", "Number of due timers claimed per claim call.", buckets=BATCH_SIZE_BUCKETS
+)
+DISPATCH_DURATION = REGISTRY.histogram(
+    "timer_dispatch_duration_seconds",
+    "Duration of timer callbacks by response status.",
+    label_names=("status", "message"),
+)
+REDIS_OP_DURATION = REGISTRY.histogram(
+    "timer_redis_operation_duration_seconds", "Duration of timer repository calls to Redis.", label_names=("op",)
+)
+TIMERS_DROPPED = REGISTRY.counter(
+    "timer_dropped_total", "Timers dead-lettered without a callback because they were too late."
+)
+TIMER_COUNT = REGISTRY.gauge("timer_count", "Number of stored timers by state.", label_names=("state",))
+
+
+def timed(
+    histogram: Histogram, **labels: str
+) -> Callable[[Callable[P, Coroutine[Any, Any, T]]], Callable[P, Coroutine[Any, Any, T]]]:
+    def decorator(function: Callable[P, Coroutine[Any, Any, T]]) -> Callable[P, Coroutine[Any, Any, T]]:
+        @functools.wraps(function)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            start = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+
+        return wrapper
+
+    return decorator
+
+
+async def render_metrics(timer_repository: TimerRepository) -> str:
+    # Stored timer counts are read at scrape time, everything else is recorded as it happens.
+    counts = await timer_repository.get_timer_counts(datetime.now(timezone.utc))
+    for state, count in counts.items():
+        TIMER_COUNT.set(count, state=state)
+    return REGISTRY.render()
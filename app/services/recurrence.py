@@ -0,0 +1,104 @@
+import functools
+from datetime import datetime, timedelta, timezone
+
+from app.models.timer import TimerTask
+
+# minute, hour, day of month, month, day of week (0 or 7 is Sunday)
+CRON_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# Bounds the search for expressions that can never match, e.g. "0 0 30 2 *".
+MAX_CRON_SEARCH_DAYS = 366 * 5
+
+
+class CronSchedule:
+    # Standard five-field cron expressions with "*", ranges, steps and lists, evaluated in UTC.
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != len(CRON_FIELD_RANGES):
+            raise ValueError(f"Expected {len(CRON_FIELD_RANGES)} fields, got {len(fields)}")
+        minutes, hours, days, months, weekdays = (
+            _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELD_RANGES)
+        )
+        self.expression = expression
+        self.minutes = sorted(minutes)
+        self.hours = hours
+        self.days = days
+        self.months = months
+        self.weekdays = {weekday % 7 for weekday in weekdays}
+        # As in cron, when both day fields are restricted a day matching either of them fires.
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def next_after(self, after: datetime) -> datetime:
+        moment = after.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=MAX_CRON_SEARCH_DAYS)
+        while moment < limit:
+            if moment.month not in self.months or not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            minute = next((minute for minute in self.minutes if minute >= moment.minute), None)
+            if minute is None:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            return moment.replace(minute=minute)
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_matches = moment.day in self.days
+        weekday_matches = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day and self.any_weekday:
+            return True
+        if self.any_day:
+            return weekday_matches
+        if self.any_weekday:
+            return day_matches
+        return day_matches or weekday_matches
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> set[int]:
+    values: set[int] = set()
+    for part in field.split(","):
+        value_range, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if value_range == "*":
+            start, end = low, high
+        elif "-" in value_range:
+            start_text, end_text = value_range.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(value_range)
+            end = high if step_text else start
+        if step <= 0 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid cron field {field!r}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_cron(expression: str) -> CronSchedule:
+    # Recurring timers fire over and over with the same few expressions, so each one is parsed once.
+    return CronSchedule(expression)
+
+
+def next_occurrence(timer: TimerTask, now: datetime) -> datetime | None:
+    # Occurrences are computed from the scheduled time rather than from when the timer
+    # actually fired, so recurring timers do not drift. Occurrences missed while nothing
+    # was running are skipped.
+    if timer.interval_seconds is not None:
+        interval = timedelta(seconds=timer.interval_seconds)
+        next_at = timer.expires_at + interval
+        if next_at <= now:
+            next_at += interval * ((now - next_at) // interval + 1)
+        return next_at
+    if timer.cron is not None:
+        return parse_cron(timer.cron).next_after(max(timer.expires_at, now))
+    return None
+
+
+def next_timer(timer: TimerTask, now: datetime) -> TimerTask | None:
+    expires_at = next_occurrence(timer, now)
+    if expires_at is None:
+        return None
+    return timer.model_copy(update={"expires_at": expires_at})
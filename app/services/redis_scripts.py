@@ -0,0 +1,445 @@
+import hashlib
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import NoScriptError
+
+
+class LuaScript:
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+
+    async def __call__(self, redis_client: Redis, keys: list[str], args: list[str]) -> Any:
+        try:
+            return await redis_client.evalsha(self.sha, len(keys), *keys, *args)  # type: ignore
+        except NoScriptError:
+            # The server lost its script cache (restart or failover), register it again.
+            await redis_client.script_load(self.source)  # type: ignore
+            return await redis_client.evalsha(self.sha, len(keys), *keys, *args)  # type: ignore
+
+    def queue(self, pipeline: Pipeline, keys: list[str], args: list[str]) -> None:
+        pipeline.evalsha(self.sha, len(keys), *keys, *args)  # type: ignore
+
+
+# KEYS: timer key, shard task set, optionally the tag set. ARGV: payload, score, timer id,
+# wakeup channel, shard, tag set ttl in ms. Publishes a wakeup only when the new timer
+# is now the earliest one of its shard.
+CREATE_TIMER = LuaScript(
+    """
+redis.call('SET', KEYS[1], ARGV[1])
+local added = redis.call('ZADD', KEYS[2], ARGV[2], ARGV[3])
+local first = redis.call('ZRANGE', KEYS[2], 0, 0)
+if first[1] == ARGV[3] then
+    redis.call('PUBLISH', ARGV[4], ARGV[5] .. ':' .. ARGV[2])
+end
+if KEYS[3] then
+    redis.call('SADD', KEYS[3], ARGV[3])
+    if redis.call('PTTL', KEYS[3]) < tonumber(ARGV[6]) then
+        redis.call('PEXPIRE', KEYS[3], ARGV[6])
+    end
+end
+return added
+"""
+)
+
+# KEYS and ARGV as for CREATE_TIMER, with the payload the caller read prepended to ARGV.
+# Moves a pending timer in its task set; returns 0 when it is no longer pending and -1
+# when the payload changed since it was read.
+RESCHEDULE_TIMER = LuaScript(
+    """
+if not redis.call('ZSCORE', KEYS[2], ARGV[4]) then
+    return 0
+end
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return -1
+end
+redis.call('SET', KEYS[1], ARGV[2])
+redis.call('ZADD', KEYS[2], 'XX', ARGV[3], ARGV[4])
+local first = redis.call('ZRANGE', KEYS[2], 0, 0)
+if first[1] == ARGV[4] then
+    redis.call('PUBLISH', ARGV[5], ARGV[6] .. ':' .. ARGV[3])
+end
+if KEYS[3] and redis.call('PTTL', KEYS[3]) < tonumber(ARGV[7]) then
+    redis.call('PEXPIRE', KEYS[3], ARGV[7])
+end
+return 1
+"""
+)
+
+# KEYS: task set, timer key, next occurrence key, in-flight key, retry key. ARGV: timer id.
+# Returns the pending payload. Occurrences being delivered or retried that are still to be
+# re-armed from their payload are kept from being re-armed instead, and a payload of theirs
+# returned in a table.
+DELETE_TIMER = LuaScript(
+    """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[3])
+local payload = redis.call('GETDEL', KEYS[2])
+if payload then
+    return payload
+end
+local cancelled = false
+for _, key in ipairs({KEYS[4], KEYS[5]}) do
+    local record = redis.call('HGETALL', key)
+    for i = 1, #record, 2 do
+        local field = record[i]
+        if string.sub(field, -5) == 'rearm' then
+            redis.call('HDEL', key, field)
+            cancelled = cancelled or redis.call('HGET', key, string.sub(field, 1, -6) .. 'payload')
+        end
+    end
+end
+if cancelled then
+    return {cancelled}
+end
+return false
+"""
+)
+
+# KEYS: shard task sets. ARGV: max score, limit, timer key prefix, lease deadline, min score, now.
+# Pops due members and returns a flat list of id, payload, next score triples, so
+# concurrent executors never claim the same timer. A recurring timer whose next
+# occurrence was prepared is re-armed with it in the same step, and its score returned.
+# A prepared occurrence that is already due, e.g. after an outage, is skipped. Claimed
+# timers stay in the in-flight set until their outcome is recorded, so a timer whose
+# executor dies before that is delivered again once its lease runs out; those not re-armed
+# are flagged there, so only a timer that was not cancelled since is re-armed from its payload.
+# In-flight and retry records are kept per occurrence, as the id and the microsecond it was
+# due (TimerTask.occurrence), since a recurring timer can be claimed again before the outcome
+# of the previous occurrence is recorded: members are '<id>:<occurrence>', and the hash of
+# the id holds '<occurrence>:attempts', '<occurrence>:payload' and '<occurrence>:rearm'.
+CLAIM_DUE_TIMERS = LuaScript(
+    """
+local limit = tonumber(ARGV[2])
+local claimed = {}
+local count = 0
+for _, key in ipairs(KEYS) do
+    if count >= limit then
+        break
+    end
+    local due = redis.call('ZRANGE', key, ARGV[5], ARGV[1], 'BYSCORE', 'LIMIT', 0, limit - count, 'WITHSCORES')
+    if #due > 0 then
+        local ids = {}
+        for i = 1, #due, 2 do
+            ids[#ids + 1] = due[i]
+        end
+        redis.call('ZREM', key, unpack(ids))
+        for i = 1, #due, 2 do
+            local id = due[i]
+            local occurrence = string.format('%.0f', math.floor(tonumber(due[i + 1]) * 1000000 + 0.5))
+            local next_key = ARGV[3] .. 'next:' .. id
+            local next = redis.call('HMGET', next_key, 'score', 'payload')
+            local payload = redis.call('GETDEL', ARGV[3] .. id)
+            local rearmed = next[1] and tonumber(next[1]) > tonumber(ARGV[6])
+            claimed[#claimed + 1] = id
+            claimed[#claimed + 1] = payload
+            claimed[#claimed + 1] = rearmed and next[1] or false
+            if payload then
+                local inflight_key = ARGV[3] .. 'inflight:' .. id
+                redis.call('ZADD', ARGV[3] .. 'inflight_set', ARGV[4], id .. ':' .. occurrence)
+                redis.call('HSET', inflight_key, occurrence .. ':attempts', 0, occurrence .. ':payload', payload)
+                if not rearmed then
+                    redis.call('HSET', inflight_key, occurrence .. ':rearm', 1)
+                end
+            end
+            if rearmed then
+                redis.call('SET', ARGV[3] .. id, next[2])
+                redis.call('ZADD', key, next[1], id)
+            end
+            if next[1] then
+                redis.call('DEL', next_key)
+            end
+        end
+        count = count + #ids
+    end
+end
+return claimed
+"""
+)
+
+# KEYS and ARGV as for CREATE_TIMER, with the in-flight key inserted as the third key and
+# the re-arm field of the claimed occurrence prepended to ARGV. Re-arms a claimed recurring
+# timer from its payload, unless it was cancelled since it was claimed, and returns whether it did.
+REARM_TIMER = LuaScript(
+    """
+if redis.call('HDEL', KEYS[3], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+local first = redis.call('ZRANGE', KEYS[2], 0, 0)
+if first[1] == ARGV[4] then
+    redis.call('PUBLISH', ARGV[5], ARGV[6] .. ':' .. ARGV[3])
+end
+if KEYS[4] then
+    redis.call('SADD', KEYS[4], ARGV[4])
+    if redis.call('PTTL', KEYS[4]) < tonumber(ARGV[7]) then
+        redis.call('PEXPIRE', KEYS[4], ARGV[7])
+    end
+end
+return 1
+"""
+)
+
+# KEYS: task set, next occurrence key, optionally the tag set. ARGV: timer id, score of
+# the pending occurrence, next score, next payload, tag set ttl in ms.
+# Prepares the occurrence after the pending one, unless the timer was claimed, moved or
+# deleted since it was read.
+SET_NEXT_OCCURRENCE = LuaScript(
+    """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not score or tonumber(score) ~= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('HSET', KEYS[2], 'score', ARGV[3], 'payload', ARGV[4])
+if KEYS[3] and redis.call('PTTL', KEYS[3]) < tonumber(ARGV[5]) then
+    redis.call('PEXPIRE', KEYS[3], ARGV[5])
+end
+return 1
+"""
+)
+
+# KEYS: retry set. ARGV: max score, limit, retry key prefix, lease deadline, timer key prefix.
+# Pops due retries into the in-flight set and returns a flat list of id, attempts, payload,
+# re-arm field quadruples; the field is only set for an occurrence still to be re-armed.
+# Records written before occurrences were tracked are keyed by the id alone.
+CLAIM_DUE_RETRIES = LuaScript(
+    """
+local members = redis.call('ZRANGE', KEYS[1], '-inf', ARGV[1], 'BYSCORE', 'LIMIT', 0, tonumber(ARGV[2]))
+local claimed = {}
+if #members > 0 then
+    redis.call('ZREM', KEYS[1], unpack(members))
+    for _, member in ipairs(members) do
+        local id, occurrence = string.match(member, '^(.*):(%d+)$')
+        local prefix = ''
+        if id then
+            prefix = occurrence .. ':'
+        else
+            id = member
+        end
+        local fields = {prefix .. 'attempts', prefix .. 'payload', prefix .. 'rearm'}
+        local record = redis.call('HMGET', ARGV[3] .. id, unpack(fields))
+        redis.call('HDEL', ARGV[3] .. id, unpack(fields))
+        if record[2] then
+            local inflight_key = ARGV[5] .. 'inflight:' .. id
+            redis.call('ZADD', ARGV[5] .. 'inflight_set', ARGV[4], member)
+            redis.call('HSET', inflight_key, fields[1], record[1], fields[2], record[2])
+            if record[3] then
+                redis.call('HSET', inflight_key, fields[3], record[3])
+            end
+        end
+        claimed[#claimed + 1] = id
+        claimed[#claimed + 1] = record[1]
+        claimed[#claimed + 1] = record[2]
+        claimed[#claimed + 1] = record[3] and fields[3] or false
+    end
+end
+return claimed
+"""
+)
+
+# KEYS: in-flight set, retry set. ARGV: now, limit, timer key prefix.
+# Moves occurrences whose lease ran out to the retry set, due right away and with their
+# attempts so far and whether they are still to be re-armed, and returns how many were moved.
+REQUEUE_EXPIRED_LEASES = LuaScript(
+    """
+local members = redis.call('ZRANGE', KEYS[1], '-inf', ARGV[1], 'BYSCORE', 'LIMIT', 0, tonumber(ARGV[2]))
+if #members > 0 then
+    redis.call('ZREM', KEYS[1], unpack(members))
+    for _, member in ipairs(members) do
+        local id, occurrence = string.match(member, '^(.*):(%d+)$')
+        local prefix = ''
+        if id then
+            prefix = occurrence .. ':'
+        else
+            id = member
+        end
+        local fields = {prefix .. 'attempts', prefix .. 'payload', prefix .. 'rearm'}
+        local inflight_key = ARGV[3] .. 'inflight:' .. id
+        local record = redis.call('HMGET', inflight_key, unpack(fields))
+        redis.call('HDEL', inflight_key, unpack(fields))
+        if record[2] then
+            local retry_key = ARGV[3] .. 'retry:' .. id
+            redis.call('HSET', retry_key, fields[1], record[1], fields[2], record[2])
+            if record[3] then
+                redis.call('HSET', retry_key, fields[3], record[3])
+            end
+            redis.call('ZADD', KEYS[2], ARGV[1], member)
+        end
+    end
+end
+return #members
+"""
+)
+
+# KEYS: in-flight set, in-flight key, retry set, retry key. ARGV: timer id, occurrence,
+# attempts, payload, retry at. Moves a claimed occurrence to the retry set, along with
+# whether it is still to be re-armed.
+ADD_RETRY = LuaScript(
+    """
+local member = ARGV[1] .. ':' .. ARGV[2]
+local prefix = ARGV[2] .. ':'
+local rearm = redis.call('HGET', KEYS[2], prefix .. 'rearm')
+redis.call('ZREM', KEYS[1], member, ARGV[1])
+redis.call('HDEL', KEYS[2], prefix .. 'attempts', prefix .. 'payload', prefix .. 'rearm', 'attempts', 'payload', 'rearm')
+redis.call('HSET', KEYS[4], prefix .. 'attempts', ARGV[3], prefix .. 'payload', ARGV[4])
+if rearm then
+    redis.call('HSET', KEYS[4], prefix .. 'rearm', rearm)
+end
+redis.call('ZADD', KEYS[3], ARGV[5], member)
+return 1
+"""
+)
+
+# KEYS: shard task sets. Returns the lowest score as the raw reply string,
+# since Lua numbers would be truncated to integers on the way out.
+NEXT_EXPIRY = LuaScript(
+    """
+local best = nil
+local best_score = nil
+for _, key in ipairs(KEYS) do
+    local first = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    if first[2] and (best == nil or tonumber(first[2]) < best) then
+        best = tonumber(first[2])
+        best_score = first[2]
+    end
+end
+return best_score or false
+"""
+)
+
+# KEYS: workers set. ARGV: worker id, lease ttl in ms.
+# Heartbeats the worker, drops workers whose heartbeat expired and returns the live ones.
+HEARTBEAT_WORKER = LuaScript(
+    """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+return redis.call('ZRANGE', KEYS[1], 0, -1)
+"""
+)
+
+# KEYS: one lease key per shard. ARGV: worker id, lease ttl in ms, then '1' or '0'
+# per shard telling whether the worker wants it. Renews or takes wanted leases
+# that are free, releases unwanted ones it holds and returns the 0-based shards held.
+UPDATE_SHARD_LEASES = LuaScript(
+    """
+local held = {}
+for i, key in ipairs(KEYS) do
+    local owner = redis.call('GET', key)
+    if ARGV[i + 2] == '1' then
+        if not owner or owner == ARGV[1] then
+            redis.call('SET', key, ARGV[1], 'PX', ARGV[2])
+            held[#held + 1] = i - 1
+        end
+    elseif owner == ARGV[1] then
+        redis.call('DEL', key)
+    end
+end
+return held
+"""
+)
+
+# KEYS: executed key, executed index, in-flight set, in-flight key. ARGV: payload, ttl in ms
+# ('0' keeps it forever), max executed count ('0' for no cap), timer id, executed at,
+# executed key prefix, occurrence. Writes the executed record, releases the lease of the
+# occurrence, including one written before occurrences were tracked, and applies the
+# retention policy in the same step.
+ADD_EXECUTED_TIMER = LuaScript(
+    """
+local ttl_ms = tonumber(ARGV[2])
+if ttl_ms > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ttl_ms)
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+local prefix = ARGV[7] .. ':'
+redis.call('ZREM', KEYS[3], ARGV[4] .. ':' .. ARGV[7], ARGV[4])
+redis.call('HDEL', KEYS[4], prefix .. 'attempts', prefix .. 'payload', prefix .. 'rearm', 'attempts', 'payload', 'rearm')
+local max_count = tonumber(ARGV[3])
+if max_count > 0 then
+    redis.call('ZADD', KEYS[2], ARGV[5], ARGV[4])
+    if ttl_ms > 0 then
+        redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', tonumber(ARGV[5]) - ttl_ms / 1000)
+    end
+    local excess = redis.call('ZCARD', KEYS[2]) - max_count
+    if excess > 0 then
+        local oldest = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+        redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+        for _, id in ipairs(oldest) do
+            redis.call('UNLINK', ARGV[6] .. id)
+        end
+    end
+end
+return 1
+"""
+)
+
+# KEYS: dead letter key, dead letter set, in-flight set, in-flight key. ARGV: attempts, payload,
+# failed at, timer id, ttl in ms ('0' keeps it forever), max dead letter count ('0' for no cap),
+# dead letter key prefix, occurrence. Writes the dead letter, releases the lease of the
+# occurrence and applies the retention policy in the same step, like ADD_EXECUTED_TIMER.
+ADD_DEAD_LETTER = LuaScript(
+    """
+redis.call('HSET', KEYS[1], 'attempts', ARGV[1], 'payload', ARGV[2], 'failed_at', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[4])
+local prefix = ARGV[8] .. ':'
+redis.call('ZREM', KEYS[3], ARGV[4] .. ':' .. ARGV[8], ARGV[4])
+redis.call('HDEL', KEYS[4], prefix .. 'attempts', prefix .. 'payload', prefix .. 'rearm', 'attempts', 'payload', 'rearm')
+local ttl_ms = tonumber(ARGV[5])
+if ttl_ms > 0 then
+    redis.call('PEXPIRE', KEYS[1], ttl_ms)
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', tonumber(ARGV[3]) - ttl_ms / 1000)
+end
+local max_count = tonumber(ARGV[6])
+if max_count > 0 then
+    local excess = redis.call('ZCARD', KEYS[2]) - max_count
+    if excess > 0 then
+        local oldest = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+        redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+        for _, id in ipairs(oldest) do
+            redis.call('UNLINK', ARGV[7] .. id)
+        end
+    end
+end
+return 1
+"""
+)
+
+# KEYS: key. ARGV: expected value, new value.
+# Compare-and-set that keeps the TTL, so concurrent writers are never overwritten.
+REPLACE_VALUE = LuaScript(
+    """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'KEEPTTL')
+    return 1
+end
+return 0
+"""
+)
+
+ALL_SCRIPTS = (
+    CREATE_TIMER,
+    RESCHEDULE_TIMER,
+    DELETE_TIMER,
+    CLAIM_DUE_TIMERS,
+    REARM_TIMER,
+    SET_NEXT_OCCURRENCE,
+    CLAIM_DUE_RETRIES,
+    ADD_RETRY,
+    REQUEUE_EXPIRED_LEASES,
+    NEXT_EXPIRY,
+    HEARTBEAT_WORKER,
+    UPDATE_SHARD_LEASES,
+    ADD_EXECUTED_TIMER,
+    ADD_DEAD_LETTER,
+    REPLACE_VALUE,
+)
+
+
+async def load_scripts(redis_client: Redis) -> None:
+    for script in ALL_SCRIPTS:
+        await redis_client.script_load(script.source)  # type: ignore
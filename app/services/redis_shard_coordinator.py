@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Sequence
+
+from redis.asyncio import Redis
+
+from app.repositories.shard_coordinator import ShardCoordinator
+from app.services import redis_scripts
+
+DEFAULT_LEASE_TTL_SECONDS = 10.0
+# Leases are renewed several times per TTL so one slow round-trip does not lose them.
+RENEWALS_PER_TTL = 3
+
+
+def assign_shards(workers: Sequence[str], shard_count: int) -> dict[str, set[int]]:
+    ordered = sorted(workers)
+    assignment: dict[str, set[int]] = {worker: set() for worker in ordered}
+    if not ordered:
+        return assignment
+    for shard in range(shard_count):
+        assignment[ordered[shard % len(ordered)]].add(shard)
+    return assignment
+
+
+class RedisShardCoordinator(ShardCoordinator):
+    def __init__(
+        self,
+        redis_client: Redis,
+        shard_count: int,
+        worker_id: str,
+        lease_ttl_seconds: float = DEFAULT_LEASE_TTL_SECONDS,
+    ) -> None:
+        self.redis_client = redis_client
+        self.shard_count = shard_count
+        self.worker_id = worker_id
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.owned: list[int] = []
+        self.leases_valid_until = 0.0
+        self.task: asyncio.Task | None = None
+        self.on_change: Callable[[], None] | None = None
+        self.logger = logging.getLogger(__name__)
+        self.WORKERS_KEY = "timer:workers"
+        self.LEASE_PREFIX = "timer:shard_lease:"
+
+    async def start(self, on_change: Callable[[], None] | None = None) -> None:
+        self.on_change = on_change
+
+        async def _renew_leases():
+            try:
+                while True:
+                    await asyncio.sleep(self.lease_ttl_seconds / RENEWALS_PER_TTL)
+                    await self._try_rebalance()
+            except asyncio.CancelledError:
+                self.logger.info("Stopping shard lease renewal")
+
+        # Nothing can be claimed before the first leases are taken, so they are not left to the loop.
+        await self._try_rebalance()
+        self.task = asyncio.create_task(_renew_leases())
+
+    async def _try_rebalance(self) -> None:
+        try:
+            await self.rebalance()
+        except Exception as e:
+            self.logger.error("Error renewing shard leases: %s", e)
+
+    def owned_shards(self) -> Sequence[int]:
+        # Stop claiming as soon as the leases may have expired on the server.
+        if time.monotonic() >= self.leases_valid_until:
+            return []
+        return self.owned
+
+    async def rebalance(self) -> None:
+        started = time.monotonic()
+        ttl_ms = str(int(self.lease_ttl_seconds * 1000))
+        workers = await redis_scripts.HEARTBEAT_WORKER(
+            self.redis_client, keys=[self.WORKERS_KEY], args=[self.worker_id, ttl_ms]
+        )
+        wanted = assign_shards(workers, self.shard_count).get(self.worker_id, set())
+        await self._update_leases(wanted, ttl_ms)
+        self.leases_valid_until = started + self.lease_ttl_seconds
+
+    async def _update_leases(self, wanted: set[int], ttl_ms: str) -> None:
+        held = await redis_scripts.UPDATE_SHARD_LEASES(
+            self.redis_client,
+            keys=[f"{self.LEASE_PREFIX}{shard}" for shard in range(self.shard_count)],
+            args=[self.worker_id, ttl_ms, *("1" if shard in wanted else "0" for shard in range(self.shard_count))],
+        )
+        owned = sorted(int(shard) for shard in held)
+        changed = owned != self.owned
+        self.owned = owned
+        if changed:
+            self.logger.info("Worker %s now owns shards %s", self.worker_id, owned)
+            if self.on_change is not None:
+                self.on_change()
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        try:
+            await self._update_leases(set(), str(int(self.lease_ttl_seconds * 1000)))
+            await self.redis_client.zrem(self.WORKERS_KEY, self.worker_id)  # type: ignore
+        except Exception as e:
+            self.logger.error("Error releasing shard leases: %s", e)
+        self.owned = []
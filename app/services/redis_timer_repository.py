@@ -1,71 +1,641 @@
 import logging
-import sys
+import zlib
 from datetime import datetime, timezone
+from typing import AsyncIterator, Sequence
 
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 
 from app.models.timer import TimerTask
-from app.repositories.timer_repo import TimerRepository
+from app.repositories.timer_repo import DEFAULT_LEASE_SECONDS, TimerRepository
+from app.services import redis_scripts
+from app.services.metrics import REDIS_OP_DURATION, timed
+from app.services.recurrence import next_timer
+from app.services.timer_codec import JsonTimerCodec, TimerCodec, decode_timer
+
+# Seconds a pub/sub read blocks before checking the connection again; kept
+# below the client's socket timeout so an idle channel is not an error.
+WATCH_POLL_SECONDS = 1.0
+# Tag sets are not cleaned up when their timers fire, they expire this long after the
+# latest timer in them instead.
+TAG_TTL_MARGIN_SECONDS = 3600
+RESCHEDULE_ATTEMPTS = 3
 
 
 class RedisTimerRepository(TimerRepository):
-    def __init__(self, redis_client: Redis) -> None:
+    def __init__(
+        self,
+        redis_client: Redis,
+        shard_count: int = 1,
+        codec: TimerCodec | None = None,
+        executed_ttl_seconds: float | None = None,
+        executed_max_count: int | None = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        dead_letter_ttl_seconds: float | None = None,
+        dead_letter_max_count: int | None = None,
+    ) -> None:
         self.redis_client = redis_client
+        self.shard_count = shard_count
+        self.codec = codec or JsonTimerCodec()
+        self.executed_ttl_seconds = executed_ttl_seconds
+        self.executed_max_count = executed_max_count
+        self.dead_letter_ttl_seconds = dead_letter_ttl_seconds
+        self.dead_letter_max_count = dead_letter_max_count
+        self.lease_seconds = lease_seconds
+        self.claim_offset = 0
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        stream_handler = logging.StreamHandler(sys.stdout)
-        log_formatter = logging.Formatter(
-            "%(asctime)s [%(processName)s: %(process)d] [%(threadName)s: %(thread)d] [%(levelname)s] %(name)s: %(message)s"
-        )
-        stream_handler.setFormatter(log_formatter)
-        self.logger.addHandler(stream_handler)
         self.EXECUTED_PREFIX = "executed:"
         self.TIMER_PREFIX = "timer:"
+        self.WAKEUP_CHANNEL = "timer:wakeup"
+        self.RETRY_SET = f"{self.TIMER_PREFIX}retry_set"
+        self.RETRY_PREFIX = f"{self.TIMER_PREFIX}retry:"
+        self.DEAD_LETTER_SET = f"{self.TIMER_PREFIX}dead_letter_set"
+        self.DEAD_LETTER_PREFIX = f"{self.TIMER_PREFIX}dead_letter:"
+        # The claim scripts derive these from TIMER_PREFIX.
+        self.INFLIGHT_SET = f"{self.TIMER_PREFIX}inflight_set"
+        self.INFLIGHT_PREFIX = f"{self.TIMER_PREFIX}inflight:"
+        self.SHARD_COUNT_KEY = f"{self.TIMER_PREFIX}shard_count"
+
+    async def load_scripts(self) -> None:
+        await redis_scripts.load_scripts(self.redis_client)
+
+    def shard_for(self, timer_id: str) -> int:
+        return zlib.crc32(timer_id.encode()) % self.shard_count
+
+    def task_set_key(self, shard: int, shard_count: int | None = None) -> str:
+        # A single shard keeps the original key so existing deployments need no migration.
+        if (shard_count or self.shard_count) == 1:
+            return f"{self.TIMER_PREFIX}task_set"
+        return f"{self.TIMER_PREFIX}task_set:{shard}"
+
+    async def stored_shard_count(self) -> int:
+        # Deployments from before the count was recorded all used a single shard unless configured otherwise.
+        stored = await self.redis_client.get(self.SHARD_COUNT_KEY)  # type: ignore
+        return int(stored) if stored is not None else 1
+
+    async def check_shard_count(self) -> None:
+        # Timers are only claimed from the task sets of the configured count, so a different count
+        # would leave every timer stored under the previous one unfired.
+        previous = await self.stored_shard_count()
+        if previous == self.shard_count:
+            await self.redis_client.set(self.SHARD_COUNT_KEY, self.shard_count, nx=True)  # type: ignore
+            return
+        keys = [self.task_set_key(shard, previous) for shard in range(previous)]
+        async with self.redis_client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.zcard(key)
+            counts = await pipeline.execute()
+        if any(counts):
+            raise RuntimeError(
+                f"Timers are stored in {previous} shards but TIMER_SHARD_COUNT is {self.shard_count}, "
+                "move them with `python -m app.tools.reshard_timers` first"
+            )
+        await self.redis_client.set(self.SHARD_COUNT_KEY, self.shard_count)  # type: ignore
 
+    async def reshard_timers(self, previous_shard_count: int, batch_size: int = 1000) -> int:
+        # Moves pending timers from the task sets of the previous count to those of the configured one,
+        # a batch per transaction so Redis is never busy for longer than one batch.
+        moved = 0
+        for shard in range(previous_shard_count):
+            key = self.task_set_key(shard, previous_shard_count)
+            batch: list[tuple[str, float]] = []
+            async for member in self.redis_client.zscan_iter(key, count=batch_size):
+                batch.append(member)
+                if len(batch) >= batch_size:
+                    moved += await self._move_task_set_members(key, batch)
+                    batch = []
+            if batch:
+                moved += await self._move_task_set_members(key, batch)
+        await self.redis_client.set(self.SHARD_COUNT_KEY, self.shard_count)  # type: ignore
+        return moved
+
+    async def _move_task_set_members(self, key: str, members: list[tuple[str, float]]) -> int:
+        moves = [
+            (self.task_set_key(self.shard_for(timer_id)), timer_id, score)
+            for timer_id, score in members
+            if self.task_set_key(self.shard_for(timer_id)) != key
+        ]
+        if not moves:
+            return 0
+        async with self.redis_client.pipeline(transaction=True) as pipeline:
+            for target, timer_id, score in moves:
+                # A timer already created under the new count is more recent than the one being moved.
+                pipeline.zadd(target, {timer_id: score}, nx=True)
+                pipeline.zrem(key, timer_id)
+            await pipeline.execute()
+        return len(moves)
+
+    def next_key(self, timer_id: str) -> str:
+        return f"{self.TIMER_PREFIX}next:{timer_id}"
+
+    def tag_key(self, tag: str) -> str:
+        return f"{self.TIMER_PREFIX}tag:{tag}"
+
+    def _task_set_keys(self, shards: Sequence[int] | None) -> list[str]:
+        if shards is None:
+            shards = range(self.shard_count)
+        return [self.task_set_key(shard) for shard in shards]
+
+    @timed(REDIS_OP_DURATION, op="get_timer")
     async def get_timer(self, timer_id: str) -> TimerTask | None:
-        self.logger.info(f"Getting timer with id {timer_id}")
         timer_json = await self.redis_client.get(f"{self.TIMER_PREFIX}{timer_id}")  # type: ignore
-        self.logger.info(f"Retrieved timer: {timer_json}")
+        self.logger.debug("Retrieved timer %s: %s", timer_id, timer_json)
         if not timer_json:
             return None
-        return TimerTask.model_validate_json(timer_json)
+        return decode_timer(timer_id, timer_json)
 
+    @timed(REDIS_OP_DURATION, op="delete_timer")
     async def delete_timer(self, timer_id: str) -> TimerTask | None:
-        await self.redis_client.zrem(f"{self.TIMER_PREFIX}task_set", timer_id)  # type: ignore
-        timer_json = await self.redis_client.getdel(f"{self.TIMER_PREFIX}{timer_id}")  # type: ignore
-        if timer_json is None:
+        result = await redis_scripts.DELETE_TIMER(
+            self.redis_client,
+            keys=self._delete_timer_keys(timer_id),
+            args=[timer_id],
+        )
+        return self._deleted_timer(timer_id, result)
+
+    @timed(REDIS_OP_DURATION, op="delete_timers")
+    async def delete_timers(self, timer_ids: Sequence[str]) -> list[TimerTask]:
+        results = await self._execute_scripts(
+            [(redis_scripts.DELETE_TIMER, self._delete_timer_keys(timer_id), [timer_id]) for timer_id in timer_ids]
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise Exception(f"Failed to delete {len(errors)} of {len(timer_ids)} timers") from errors[0]
+        timers = [self._deleted_timer(timer_id, result) for timer_id, result in zip(timer_ids, results)]
+        return [timer for timer in timers if timer is not None]
+
+    def _delete_timer_keys(self, timer_id: str) -> list[str]:
+        return [
+            self.task_set_key(self.shard_for(timer_id)),
+            f"{self.TIMER_PREFIX}{timer_id}",
+            self.next_key(timer_id),
+            f"{self.INFLIGHT_PREFIX}{timer_id}",
+            f"{self.RETRY_PREFIX}{timer_id}",
+        ]
+
+    @staticmethod
+    def _deleted_timer(timer_id: str, result: str | list | None) -> TimerTask | None:
+        if isinstance(result, list):
+            # An occurrence of the timer was being delivered or retried and is no longer
+            # re-armed, which only cancels anything for a recurring one.
+            timer = decode_timer(timer_id, result[0])
+            return timer if timer.interval_seconds is not None or timer.cron is not None else None
+        if result is None:
             return None
-        return TimerTask.model_validate_json(timer_json)
+        return decode_timer(timer_id, result)
+
+    @timed(REDIS_OP_DURATION, op="delete_timers_by_tag")
+    async def delete_timers_by_tag(self, tag: str) -> list[TimerTask]:
+        tag_key = self.tag_key(tag)
+        timer_ids = list(await self.redis_client.smembers(tag_key))  # type: ignore
+        if not timer_ids:
+            return []
+        timers = await self.delete_timers(timer_ids)
+        # Only the members read are removed, timers tagged in the meantime stay in the set.
+        await self.redis_client.srem(tag_key, *timer_ids)  # type: ignore
+        self.logger.info("Deleted %d timers with tag %s", len(timers), tag)
+        return timers
 
+    @timed(REDIS_OP_DURATION, op="reschedule_timer")
+    async def reschedule_timer(self, timer_id: str, expires_at: datetime) -> TimerTask | None:
+        for _ in range(RESCHEDULE_ATTEMPTS):
+            timer_json = await self.redis_client.get(f"{self.TIMER_PREFIX}{timer_id}")  # type: ignore
+            if not timer_json:
+                return None
+            timer = decode_timer(timer_id, timer_json).model_copy(update={"expires_at": expires_at})
+            keys, args = self._create_timer_params(timer, self.codec.encode(timer))
+            result = await redis_scripts.RESCHEDULE_TIMER(self.redis_client, keys=keys, args=[timer_json, *args])
+            if result == 1:
+                self.logger.info("Rescheduled timer %s to %s", timer_id, expires_at)
+                # The prepared next occurrence was computed from the old schedule.
+                next_call = self._next_occurrence_call(timer, datetime.now(timezone.utc))
+                if next_call is not None:
+                    await self._execute_scripts([next_call])
+                return timer
+            if result == 0:
+                return None
+        raise Exception(f"Timer {timer_id} kept changing while being rescheduled")
+
+    @timed(REDIS_OP_DURATION, op="create_timer")
     async def create_timer(self, timer: TimerTask) -> None:
-        await self.redis_client.set(  # type: ignore
-            f"{self.TIMER_PREFIX}{timer.timer_id}",
-            timer.model_dump_json(),
-        )
-        self.logger.info(f"Created timer: {timer.model_dump_json()}")
-        timer_mapping = {
-            timer.timer_id: timer.expires_at.timestamp(),
-        }
-        response = await self.redis_client.zadd(f"{self.TIMER_PREFIX}task_set", timer_mapping)  # type: ignore
+        timer_json = self.codec.encode(timer)
+        keys, args = self._create_timer_params(timer, timer_json)
+        next_call = self._next_occurrence_call(timer, datetime.now(timezone.utc))
+        if next_call is None:
+            response = await redis_scripts.CREATE_TIMER(self.redis_client, keys=keys, args=args)
+        else:
+            # A recurring timer gets its next occurrence in the same round trip, so its first
+            # claim already re-arms it atomically.
+            response, next_response = await self._execute_scripts([(redis_scripts.CREATE_TIMER, keys, args), next_call])
+            for result in (response, next_response):
+                if isinstance(result, Exception):
+                    raise result
         if response == 0:
             raise Exception("Failed to add timer to task set")
-        self.logger.info(f"Added timer to task set: {timer_mapping}")
+        self.logger.debug("Created timer %s: %s", timer.timer_id, timer_json)
 
-    async def get_scheduled_task_id(self) -> str | None:
-        task_ids = await self.redis_client.zrange(f"{self.TIMER_PREFIX}task_set", start=-1, end=datetime.now(timezone.utc).timestamp(), byscore=True)  # type: ignore
-        if not task_ids:
+    @timed(REDIS_OP_DURATION, op="create_timers")
+    async def create_timers(self, timers: Sequence[TimerTask]) -> list[Exception | None]:
+        if not timers:
+            return []
+        now = datetime.now(timezone.utc)
+        calls = []
+        for timer in timers:
+            keys, args = self._create_timer_params(timer, self.codec.encode(timer))
+            calls.append((redis_scripts.CREATE_TIMER, keys, args))
+        # Queued after all creates, so the timers exist when their next occurrences are prepared.
+        for timer in timers:
+            next_call = self._next_occurrence_call(timer, now)
+            if next_call is not None:
+                calls.append(next_call)
+        results = await self._execute_scripts(calls)
+        # The pipeline is not a transaction, so some timers may have been written when others failed.
+        errors = [result if isinstance(result, Exception) else None for result in results[: len(timers)]]
+        failed = sum(error is not None for error in errors)
+        if failed == len(timers):
+            raise Exception(f"Failed to create {len(timers)} timers") from errors[0]
+        if failed:
+            self.logger.error("Failed to create %d of %d timers: %s", failed, len(timers), next(filter(None, errors)))
+        # Timers left without their next occurrence are re-armed from their payload when claimed.
+        next_errors = [result for result in results[len(timers) :] if isinstance(result, Exception)]
+        if next_errors:
+            self.logger.error("Failed to prepare %d next occurrences: %s", len(next_errors), next_errors[0])
+        self.logger.info("Created %d timers", len(timers) - failed)
+        return errors
+
+    async def _execute_scripts(self, calls: list[tuple[redis_scripts.LuaScript, list[str], list[str]]]) -> list:
+        # Runs all script calls in a single round trip. Re-running the whole batch after
+        # reloading the scripts is safe since every one of them is idempotent.
+        if not calls:
+            return []
+        for _ in range(2):
+            async with self.redis_client.pipeline(transaction=False) as pipeline:
+                for script, keys, args in calls:
+                    script.queue(pipeline, keys=keys, args=args)
+                results = await pipeline.execute(raise_on_error=False)
+            if not any(isinstance(result, NoScriptError) for result in results):
+                break
+            await self.load_scripts()
+        return results
+
+    def _create_timer_params(self, timer: TimerTask, timer_json: str) -> tuple[list[str], list[str]]:
+        shard = self.shard_for(timer.timer_id)
+        keys = [f"{self.TIMER_PREFIX}{timer.timer_id}", self.task_set_key(shard)]
+        args = [timer_json, str(timer.expires_at.timestamp()), timer.timer_id, self.WAKEUP_CHANNEL, str(shard)]
+        if timer.tag is not None:
+            keys.append(self.tag_key(timer.tag))
+            args.append(self._tag_ttl_ms(timer, datetime.now(timezone.utc)))
+        return keys, args
+
+    def _next_occurrence_call(
+        self, timer: TimerTask, now: datetime
+    ) -> tuple[redis_scripts.LuaScript, list[str], list[str]] | None:
+        # Prepares the occurrence after the pending one, so the claim script can re-arm the
+        # timer atomically without having to evaluate its schedule.
+        following = next_timer(timer, now)
+        if following is None:
             return None
-        return task_ids[0]
+        keys = [self.task_set_key(self.shard_for(timer.timer_id)), self.next_key(timer.timer_id)]
+        args = [
+            timer.timer_id,
+            str(timer.expires_at.timestamp()),
+            str(following.expires_at.timestamp()),
+            self.codec.encode(following),
+        ]
+        if timer.tag is not None:
+            keys.append(self.tag_key(timer.tag))
+            args.append(self._tag_ttl_ms(following, now))
+        return redis_scripts.SET_NEXT_OCCURRENCE, keys, args
+
+    def _rearm_calls(
+        self, timer: TimerTask, next_score: str | None, now: datetime, rearm_field: str | None = None
+    ) -> list[tuple[redis_scripts.LuaScript, list[str], list[str]]]:
+        if next_score is not None:
+            # The claim re-armed the timer, prepare the occurrence after that one.
+            pending = timer.model_copy(update={"expires_at": datetime.fromtimestamp(float(next_score), timezone.utc)})
+            next_call = self._next_occurrence_call(pending, now)
+            return [next_call] if next_call is not None else []
+        # A recurring timer without a prepared occurrence, e.g. after a failed write or an
+        # outage, is re-armed from its payload instead, unless it was cancelled meanwhile.
+        following = next_timer(timer, now)
+        if following is None:
+            return []
+        keys, args = self._create_timer_params(following, self.codec.encode(following))
+        keys.insert(2, f"{self.INFLIGHT_PREFIX}{timer.timer_id}")
+        args.insert(0, rearm_field or f"{timer.occurrence}:rearm")
+        calls = [(redis_scripts.REARM_TIMER, keys, args)]
+        next_call = self._next_occurrence_call(following, now)
+        if next_call is not None:
+            calls.append(next_call)
+        return calls
+
+    def _tag_ttl_ms(self, timer: TimerTask, now: datetime) -> str:
+        time_left = timer.expires_at - now
+        return str(max(int(time_left.total_seconds() * 1000), 0) + TAG_TTL_MARGIN_SECONDS * 1000)
+
+    @timed(REDIS_OP_DURATION, op="claim_due_timers")
+    async def claim_due_timers(
+        self,
+        now: datetime,
+        limit: int,
+        shards: Sequence[int] | None = None,
+        after: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[TimerTask]:
+        keys = self._task_set_keys(shards)
+        if not keys:
+            return []
+        # Rotate the starting shard so a backlog in one shard cannot starve the others.
+        self.claim_offset = (self.claim_offset + 1) % len(keys)
+        keys = keys[self.claim_offset :] + keys[: self.claim_offset]
+        payloads = await redis_scripts.CLAIM_DUE_TIMERS(
+            self.redis_client,
+            keys=keys,
+            args=[
+                str((until or now).timestamp()),
+                str(limit),
+                self.TIMER_PREFIX,
+                str(now.timestamp() + self.lease_seconds),
+                f"({after.timestamp()}" if after is not None else "-inf",
+                str(now.timestamp()),
+            ],
+        )
+        # The script replies with a flat list of id, payload, next score triples.
+        timers = []
+        calls = []
+        for timer_id, payload, next_score in zip(payloads[::3], payloads[1::3], payloads[2::3]):
+            if not payload:
+                continue
+            timer = decode_timer(timer_id, payload)
+            timers.append(timer)
+            calls.extend(self._rearm_calls(timer, next_score, now))
+        await self._rearm(calls)
+        return timers
 
+    async def _rearm(self, calls: list[tuple[redis_scripts.LuaScript, list[str], list[str]]]) -> None:
+        if not calls:
+            return
+        # The claimed timers must be dispatched regardless. A recurring timer left without
+        # a prepared occurrence is re-armed from its payload when it is claimed next, and
+        # one that could not be re-armed keeps its flag while it is delivered or retried.
+        try:
+            results = await self._execute_scripts(calls)
+            errors = [result for result in results if isinstance(result, Exception)]
+            if errors:
+                raise errors[0]
+        except Exception as e:
+            self.logger.error("Error preparing next occurrences of recurring timers: %s", e)
+
+    @timed(REDIS_OP_DURATION, op="get_next_expiry")
+    async def get_next_expiry(self, shards: Sequence[int] | None = None) -> datetime | None:
+        keys = self._task_set_keys(shards)
+        if not keys:
+            return None
+        score = await redis_scripts.NEXT_EXPIRY(self.redis_client, keys=keys, args=[])
+        if score is None:
+            return None
+        return datetime.fromtimestamp(float(score), timezone.utc)
+
+    async def watch_new_timers(self) -> AsyncIterator[tuple[int, datetime]]:
+        async with self.redis_client.pubsub() as pubsub:
+            await pubsub.subscribe(self.WAKEUP_CHANNEL)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=WATCH_POLL_SECONDS)
+                if message is not None:
+                    shard, score = message["data"].split(":", 1)
+                    yield int(shard), datetime.fromtimestamp(float(score), timezone.utc)
+
+    @timed(REDIS_OP_DURATION, op="add_executed_task")
     async def add_executed_task(self, timer: TimerTask) -> None:
-        await self.redis_client.set(  # type: ignore
-            f"{self.EXECUTED_PREFIX}{timer.timer_id}",
-            timer.model_dump_json(),
+        timer_json = self.codec.encode(timer)
+        await redis_scripts.ADD_EXECUTED_TIMER(
+            self.redis_client,
+            keys=[
+                f"{self.EXECUTED_PREFIX}{timer.timer_id}",
+                f"{self.EXECUTED_PREFIX}index",
+                self.INFLIGHT_SET,
+                f"{self.INFLIGHT_PREFIX}{timer.timer_id}",
+            ],
+            args=[
+                timer_json,
+                str(int((self.executed_ttl_seconds or 0) * 1000)),
+                str(self.executed_max_count or 0),
+                timer.timer_id,
+                str(datetime.now(timezone.utc).timestamp()),
+                self.EXECUTED_PREFIX,
+                timer.occurrence,
+            ],
+        )
+        self.logger.debug("Added executed task %s: %s", timer.timer_id, timer_json)
+
+    @timed(REDIS_OP_DURATION, op="add_retry")
+    async def add_retry(self, timer: TimerTask, attempts: int, retry_at: datetime) -> None:
+        await redis_scripts.ADD_RETRY(
+            self.redis_client,
+            keys=[
+                self.INFLIGHT_SET,
+                f"{self.INFLIGHT_PREFIX}{timer.timer_id}",
+                self.RETRY_SET,
+                f"{self.RETRY_PREFIX}{timer.timer_id}",
+            ],
+            args=[timer.timer_id, timer.occurrence, str(attempts), self.codec.encode(timer), str(retry_at.timestamp())],
         )
-        self.logger.info(f"Added executed task: {timer.model_dump_json()}")
 
+    @timed(REDIS_OP_DURATION, op="claim_due_retries")
+    async def claim_due_retries(self, now: datetime, limit: int) -> list[tuple[TimerTask, int]]:
+        records = await redis_scripts.CLAIM_DUE_RETRIES(
+            self.redis_client,
+            keys=[self.RETRY_SET],
+            args=[
+                str(now.timestamp()),
+                str(limit),
+                self.RETRY_PREFIX,
+                str(now.timestamp() + self.lease_seconds),
+                self.TIMER_PREFIX,
+            ],
+        )
+        # The script replies with a flat list of id, attempts, payload, re-arm field quadruples.
+        retries = []
+        calls = []
+        for timer_id, attempts, payload, rearm_field in zip(records[::4], records[1::4], records[2::4], records[3::4]):
+            if not payload:
+                continue
+            timer = decode_timer(timer_id, payload)
+            retries.append((timer, int(attempts)))
+            # Requeued after its executor died before re-arming it.
+            if rearm_field:
+                calls.extend(self._rearm_calls(timer, None, now, rearm_field))
+        await self._rearm(calls)
+        return retries
+
+    @timed(REDIS_OP_DURATION, op="extend_leases")
+    async def extend_leases(self, timers: Sequence[TimerTask], now: datetime) -> None:
+        if not timers:
+            return
+        # XX leaves out occurrences whose outcome was recorded in the meantime.
+        lease_until = now.timestamp() + self.lease_seconds
+        await self.redis_client.zadd(  # type: ignore
+            self.INFLIGHT_SET, {f"{timer.timer_id}:{timer.occurrence}": lease_until for timer in timers}, xx=True
+        )
+
+    @timed(REDIS_OP_DURATION, op="requeue_expired_leases")
+    async def requeue_expired_leases(self, now: datetime, limit: int) -> int:
+        return await redis_scripts.REQUEUE_EXPIRED_LEASES(
+            self.redis_client,
+            keys=[self.INFLIGHT_SET, self.RETRY_SET],
+            args=[str(now.timestamp()), str(limit), self.TIMER_PREFIX],
+        )
+
+    @timed(REDIS_OP_DURATION, op="add_dead_letter")
+    async def add_dead_letter(self, timer: TimerTask, attempts: int) -> None:
+        await redis_scripts.ADD_DEAD_LETTER(
+            self.redis_client,
+            keys=[
+                f"{self.DEAD_LETTER_PREFIX}{timer.timer_id}",
+                self.DEAD_LETTER_SET,
+                self.INFLIGHT_SET,
+                f"{self.INFLIGHT_PREFIX}{timer.timer_id}",
+            ],
+            args=[
+                str(attempts),
+                self.codec.encode(timer),
+                str(datetime.now(timezone.utc).timestamp()),
+                timer.timer_id,
+                str(int((self.dead_letter_ttl_seconds or 0) * 1000)),
+                str(self.dead_letter_max_count or 0),
+                self.DEAD_LETTER_PREFIX,
+                timer.occurrence,
+            ],
+        )
+        self.logger.info("Dead-lettered timer %s after %d attempts", timer.timer_id, attempts)
+
+    @timed(REDIS_OP_DURATION, op="get_timer_counts")
+    async def get_timer_counts(self, now: datetime) -> dict[str, int]:
+        task_set_keys = self._task_set_keys(None)
+        async with self.redis_client.pipeline(transaction=False) as pipeline:
+            for key in task_set_keys:
+                pipeline.zcard(key)  # type: ignore
+                pipeline.zcount(key, "-inf", now.timestamp())  # type: ignore
+            pipeline.zcard(self.RETRY_SET)  # type: ignore
+            pipeline.zcard(self.DEAD_LETTER_SET)  # type: ignore
+            pipeline.zcard(self.INFLIGHT_SET)  # type: ignore
+            # Executed timers are only indexed when their number is capped.
+            if self.executed_max_count is not None:
+                pipeline.zcard(f"{self.EXECUTED_PREFIX}index")  # type: ignore
+            results = await pipeline.execute()
+        shard_results = results[: 2 * len(task_set_keys)]
+        counts = {
+            "pending": sum(shard_results[::2]),
+            "due": sum(shard_results[1::2]),
+            "retrying": results[2 * len(task_set_keys)],
+            "dead_letter": results[2 * len(task_set_keys) + 1],
+            "in_flight": results[2 * len(task_set_keys) + 2],
+        }
+        if self.executed_max_count is not None:
+            counts["executed"] = results[-1]
+        return counts
+
+    @timed(REDIS_OP_DURATION, op="get_executed_task")
     async def get_executed_task(self, timer_id: str) -> TimerTask | None:
         timer_json = await self.redis_client.get(f"{self.EXECUTED_PREFIX}{timer_id}")
         if not timer_json:
             return None
-        return TimerTask.model_validate_json(timer_json)
+        return decode_timer(timer_id, timer_json)
+
+    async def lookup_timer(self, timer_id: str) -> TimerTask | None:
+        return (await self.lookup_timers([timer_id])).get(timer_id)
+
+    @timed(REDIS_OP_DURATION, op="lookup_timers")
+    async def lookup_timers(self, timer_ids: Sequence[str]) -> dict[str, TimerTask]:
+        if not timer_ids:
+            return {}
+        # One MGET fetches both the pending and the executed record of every id,
+        # preferring the pending one.
+        keys = [
+            key
+            for timer_id in timer_ids
+            for key in (f"{self.TIMER_PREFIX}{timer_id}", f"{self.EXECUTED_PREFIX}{timer_id}")
+        ]
+        payloads = await self.redis_client.mget(keys)
+        timers = {}
+        missing = []
+        for index, timer_id in enumerate(timer_ids):
+            timer_json = payloads[2 * index] or payloads[2 * index + 1]
+            if timer_json:
+                timers[timer_id] = decode_timer(timer_id, timer_json)
+            else:
+                missing.append(timer_id)
+        if missing:
+            # Timers being delivered, retried or given up on have fired as well; they are
+            # rare enough that the round trip for their hashes is only made when needed.
+            async with self.redis_client.pipeline(transaction=False) as pipeline:
+                for timer_id in missing:
+                    pipeline.hgetall(f"{self.INFLIGHT_PREFIX}{timer_id}")  # type: ignore
+                    pipeline.hgetall(f"{self.RETRY_PREFIX}{timer_id}")  # type: ignore
+                    pipeline.hget(f"{self.DEAD_LETTER_PREFIX}{timer_id}", "payload")  # type: ignore
+                records = await pipeline.execute()
+            for index, timer_id in enumerate(missing):
+                inflight, retry, dead_letter = records[3 * index : 3 * (index + 1)]
+                # In-flight and retry records hold a payload per occurrence, any of them will do.
+                payloads = [value for field, value in {**inflight, **retry}.items() if field.endswith("payload")]
+                timer_json = next(iter(payloads), dead_letter)
+                if timer_json:
+                    timers[timer_id] = decode_timer(timer_id, timer_json)
+        return timers
+
+    async def reencode_records(self, batch_size: int = 1000) -> int:
+        rewritten = 0
+        for prefix in (self.TIMER_PREFIX, self.EXECUTED_PREFIX):
+            async for keys in self._scan_keys(prefix, batch_size):
+                rewritten += await self._reencode_batch(prefix, keys)
+        return rewritten
+
+    async def scan_timers(self, batch_size: int = 1000) -> AsyncIterator[list[TimerTask]]:
+        # Streams all pending timers a batch at a time, so memory use does not grow with their
+        # number and Redis is never busy for longer than one batch of GETs.
+        async for keys in self._scan_keys(self.TIMER_PREFIX, batch_size):
+            async with self.redis_client.pipeline(transaction=False) as pipeline:
+                for key in keys:
+                    pipeline.get(key)
+                payloads = await pipeline.execute(raise_on_error=False)
+            records = (self._decode_record(self.TIMER_PREFIX, key, payload) for key, payload in zip(keys, payloads))
+            timers = [timer for timer in records if timer is not None]
+            if timers:
+                yield timers
+
+    async def _scan_keys(self, prefix: str, batch_size: int) -> AsyncIterator[list[str]]:
+        batch: list[str] = []
+        async for key in self.redis_client.scan_iter(match=f"{prefix}*", count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _decode_record(prefix: str, key: str, payload: object) -> TimerTask | None:
+        # Task sets and other hashes share the prefix and fail with WRONGTYPE.
+        if not isinstance(payload, str):
+            return None
+        try:
+            return decode_timer(key[len(prefix) :], payload)
+        except (ValueError, IndexError):
+            # Other string values under the prefix, e.g. shard leases.
+            return None
+
+    async def _reencode_batch(self, prefix: str, keys: list[str]) -> int:
+        async with self.redis_client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.get(key)
+            payloads = await pipeline.execute(raise_on_error=False)
+
+            for key, payload in zip(keys, payloads):
+                timer = self._decode_record(prefix, key, payload)
+                if timer is None:
+                    continue
+                timer_json = self.codec.encode(timer)
+                if timer_json != payload:
+                    redis_scripts.REPLACE_VALUE.queue(pipeline, keys=[key], args=[payload, timer_json])
+            results = await pipeline.execute(raise_on_error=False)
+        return sum(1 for result in results if result == 1)
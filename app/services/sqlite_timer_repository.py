@@ -0,0 +1,502 @@
+import asyncio
+import math
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Sequence, TypeVar
+
+from app.models.timer import TimerTask
+from app.repositories.timer_repo import DEFAULT_LEASE_SECONDS, TimerRepository
+from app.services.recurrence import next_timer
+from app.services.timer_codec import parse_url
+
+# The database is local to the process, so there is a single shard for the executor to own.
+SHARD = 0
+# SQLite caps the number of bound parameters per statement.
+MAX_QUERY_PARAMS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timers (
+    timer_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    tag TEXT,
+    interval_seconds INTEGER,
+    cron TEXT
+);
+CREATE INDEX IF NOT EXISTS timers_expires_at ON timers (expires_at);
+CREATE TABLE IF NOT EXISTS executed_timers (
+    timer_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    executed_at REAL NOT NULL,
+    tag TEXT,
+    interval_seconds INTEGER,
+    cron TEXT
+);
+CREATE INDEX IF NOT EXISTS executed_timers_executed_at ON executed_timers (executed_at);
+CREATE TABLE IF NOT EXISTS retries (
+    timer_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    tag TEXT,
+    interval_seconds INTEGER,
+    cron TEXT,
+    attempts INTEGER NOT NULL,
+    retry_at REAL NOT NULL,
+    PRIMARY KEY (timer_id, expires_at)
+);
+CREATE INDEX IF NOT EXISTS retries_retry_at ON retries (retry_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    timer_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    tag TEXT,
+    interval_seconds INTEGER,
+    cron TEXT,
+    attempts INTEGER NOT NULL,
+    failed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dead_letters_failed_at ON dead_letters (failed_at);
+CREATE TABLE IF NOT EXISTS inflight (
+    timer_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    tag TEXT,
+    interval_seconds INTEGER,
+    cron TEXT,
+    attempts INTEGER NOT NULL,
+    lease_until REAL NOT NULL,
+    PRIMARY KEY (timer_id, expires_at)
+);
+CREATE INDEX IF NOT EXISTS inflight_lease_until ON inflight (lease_until);
+"""
+COLUMNS = "timer_id, url, expires_at, tag, interval_seconds, cron"
+# Columns added after the first release, with their types, for upgrading existing databases.
+ADDED_COLUMNS = {"tag": "TEXT", "interval_seconds": "INTEGER", "cron": "TEXT"}
+# Tables of claimed timers, keyed by occurrence since a recurring timer can be claimed again
+# before the outcome of its previous occurrence is recorded.
+OCCURRENCE_TABLES = ("retries", "inflight")
+
+TimerRow = tuple[str, str, float, str | None, int | None, str | None]
+
+T = TypeVar("T")
+
+
+class SqliteTimerRepository(TimerRepository):
+    def __init__(
+        self,
+        path: str,
+        executed_ttl_seconds: float | None = None,
+        executed_max_count: int | None = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        dead_letter_ttl_seconds: float | None = None,
+        dead_letter_max_count: int | None = None,
+    ) -> None:
+        self.path = path
+        self.executed_ttl_seconds = executed_ttl_seconds
+        self.executed_max_count = executed_max_count
+        self.dead_letter_ttl_seconds = dead_letter_ttl_seconds
+        self.dead_letter_max_count = dead_letter_max_count
+        self.lease_seconds = lease_seconds
+        self.watchers: set[asyncio.Queue[tuple[int, datetime]]] = set()
+        self.pending_inserts: list[tuple[list[TimerRow], asyncio.Future[None]]] = []
+        self.insert_task: asyncio.Task[None] | None = None
+        # sqlite3 blocks, so every statement runs on one dedicated thread that owns the connection.
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timer-sqlite")
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        # WAL with synchronous=NORMAL only syncs on checkpoints: a commit survives a process
+        # crash, and a power loss can at most roll back the last few transactions.
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        for table in ("timers", "executed_timers"):
+            existing = {column[1] for column in self.connection.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS timers_tag ON timers (tag) WHERE tag IS NOT NULL")
+        self._key_by_occurrence()
+
+    def _key_by_occurrence(self) -> None:
+        # Databases from before occurrences were tracked key these tables by the timer id alone,
+        # and SQLite cannot change a primary key in place, so they are rebuilt.
+        tables = [table for table in OCCURRENCE_TABLES if self._primary_key(table) == ["timer_id"]]
+        if not tables:
+            return
+        with self._transaction():
+            for table in tables:
+                for index in self.connection.execute(f"PRAGMA index_list({table})").fetchall():
+                    if index[3] == "c":
+                        self.connection.execute(f"DROP INDEX {index[1]}")
+                self.connection.execute(f"ALTER TABLE {table} RENAME TO {table}_by_id")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self.connection.execute(statement)
+            for table in tables:
+                columns = ", ".join(
+                    column[1] for column in self.connection.execute(f"PRAGMA table_info({table}_by_id)")
+                )
+                self.connection.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_by_id")
+                self.connection.execute(f"DROP TABLE {table}_by_id")
+
+    def _primary_key(self, table: str) -> list[str]:
+        columns = self.connection.execute(f"PRAGMA table_info({table})").fetchall()
+        return [column[1] for column in sorted(columns, key=lambda column: column[5]) if column[5]]
+
+    async def _run(self, function: Callable[..., T], *args) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def close(self) -> None:
+        if self.insert_task is not None:
+            await self.insert_task
+        await self._run(self.connection.close)
+        self.executor.shutdown()
+
+    async def get_timer(self, timer_id: str) -> TimerTask | None:
+        rows = await self._run(self._select, "timers", [timer_id])
+        return _row_to_timer(rows[0]) if rows else None
+
+    async def delete_timer(self, timer_id: str) -> TimerTask | None:
+        rows = await self._run(self._delete_timer, timer_id)
+        return _row_to_timer(rows[0]) if rows else None
+
+    def _delete_timer(self, timer_id: str) -> list[tuple]:
+        return self.connection.execute(
+            f"DELETE FROM timers WHERE timer_id = ? RETURNING {COLUMNS}", (timer_id,)
+        ).fetchall()
+
+    async def delete_timers(self, timer_ids: Sequence[str]) -> list[TimerTask]:
+        rows = await self._run(self._delete_timers, list(timer_ids))
+        return [_row_to_timer(row) for row in rows]
+
+    def _delete_timers(self, timer_ids: list[str]) -> list[tuple]:
+        rows = []
+        with self._transaction():
+            for start in range(0, len(timer_ids), MAX_QUERY_PARAMS):
+                chunk = timer_ids[start : start + MAX_QUERY_PARAMS]
+                query = f"DELETE FROM timers WHERE timer_id IN ({', '.join('?' * len(chunk))}) RETURNING {COLUMNS}"
+                rows.extend(self.connection.execute(query, chunk).fetchall())
+        return rows
+
+    async def delete_timers_by_tag(self, tag: str) -> list[TimerTask]:
+        rows = await self._run(self._delete_timers_by_tag, tag)
+        return [_row_to_timer(row) for row in rows]
+
+    def _delete_timers_by_tag(self, tag: str) -> list[tuple]:
+        return self.connection.execute(f"DELETE FROM timers WHERE tag = ? RETURNING {COLUMNS}", (tag,)).fetchall()
+
+    async def reschedule_timer(self, timer_id: str, expires_at: datetime) -> TimerTask | None:
+        rows = await self._run(self._reschedule_timer, timer_id, expires_at.timestamp())
+        if not rows:
+            return None
+        for queue in self.watchers:
+            queue.put_nowait((SHARD, expires_at))
+        return _row_to_timer(rows[0])
+
+    def _reschedule_timer(self, timer_id: str, expires_at: float) -> list[tuple]:
+        return self.connection.execute(
+            f"UPDATE timers SET expires_at = ? WHERE timer_id = ? RETURNING {COLUMNS}", (expires_at, timer_id)
+        ).fetchall()
+
+    async def create_timer(self, timer: TimerTask) -> None:
+        await self.create_timers([timer])
+
+    async def create_timers(self, timers: Sequence[TimerTask]) -> list[Exception | None]:
+        # All timers are written in one transaction, so they are either all created or the call raises.
+        if not timers:
+            return []
+        future = asyncio.get_running_loop().create_future()
+        self.pending_inserts.append(([_timer_to_row(timer) for timer in timers], future))
+        if self.insert_task is None:
+            self.insert_task = asyncio.create_task(self._flush_inserts())
+        await future
+        expires_at = min(timer.expires_at for timer in timers)
+        for queue in self.watchers:
+            queue.put_nowait((SHARD, expires_at))
+        return [None] * len(timers)
+
+    async def _flush_inserts(self) -> None:
+        # Group commit: creates arriving while a transaction is in flight are written
+        # together by the next one, so concurrent requests share a single commit.
+        try:
+            while self.pending_inserts:
+                inserts, self.pending_inserts = self.pending_inserts, []
+                try:
+                    await self._run(self._insert_timers, [row for rows, _ in inserts for row in rows])
+                except Exception as e:
+                    for _, future in inserts:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    for _, future in inserts:
+                        if not future.done():
+                            future.set_result(None)
+        finally:
+            self.insert_task = None
+
+    def _insert_timers(self, rows: list[TimerRow]) -> None:
+        with self._transaction():
+            self.connection.executemany(f"INSERT OR REPLACE INTO timers ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    async def claim_due_timers(
+        self,
+        now: datetime,
+        limit: int,
+        shards: Sequence[int] | None = None,
+        after: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[TimerTask]:
+        if shards is not None and SHARD not in shards:
+            return []
+        return await self._run(
+            self._claim_due_timers,
+            now,
+            limit,
+            after.timestamp() if after is not None else -math.inf,
+            (until or now).timestamp(),
+        )
+
+    def _claim_due_timers(self, now: datetime, limit: int, after: float, until: float) -> list[TimerTask]:
+        # A range scan over the expires_at index; the transaction keeps other processes
+        # sharing the file from claiming the same rows, and re-arms recurring timers with
+        # their next occurrence in the same step.
+        with self._transaction():
+            rows = self.connection.execute(
+                "DELETE FROM timers WHERE timer_id IN "
+                "(SELECT timer_id FROM timers WHERE expires_at > ? AND expires_at <= ? ORDER BY expires_at LIMIT ?) "
+                f"RETURNING {COLUMNS}",
+                (after, until, limit),
+            ).fetchall()
+            self._lease(rows, [0] * len(rows), now.timestamp())
+            timers = [_row_to_timer(row) for row in rows]
+            following = [next_timer(timer, now) for timer in timers]
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO timers ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                [_timer_to_row(timer) for timer in following if timer is not None],
+            )
+        return timers
+
+    async def get_next_expiry(self, shards: Sequence[int] | None = None) -> datetime | None:
+        if shards is not None and SHARD not in shards:
+            return None
+        (expires_at,) = await self._run(self._fetch_one, "SELECT MIN(expires_at) FROM timers")
+        if expires_at is None:
+            return None
+        return datetime.fromtimestamp(expires_at, timezone.utc)
+
+    def _fetch_one(self, query: str) -> tuple:
+        return self.connection.execute(query).fetchone()
+
+    async def watch_new_timers(self) -> AsyncIterator[tuple[int, datetime]]:
+        # Only timers created through this process are announced; the executor still
+        # polls at least every max_idle_seconds for anything written by another one.
+        queue: asyncio.Queue[tuple[int, datetime]] = asyncio.Queue()
+        self.watchers.add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.watchers.discard(queue)
+
+    async def add_executed_task(self, timer: TimerTask) -> None:
+        row = (*_timer_to_row(timer), datetime.now(timezone.utc).timestamp())
+        await self._run(self._insert_executed_timer, row)
+
+    def _insert_executed_timer(self, row: tuple) -> None:
+        with self._transaction():
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO executed_timers ({COLUMNS}, executed_at) VALUES (?, ?, ?, ?, ?, ?, ?)", row
+            )
+            self.connection.execute("DELETE FROM inflight WHERE timer_id = ? AND expires_at = ?", (row[0], row[2]))
+            self._prune("executed_timers", "executed_at", self.executed_ttl_seconds, self.executed_max_count, row[-1])
+
+    def _prune(
+        self, table: str, time_column: str, ttl_seconds: float | None, max_count: int | None, now: float
+    ) -> None:
+        if ttl_seconds is not None:
+            self.connection.execute(f"DELETE FROM {table} WHERE {time_column} <= ?", (now - ttl_seconds,))
+        if max_count is not None:
+            self.connection.execute(
+                f"DELETE FROM {table} WHERE timer_id IN "
+                f"(SELECT timer_id FROM {table} ORDER BY {time_column} DESC LIMIT -1 OFFSET ?)",
+                (max_count,),
+            )
+
+    async def add_retry(self, timer: TimerTask, attempts: int, retry_at: datetime) -> None:
+        await self._run(
+            self._record_outcome,
+            f"INSERT OR REPLACE INTO retries ({COLUMNS}, attempts, retry_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (*_timer_to_row(timer), attempts, retry_at.timestamp()),
+        )
+
+    async def claim_due_retries(self, now: datetime, limit: int) -> list[tuple[TimerTask, int]]:
+        rows = await self._run(self._claim_due_retries, now.timestamp(), limit)
+        return [(_row_to_timer(row[:-1]), row[-1]) for row in rows]
+
+    def _claim_due_retries(self, now: float, limit: int) -> list[tuple]:
+        with self._transaction():
+            rows = self.connection.execute(
+                "DELETE FROM retries WHERE rowid IN "
+                "(SELECT rowid FROM retries WHERE retry_at <= ? ORDER BY retry_at LIMIT ?) "
+                f"RETURNING {COLUMNS}, attempts",
+                (now, limit),
+            ).fetchall()
+            self._lease([row[:-1] for row in rows], [row[-1] for row in rows], now)
+        return rows
+
+    def _lease(self, rows: list[tuple], attempts: list[int], now: float) -> None:
+        # Claimed timers stay in the inflight table until their outcome is recorded, so a
+        # timer whose executor dies before that is delivered again once its lease runs out.
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO inflight ({COLUMNS}, attempts, lease_until) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(*row, row_attempts, now + self.lease_seconds) for row, row_attempts in zip(rows, attempts)],
+        )
+
+    async def extend_leases(self, timers: Sequence[TimerTask], now: datetime) -> None:
+        occurrences = [(timer.timer_id, timer.expires_at.timestamp()) for timer in timers]
+        await self._run(self._extend_leases, occurrences, now.timestamp() + self.lease_seconds)
+
+    def _extend_leases(self, occurrences: list[tuple[str, float]], lease_until: float) -> None:
+        # Occurrences whose outcome was recorded in the meantime have no row left to update.
+        with self._transaction():
+            self.connection.executemany(
+                "UPDATE inflight SET lease_until = ? WHERE timer_id = ? AND expires_at = ?",
+                [(lease_until, timer_id, expires_at) for timer_id, expires_at in occurrences],
+            )
+
+    async def requeue_expired_leases(self, now: datetime, limit: int) -> int:
+        return await self._run(self._requeue_expired_leases, now.timestamp(), limit)
+
+    def _requeue_expired_leases(self, now: float, limit: int) -> int:
+        with self._transaction():
+            rows = self.connection.execute(
+                "DELETE FROM inflight WHERE rowid IN "
+                "(SELECT rowid FROM inflight WHERE lease_until <= ? ORDER BY lease_until LIMIT ?) "
+                f"RETURNING {COLUMNS}, attempts",
+                (now, limit),
+            ).fetchall()
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO retries ({COLUMNS}, attempts, retry_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(*row, now) for row in rows],
+            )
+        return len(rows)
+
+    async def add_dead_letter(self, timer: TimerTask, attempts: int) -> None:
+        await self._run(
+            self._insert_dead_letter, (*_timer_to_row(timer), attempts, datetime.now(timezone.utc).timestamp())
+        )
+
+    def _insert_dead_letter(self, row: tuple) -> None:
+        with self._transaction():
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO dead_letters ({COLUMNS}, attempts, failed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+            self.connection.execute("DELETE FROM inflight WHERE timer_id = ? AND expires_at = ?", (row[0], row[2]))
+            self._prune("dead_letters", "failed_at", self.dead_letter_ttl_seconds, self.dead_letter_max_count, row[-1])
+
+    def _record_outcome(self, query: str, params: tuple) -> None:
+        # Recording what happened to a claimed timer releases its lease; params start with its row.
+        with self._transaction():
+            self.connection.execute(query, params)
+            self.connection.execute(
+                "DELETE FROM inflight WHERE timer_id = ? AND expires_at = ?", (params[0], params[2])
+            )
+
+    async def get_timer_counts(self, now: datetime) -> dict[str, int]:
+        executed_after = float("-inf")
+        if self.executed_ttl_seconds is not None:
+            executed_after = now.timestamp() - self.executed_ttl_seconds
+        pending, due, retrying, dead_letter, in_flight, executed = await self._run(
+            self._fetch_counts, now.timestamp(), executed_after
+        )
+        return {
+            "pending": pending,
+            "due": due,
+            "retrying": retrying,
+            "dead_letter": dead_letter,
+            "in_flight": in_flight,
+            "executed": executed,
+        }
+
+    def _fetch_counts(self, now: float, executed_after: float) -> tuple:
+        return self.connection.execute(
+            "SELECT (SELECT COUNT(*) FROM timers), (SELECT COUNT(*) FROM timers WHERE expires_at <= ?), "
+            "(SELECT COUNT(*) FROM retries), (SELECT COUNT(*) FROM dead_letters), (SELECT COUNT(*) FROM inflight), "
+            "(SELECT COUNT(*) FROM executed_timers WHERE executed_at > ?)",
+            (now, executed_after),
+        ).fetchone()
+
+    async def get_executed_task(self, timer_id: str) -> TimerTask | None:
+        rows = await self._run(self._select, "executed_timers", [timer_id])
+        return _row_to_timer(rows[0]) if rows else None
+
+    async def lookup_timer(self, timer_id: str) -> TimerTask | None:
+        return (await self.lookup_timers([timer_id])).get(timer_id)
+
+    async def lookup_timers(self, timer_ids: Sequence[str]) -> dict[str, TimerTask]:
+        if not timer_ids:
+            return {}
+        records = await self._run(self._lookup_timers, list(timer_ids))
+        # Timers being delivered, retried or given up on have fired as well, and pending
+        # records win over all others with the same id.
+        timers = {}
+        for rows in records:
+            timers.update({row[0]: _row_to_timer(row) for row in rows})
+        return timers
+
+    def _lookup_timers(self, timer_ids: list[str]) -> list[list[tuple]]:
+        tables = ("executed_timers", "dead_letters", "retries", "inflight", "timers")
+        return [self._select(table, timer_ids) for table in tables]
+
+    def _select(self, table: str, timer_ids: list[str]) -> list[tuple]:
+        # Executed and dead-lettered records past their TTL may not have been pruned yet.
+        retention = {
+            "executed_timers": ("executed_at", self.executed_ttl_seconds),
+            "dead_letters": ("failed_at", self.dead_letter_ttl_seconds),
+        }
+        rows = []
+        for start in range(0, len(timer_ids), MAX_QUERY_PARAMS):
+            chunk = timer_ids[start : start + MAX_QUERY_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            if table in retention:
+                time_column, ttl_seconds = retention[table]
+                kept_after = float("-inf")
+                if ttl_seconds is not None:
+                    kept_after = datetime.now(timezone.utc).timestamp() - ttl_seconds
+                query = f"SELECT {COLUMNS} FROM {table} WHERE timer_id IN ({placeholders}) AND {time_column} > ?"
+                rows.extend(self.connection.execute(query, [*chunk, kept_after]).fetchall())
+            else:
+                query = f"SELECT {COLUMNS} FROM {table} WHERE timer_id IN ({placeholders})"
+                rows.extend(self.connection.execute(query, chunk).fetchall())
+        return rows
+
+    def _transaction(self) -> sqlite3.Connection:
+        # The connection runs in autocommit mode; used as a context manager it commits or
+        # rolls back, but the transaction has to be opened explicitly.
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+
+def _row_to_timer(row: tuple) -> TimerTask:
+    timer_id, url, expires_at, tag, interval_seconds, cron = row
+    return TimerTask(
+        timer_id=timer_id,
+        url=parse_url(url),
+        expires_at=datetime.fromtimestamp(expires_at, timezone.utc),
+        tag=tag,
+        interval_seconds=interval_seconds,
+        cron=cron,
+    )
+
+
+def _timer_to_row(timer: TimerTask) -> TimerRow:
+    return (
+        timer.timer_id,
+        str(timer.url),
+        timer.expires_at.timestamp(),
+        timer.tag,
+        timer.interval_seconds,
+        timer.cron,
+    )
@@ -0,0 +1,65 @@
+import abc
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from pydantic import HttpUrl
+
+from app.models.timer import TimerTask
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# ASCII unit separator; validated URLs percent-encode control characters, so it cannot clash.
+FIELD_SEPARATOR = "\x1f"
+URL_CACHE_SIZE = 4096
+
+
+class TimerCodec(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def encode(self, timer: TimerTask) -> str:
+        ...
+
+
+class JsonTimerCodec(TimerCodec):
+    def encode(self, timer: TimerTask) -> str:
+        return timer.model_dump_json()
+
+
+class CompactTimerCodec(TimerCodec):
+    # The timer id is already part of the key, so only the expiry (as integer
+    # microseconds, which round-trips exactly) and the URL are stored.
+    def encode(self, timer: TimerTask) -> str:
+        micros = (timer.expires_at - EPOCH) // timedelta(microseconds=1)
+        fields = [str(micros), str(timer.url), timer.tag or "", str(timer.interval_seconds or ""), timer.cron or ""]
+        # Optional fields are positional, trailing empty ones are left out.
+        while not fields[-1]:
+            fields.pop()
+        return FIELD_SEPARATOR.join(fields)
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def parse_url(url: str) -> HttpUrl:
+    # Callback URLs repeat across many timers and validating one is most of the cost of
+    # building a timer from a stored record, so validated (immutable) URLs are shared.
+    return HttpUrl(url)
+
+
+def decode_timer(timer_id: str, payload: str) -> TimerTask:
+    # Both formats are always readable so a deployment can switch formats
+    # while older records are still stored.
+    if payload.startswith("{"):
+        # pydantic's compiled JSON validator beats any decoding done in Python, model_construct included.
+        return TimerTask.model_validate_json(payload)
+    fields = payload.split(FIELD_SEPARATOR) + [""] * 3
+    return TimerTask(
+        timer_id=timer_id,
+        url=parse_url(fields[1]),
+        expires_at=EPOCH + timedelta(microseconds=int(fields[0])),
+        tag=fields[2] or None,
+        interval_seconds=int(fields[3]) if fields[3] else None,
+        cron=fields[4] or None,
+    )
+
+
+CODECS: dict[str, TimerCodec] = {
+    "json": JsonTimerCodec(),
+    "compact": CompactTimerCodec(),
+}
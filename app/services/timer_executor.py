@@ -1,12 +1,30 @@
 import asyncio
 import logging
-import sys
-from contextlib import AsyncExitStack
-from typing import Optional
+import random
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import AsyncIterator, Optional, Sequence
 
 import aiohttp
 
-from app.repositories.timer_repo import TimerRepository
+from app.models.timer import TimerTask
+from app.repositories.shard_coordinator import ShardCoordinator
+from app.repositories.timer_repo import DEFAULT_LEASE_SECONDS, TimerRepository
+from app.services.host_limiter import (
+    DEFAULT_COOLDOWN_SECONDS,
+    DEFAULT_FAILURE_THRESHOLD,
+    HostLimiter,
+)
+from app.services.metrics import (
+    CLAIM_BATCH_SIZE,
+    DISPATCH_DURATION,
+    FIRING_LATENESS,
+    TIMERS_DROPPED,
+)
+from app.services.token_bucket import TokenBucket
 
 
 class Response:
@@ -35,58 +53,514 @@ def get_response_message(status: int) -> str:
             return "Unknown Error"
 
 
+class DeliveryResult(str, Enum):
+    DELIVERED = "delivered"
+    # The callback may succeed later: connection errors, timeouts, 408, 429 and 5xx.
+    FAILED = "failed"
+    # The endpoint refused the callback, retrying would not change that.
+    REJECTED = "rejected"
+
+
+def get_delivery_result(status: int) -> DeliveryResult:
+    if status < 400:
+        return DeliveryResult.DELIVERED
+    if status in (408, 429) or status >= 500:
+        return DeliveryResult.FAILED
+    return DeliveryResult.REJECTED
+
+
 MAX_TIMEOUT_SECONDS = 5
+# Upper bound on how long the scheduler sleeps without re-reading the next
+# expiry, in case a wakeup notification is lost.
+DEFAULT_MAX_IDLE_SECONDS = 5.0
+WATCH_RETRY_SECONDS = 1.0
+# How long the scheduler backs off after failing to claim timers or read the next expiry.
+SCHEDULER_RETRY_SECONDS = 1.0
+DEFAULT_CLAIM_BATCH_SIZE = 100
+DEFAULT_MAX_IN_FLIGHT = 100
+DEFAULT_MAX_IN_FLIGHT_PER_HOST = 10
+# Claimed timers parked behind a saturated host do not hold an in-flight slot,
+# so the number of outstanding dispatches is bounded separately.
+DISPATCH_BACKLOG_FACTOR = 2
+# Timers claimed for a host that already has a full backlog of parked dispatches are
+# put back on the retry queue for this long, so they do not take the slots of other hosts.
+HOST_BACKLOG_DEFER_SECONDS = 1.0
+# Timers whose callback keeps being deferred are dead-lettered once they are this late,
+# so a host that never comes back does not keep them cycling through the retry queue.
+DEFAULT_DEFER_MAX_SECONDS = 3600.0
+# Failed callbacks are redelivered with their own, smaller concurrency limit, so
+# endpoints that keep failing cannot take dispatch slots from due timers.
+DEFAULT_MAX_RETRY_IN_FLIGHT = 25
+DEFAULT_RETRY_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BASE_SECONDS = 1.0
+DEFAULT_RETRY_MAX_SECONDS = 300.0
+RETRY_POLL_SECONDS = 1.0
+# Timers whose executor died before recording the outcome of their callback are
+# requeued once their lease has expired; how often that is checked for.
+REAP_INTERVAL_SECONDS = 5.0
+# The leases of timers still being dispatched, e.g. waiting for a busy host, are renewed
+# this many times per lease, so they only run out when their executor is gone.
+LEASE_RENEWALS = 3
+# While rate limited in catch-up mode the scheduler polls instead of sleeping until
+# the next expiry, which lies in the past; this bounds how late fresh timers get.
+CATCHUP_POLL_SECONDS = 0.1
+# Connection pool defaults match aiohttp's own. The per-host limit defaults to none
+# since callbacks to a single host are already bounded by its HostLimiter.
+DEFAULT_HTTP_MAX_CONNECTIONS = 100
+DEFAULT_HTTP_MAX_CONNECTIONS_PER_HOST = 0
+DEFAULT_HTTP_DNS_CACHE_TTL_SECONDS = 10
+DEFAULT_HTTP_KEEPALIVE_SECONDS = 15.0
 
 
 class TimerExecutor:
-    def __init__(self, timer_repository: TimerRepository) -> None:
+    def __init__(
+        self,
+        timer_repository: TimerRepository,
+        claim_batch_size: int = DEFAULT_CLAIM_BATCH_SIZE,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_in_flight_per_host: int = DEFAULT_MAX_IN_FLIGHT_PER_HOST,
+        max_idle_seconds: float = DEFAULT_MAX_IDLE_SECONDS,
+        shard_coordinator: ShardCoordinator | None = None,
+        max_retry_in_flight: int = DEFAULT_MAX_RETRY_IN_FLIGHT,
+        retry_max_attempts: int = DEFAULT_RETRY_MAX_ATTEMPTS,
+        retry_base_seconds: float = DEFAULT_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = DEFAULT_RETRY_MAX_SECONDS,
+        breaker_failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        breaker_cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS,
+        http_max_connections: int = DEFAULT_HTTP_MAX_CONNECTIONS,
+        http_max_connections_per_host: int = DEFAULT_HTTP_MAX_CONNECTIONS_PER_HOST,
+        http_dns_cache_ttl_seconds: int = DEFAULT_HTTP_DNS_CACHE_TTL_SECONDS,
+        http_keepalive_seconds: float = DEFAULT_HTTP_KEEPALIVE_SECONDS,
+        catchup_after_seconds: float | None = None,
+        catchup_max_rate: float | None = None,
+        catchup_drop_after_seconds: float | None = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        defer_max_seconds: float = DEFAULT_DEFER_MAX_SECONDS,
+    ) -> None:
         self.timer_repository = timer_repository
+        self.shard_coordinator = shard_coordinator
+        self.claim_batch_size = claim_batch_size
+        self.max_in_flight = max_in_flight
+        self.max_in_flight_per_host = max_in_flight_per_host
+        self.max_outstanding = max_in_flight * DISPATCH_BACKLOG_FACTOR
+        self.max_idle_seconds = max_idle_seconds
+        self.max_retry_in_flight = max_retry_in_flight
+        self.retry_max_attempts = retry_max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.breaker_failure_threshold = breaker_failure_threshold
+        self.breaker_cooldown_seconds = breaker_cooldown_seconds
+        self.defer_max_seconds = defer_max_seconds
+        self.http_max_connections = http_max_connections
+        self.http_max_connections_per_host = http_max_connections_per_host
+        self.http_dns_cache_ttl_seconds = http_dns_cache_ttl_seconds
+        self.http_keepalive_seconds = http_keepalive_seconds
+        # Timers more than catchup_after_seconds late form a backlog, typically after an outage.
+        # Fresh timers are claimed first and the backlog at most catchup_max_rate per second.
+        self.catchup_after_seconds = catchup_after_seconds
+        self.catchup_bucket = TokenBucket(catchup_max_rate) if catchup_max_rate is not None else None
+        self.catchup_drop_after_seconds = catchup_drop_after_seconds
+        self.catching_up = False
+        self.reap_interval_seconds = min(REAP_INTERVAL_SECONDS, lease_seconds / LEASE_RENEWALS)
+        # The claimed timers whose outcome is not recorded yet, by the dispatch delivering them.
+        self.leased_timers: dict[asyncio.Task, TimerTask] = {}
+        self.retry_in_flight = asyncio.Semaphore(max_retry_in_flight)
+        self.retry_dispatches: set[asyncio.Task] = set()
+        self.wakeup = asyncio.Event()
+        self.wake_at: float | None = None
+        self.in_flight = asyncio.Semaphore(max_in_flight)
+        self.host_limiters: dict[str, HostLimiter] = {}
+        self.dispatches: set[asyncio.Task] = set()
+        # Dispatches still waiting for a slot of their host, and how many there are per host. They
+        # are bounded per host instead of counting towards the outstanding dispatches, so a slow
+        # host cannot hold up the timers of all the others.
+        self.parked: set[asyncio.Task] = set()
+        self.host_backlog: Counter[str] = Counter()
+        self.max_host_backlog = max_in_flight_per_host * DISPATCH_BACKLOG_FACTOR
         self.exit_stack = AsyncExitStack()
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        stream_handler = logging.StreamHandler(sys.stdout)
-        log_formatter = logging.Formatter(
-            "%(asctime)s [%(processName)s: %(process)d] [%(threadName)s: %(thread)d] [%(levelname)s] %(name)s: %(message)s"
-        )
-        stream_handler.setFormatter(log_formatter)
-        self.logger.addHandler(stream_handler)
         self.task = None
+        self.watch_task = None
+        self.retry_task = None
+        self.reap_task = None
 
     async def start(self) -> None:
-        self.http_session = await self.exit_stack.enter_async_context(aiohttp.ClientSession())
+        connector = aiohttp.TCPConnector(
+            limit=self.http_max_connections,
+            limit_per_host=self.http_max_connections_per_host,
+            use_dns_cache=self.http_dns_cache_ttl_seconds > 0,
+            ttl_dns_cache=self.http_dns_cache_ttl_seconds,
+            keepalive_timeout=self.http_keepalive_seconds,
+        )
+        self.http_session = await self.exit_stack.enter_async_context(aiohttp.ClientSession(connector=connector))
+        if self.shard_coordinator is not None:
+            # Newly owned shards may hold due timers, so the scheduler checks them right away.
+            await self.shard_coordinator.start(self.wakeup.set)
 
         async def _scheduler():
             try:
                 self.logger.info("Scheduler started")
                 while True:
-                    await asyncio.sleep(0.1)
-                    task_id = await self.timer_repository.get_scheduled_task_id()
-                    if task_id is None:
-                        continue
-                    task = await self.timer_repository.delete_timer(task_id)
-                    self.logger.info(f"Got task: {task}, and deleting it")
-                    if task is None:
-                        continue
-                    await self.execute_task(str(task.url, task.timer_id))
-                    await self.timer_repository.add_executed_task(task)
+                    try:
+                        await self._schedule_due_timers()
+                    except Exception as e:
+                        self.logger.error("Error scheduling due timers: %s", e)
+                        await asyncio.sleep(SCHEDULER_RETRY_SECONDS)
             except asyncio.CancelledError:
                 self.logger.info("Stopping scheduler")
 
+        async def _watch_new_timers():
+            try:
+                while True:
+                    try:
+                        async for shard, expires_at in self.timer_repository.watch_new_timers():
+                            shards = self.owned_shards()
+                            if shards is not None and shard not in shards:
+                                continue
+                            if self.wake_at is None or expires_at.timestamp() < self.wake_at:
+                                self.wakeup.set()
+                    except Exception as e:
+                        self.logger.error("Error watching for new timers: %s", e)
+                    await asyncio.sleep(WATCH_RETRY_SECONDS)
+            except asyncio.CancelledError:
+                self.logger.info("Stopping new timer watcher")
+
+        async def _retrier():
+            try:
+                while True:
+                    outstanding = self.max_retry_in_flight * DISPATCH_BACKLOG_FACTOR - len(
+                        self.retry_dispatches - self.parked
+                    )
+                    limit = min(self.claim_batch_size, outstanding)
+                    retries = []
+                    if limit > 0:
+                        try:
+                            retries = await self.timer_repository.claim_due_retries(datetime.now(timezone.utc), limit)
+                        except Exception as e:
+                            self.logger.error("Error claiming retries: %s", e)
+                        for task, attempts in retries:
+                            self._start_dispatch(task, attempts, self.retry_dispatches)
+                    self._forget_idle_hosts()
+                    # Retries are not latency sensitive, so they are polled for rather than watched.
+                    if limit <= 0 or len(retries) < limit:
+                        await asyncio.sleep(RETRY_POLL_SECONDS)
+            except asyncio.CancelledError:
+                self.logger.info("Stopping retrier")
+
+        async def _reaper():
+            try:
+                while True:
+                    try:
+                        await self.renew_leases()
+                    except Exception as e:
+                        self.logger.error("Error renewing leases: %s", e)
+                    try:
+                        await self.reap_expired_leases()
+                    except Exception as e:
+                        self.logger.error("Error requeueing expired leases: %s", e)
+                    await asyncio.sleep(self.reap_interval_seconds)
+            except asyncio.CancelledError:
+                self.logger.info("Stopping reaper")
+
         self.task = asyncio.create_task(_scheduler())  # type: ignore
+        self.watch_task = asyncio.create_task(_watch_new_timers())  # type: ignore
+        self.retry_task = asyncio.create_task(_retrier())  # type: ignore
+        self.reap_task = asyncio.create_task(_reaper())  # type: ignore
+
+    async def _schedule_due_timers(self) -> None:
+        free_slots = self.max_outstanding - len(self.dispatches - self.parked)
+        if free_slots <= 0:
+            await asyncio.wait(self.dispatches, return_when=asyncio.FIRST_COMPLETED)
+            return
+        limit = min(self.claim_batch_size, free_slots)
+        tasks = await self._claim_due_timers(limit)
+        CLAIM_BATCH_SIZE.observe(len(tasks))
+        if tasks:
+            self.logger.info("Claimed %d due tasks", len(tasks))
+        for task in tasks:
+            if self._is_too_late(task):
+                dispatch = asyncio.create_task(self._drop(task))
+                self.dispatches.add(dispatch)
+                dispatch.add_done_callback(self.dispatches.discard)
+            else:
+                self._start_dispatch(task, 0, self.dispatches)
+        # A full batch means more timers may already be due, so keep draining.
+        if len(tasks) < limit:
+            if self.catching_up:
+                await self._sleep_while_catching_up()
+            else:
+                await self._sleep_until_next_timer()
+
+    def _start_dispatch(self, task: TimerTask, attempts: int, dispatches: set[asyncio.Task]) -> None:
+        host = task.url.host or ""
+        if self.host_backlog[host] >= self.max_host_backlog:
+            dispatch = asyncio.create_task(self._defer(task, attempts, HOST_BACKLOG_DEFER_SECONDS))
+        else:
+            dispatch = asyncio.create_task(self.dispatch(task, attempts))
+            self.parked.add(dispatch)
+            self.host_backlog[host] += 1
+        dispatches.add(dispatch)
+        dispatch.add_done_callback(dispatches.discard)
+
+    def _unpark(self, host: str) -> None:
+        dispatch = asyncio.current_task()
+        if dispatch not in self.parked:
+            return
+        self.parked.discard(dispatch)
+        self.host_backlog[host] -= 1
+        if not self.host_backlog[host]:
+            del self.host_backlog[host]
+
+    async def renew_leases(self) -> None:
+        if self.leased_timers:
+            await self.timer_repository.extend_leases(list(self.leased_timers.values()), datetime.now(timezone.utc))
+
+    async def reap_expired_leases(self) -> int:
+        requeued = 0
+        while True:
+            count = await self.timer_repository.requeue_expired_leases(
+                datetime.now(timezone.utc), self.claim_batch_size
+            )
+            requeued += count
+            if count < self.claim_batch_size:
+                break
+        if requeued:
+            self.logger.warning("Requeued %d timers whose lease expired before delivery", requeued)
+        return requeued
+
+    def is_running(self) -> bool:
+        # Each loop handles its own errors, so one that has finished means timers are no longer handled.
+        loops = (self.task, self.watch_task, self.retry_task, self.reap_task)
+        return all(loop is not None and not loop.done() for loop in loops)
+
+    def http_pool_stats(self) -> dict[str, int] | None:
+        # The session only exists once the executor has started.
+        http_session = getattr(self, "http_session", None)
+        connector = http_session.connector if http_session is not None else None
+        if not isinstance(connector, aiohttp.TCPConnector):
+            return None
+        # aiohttp has no public accessors for the pool's connections and waiters.
+        return {
+            "max_connections": connector.limit,
+            "max_connections_per_host": connector.limit_per_host,
+            "in_use": len(connector._acquired),
+            "idle": sum(len(connections) for connections in connector._conns.values()),
+            "waiting": sum(len(waiters) for waiters in connector._waiters.values()),
+            "dispatches": len(self.dispatches),
+            "retry_dispatches": len(self.retry_dispatches),
+        }
+
+    def owned_shards(self) -> Sequence[int] | None:
+        if self.shard_coordinator is None:
+            return None
+        return self.shard_coordinator.owned_shards()
+
+    async def _claim_due_timers(self, limit: int) -> list[TimerTask]:
+        now = datetime.now(timezone.utc)
+        shards = self.owned_shards()
+        if self.catchup_after_seconds is None:
+            return await self.timer_repository.claim_due_timers(now, limit, shards)
+        stale_before = now - timedelta(seconds=self.catchup_after_seconds)
+        if not self.catching_up:
+            # Without a backlog a single claim takes care of everything due. Timers are claimed oldest
+            # first, so a stale one among them means a backlog has built up, which is then split off.
+            tasks = await self.timer_repository.claim_due_timers(now, limit, shards)
+            stale_count = sum(1 for task in tasks if task.expires_at <= stale_before)
+            if stale_count:
+                self.logger.info("Catching up on overdue timers")
+                self.catching_up = True
+                # Those already claimed count against the rate of the backlog.
+                if self.catchup_bucket is not None:
+                    self.catchup_bucket.take(stale_count)
+            return tasks
+        tasks = await self.timer_repository.claim_due_timers(now, limit, shards, after=stale_before)
+        room = limit - len(tasks)
+        if room <= 0:
+            return tasks
+        # The backlog only gets what is left of the batch, so it cannot hold up fresh timers.
+        stale_limit = room if self.catchup_bucket is None else self.catchup_bucket.take(room)
+        stale = []
+        if stale_limit > 0:
+            stale = await self.timer_repository.claim_due_timers(now, stale_limit, shards, until=stale_before)
+            if self.catchup_bucket is not None:
+                self.catchup_bucket.give_back(stale_limit - len(stale))
+        # Without a token to spare there may still be a backlog, so keep checking.
+        catching_up = len(stale) == stale_limit
+        if catching_up != self.catching_up:
+            self.logger.info("Catching up on overdue timers" if catching_up else "Caught up on overdue timers")
+            self.catching_up = catching_up
+        return tasks + stale
+
+    def _is_too_late(self, task: TimerTask) -> bool:
+        if self.catchup_drop_after_seconds is None:
+            return False
+        lateness = datetime.now(timezone.utc) - task.expires_at
+        return lateness.total_seconds() > self.catchup_drop_after_seconds
+
+    async def _drop(self, task: TimerTask) -> None:
+        # Dropped timers are dead-lettered without an attempt, so they can still be inspected.
+        try:
+            self.logger.warning("Dropping task %s, it expired at %s", task.timer_id, task.expires_at)
+            TIMERS_DROPPED.inc()
+            await self.timer_repository.add_dead_letter(task, 0)
+        except Exception as e:
+            self.logger.error("Error dropping task %s: %s", task.timer_id, e)
+
+    async def _sleep_until_next_timer(self) -> None:
+        # Clear before reading the next expiry so a timer created in between still wakes us.
+        self.wakeup.clear()
+        self.wake_at = None
+        next_expiry = await self.timer_repository.get_next_expiry(self.owned_shards())
+        now = datetime.now(timezone.utc).timestamp()
+        delay = self.max_idle_seconds
+        if next_expiry is not None:
+            delay = min(max(next_expiry.timestamp() - now, 0.0), self.max_idle_seconds)
+        await self._wait_for_wakeup(now, delay)
+
+    async def _sleep_while_catching_up(self) -> None:
+        self.wakeup.clear()
+        delay = CATCHUP_POLL_SECONDS
+        if self.catchup_bucket is not None:
+            delay = min(self.catchup_bucket.wait_seconds(), CATCHUP_POLL_SECONDS)
+        await self._wait_for_wakeup(datetime.now(timezone.utc).timestamp(), delay)
+
+    async def _wait_for_wakeup(self, now: float, delay: float) -> None:
+        self.wake_at = now + delay
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.wake_at = None
+
+    async def dispatch(self, task: TimerTask, attempts: int = 0) -> None:
+        # attempts counts the earlier failed deliveries of this timer.
+        in_flight = self.in_flight if attempts == 0 else self.retry_in_flight
+        host = task.url.host or ""
+        dispatch = asyncio.current_task()
+        if dispatch is not None:
+            self.leased_timers[dispatch] = task
+        try:
+            async with self._host_limiter(host) as limiter:
+                async with limiter.slot():
+                    self._unpark(host)
+                    # Checked once a slot is free, so callbacks queued behind a host that has
+                    # just gone down are turned away instead of waiting out their timeouts.
+                    defer_seconds = limiter.admit()
+                    if defer_seconds is None:
+                        async with in_flight:
+                            if attempts == 0:
+                                now = datetime.now(timezone.utc)
+                                FIRING_LATENESS.observe(max((now - task.expires_at).total_seconds(), 0.0))
+                            result = await self.execute_task(str(task.url), task.timer_id)
+                        limiter.record(result == DeliveryResult.FAILED)
+            if defer_seconds is not None:
+                await self._defer(task, attempts, defer_seconds)
+            else:
+                await self._record_delivery(task, attempts + 1, result)
+        except Exception as e:
+            self.logger.error("Error dispatching task %s: %s", task.timer_id, e)
+        finally:
+            self._unpark(host)
+            if dispatch is not None:
+                del self.leased_timers[dispatch]
+
+    async def _defer(self, task: TimerTask, attempts: int, defer_seconds: float) -> None:
+        # The callback was never sent, so it goes to the retry queue without using up an attempt.
+        now = datetime.now(timezone.utc)
+        try:
+            if (now - task.expires_at).total_seconds() > self.defer_max_seconds:
+                self.logger.warning(
+                    "Giving up on task %s, %s has not taken it since %s", task.timer_id, task.url.host, task.expires_at
+                )
+                await self.timer_repository.add_dead_letter(task, attempts)
+                return
+            retry_at = now + timedelta(seconds=defer_seconds + random.uniform(0, RETRY_POLL_SECONDS))
+            self.logger.info(
+                "Deferring task %s to %s, %s is not taking callbacks", task.timer_id, retry_at, task.url.host
+            )
+            await self.timer_repository.add_retry(task, attempts, retry_at)
+        except Exception as e:
+            self.logger.error("Error deferring task %s: %s", task.timer_id, e)
+
+    async def _record_delivery(self, task: TimerTask, attempts: int, result: DeliveryResult | None) -> None:
+        if result == DeliveryResult.FAILED and attempts < self.retry_max_attempts:
+            retry_at = datetime.now(timezone.utc) + self.retry_delay(attempts)
+            self.logger.info("Retrying task %s at %s after %d attempts", task.timer_id, retry_at, attempts)
+            await self.timer_repository.add_retry(task, attempts, retry_at)
+        elif result in (DeliveryResult.FAILED, DeliveryResult.REJECTED):
+            self.logger.warning("Giving up on task %s after %d attempts", task.timer_id, attempts)
+            await self.timer_repository.add_dead_letter(task, attempts)
+        else:
+            await self.timer_repository.add_executed_task(task)
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        # Exponential backoff with jitter on its upper half, so callbacks that failed
+        # together do not all come back at the same moment.
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+    @asynccontextmanager
+    async def _host_limiter(self, host: str) -> AsyncIterator[HostLimiter]:
+        limiter = self.host_limiters.get(host)
+        if limiter is None:
+            limiter = self.host_limiters[host] = HostLimiter(
+                self.max_in_flight_per_host, self.breaker_failure_threshold, self.breaker_cooldown_seconds
+            )
+        limiter.users += 1
+        try:
+            yield limiter
+        finally:
+            limiter.users -= 1
+            if limiter.is_idle():
+                del self.host_limiters[host]
+
+    def _forget_idle_hosts(self) -> None:
+        # Hosts that failed recently are kept after their last callback; drop them once they are stale.
+        for host, limiter in list(self.host_limiters.items()):
+            if limiter.is_idle():
+                del self.host_limiters[host]
 
-    async def execute_task(self, url: str, timer_id: str) -> None:
-        self.logger.info(f"Executing task for url {url}")
+    async def execute_task(self, url: str, timer_id: str) -> DeliveryResult:
+        self.logger.debug("Sending callback for task %s to %s", timer_id, url)
+        start = time.perf_counter()
         try:
-            self.logger.info(f"Sending request to {url}")
             timeout = aiohttp.ClientTimeout(total=MAX_TIMEOUT_SECONDS)
             async with self.http_session.post(url, json={"id": timer_id}, timeout=timeout) as response:
-                self.logger.info(f"Executed task for url {url}")
-                self.logger.info(f"Response status: {response.status}")
-                self.logger.info(f"Response content: {await response.text()}")
-        except aiohttp.ClientError as e:
-            self.logger.error(f"Error executing task for url {url}: {e}")
+                # The body is drained either way so the connection goes back to the pool,
+                # but only decoded when it is going to be logged.
+                body = await response.read()
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    self.logger.debug(
+                        "Callback for task %s answered %d: %s",
+                        timer_id,
+                        response.status,
+                        body.decode(errors="replace"),
+                    )
+                DISPATCH_DURATION.observe(
+                    time.perf_counter() - start,
+                    status=str(response.status),
+                    message=get_response_message(response.status),
+                )
+                return get_delivery_result(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.error("Error executing task %s for url %s: %r", timer_id, url, e)
+            DISPATCH_DURATION.observe(time.perf_counter() - start, status="error", message=type(e).__name__)
+            return DeliveryResult.FAILED
 
     async def close(self):
         if self.task is not None:
             self.task.cancel()
+        if self.watch_task is not None:
+            self.watch_task.cancel()
+        if self.retry_task is not None:
+            self.retry_task.cancel()
+        # Claimed timers are no longer in the task set, so let their callbacks finish. The reaper keeps
+        # renewing their leases meanwhile, or other executors would deliver them a second time.
+        if self.dispatches or self.retry_dispatches:
+            await asyncio.gather(*self.dispatches, *self.retry_dispatches, return_exceptions=True)
+        if self.reap_task is not None:
+            self.reap_task.cancel()
+        if self.shard_coordinator is not None:
+            await self.shard_coordinator.close()
         await self.exit_stack.aclose()
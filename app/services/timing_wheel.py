@@ -0,0 +1,118 @@
+import heapq
+import math
+from operator import itemgetter
+from typing import Iterable
+
+DEFAULT_TICK_SECONDS = 0.001
+DEFAULT_WHEEL_SIZE = 256
+DEFAULT_LEVELS = 4
+DUE = -1
+
+
+class HierarchicalTimingWheel:
+    # Level L has wheel_size buckets of wheel_size ** L ticks each, so with the
+    # defaults the levels span 256 ms, 65 s, 4.6 h and 49 days. Entries always
+    # sit in a bucket after the current one of their level and cascade down a
+    # level once time reaches that bucket. Anything further out than the top
+    # level wraps around and is simply re-inserted when its slot comes up.
+    def __init__(
+        self,
+        start: float,
+        tick_seconds: float = DEFAULT_TICK_SECONDS,
+        wheel_size: int = DEFAULT_WHEEL_SIZE,
+        levels: int = DEFAULT_LEVELS,
+    ) -> None:
+        self.tick_seconds = tick_seconds
+        self.wheel_size = wheel_size
+        self.levels = levels
+        self.current = math.floor(start / tick_seconds)
+        self.slots: list[list[dict[str, float]]] = [[{} for _ in range(wheel_size)] for _ in range(levels)]
+        self.due: dict[str, float] = {}
+        self.locations: dict[str, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.locations
+
+    def add(self, key: str, deadline: float) -> None:
+        self.remove(key)
+        self._place(key, deadline)
+
+    def remove(self, key: str) -> bool:
+        location = self.locations.pop(key, None)
+        if location is None:
+            return False
+        level, index = location
+        if level == DUE:
+            del self.due[key]
+        else:
+            del self.slots[level][index][key]
+        return True
+
+    def pop_due(self, now: float, limit: int, after: float = -math.inf, until: float = math.inf) -> list[str]:
+        # Only entries with a deadline after `after` and up to `until` are popped.
+        self._advance(math.floor(now / self.tick_seconds))
+        due: Iterable[tuple[str, float]] = self.due.items()
+        if after > -math.inf or until < now:
+            due = [(key, deadline) for key, deadline in due if after < deadline <= until]
+        if len(self.due) <= limit:
+            keys = [key for key, _ in sorted(due, key=itemgetter(1))]
+        else:
+            keys = [key for key, _ in heapq.nsmallest(limit, due, key=itemgetter(1))]
+        for key in keys:
+            del self.due[key]
+            del self.locations[key]
+        return keys
+
+    def next_deadline(self) -> float | None:
+        # Returns the start of the earliest non-empty bucket: exact on the lowest
+        # level, a lower bound above it, where waking up cascades the bucket.
+        if self.due:
+            return self.current * self.tick_seconds
+        earliest = None
+        for level in range(self.levels):
+            width = self.wheel_size**level
+            current_bucket = self.current // width
+            for offset in range(1, self.wheel_size + 1):
+                bucket = current_bucket + offset
+                if self.slots[level][bucket % self.wheel_size]:
+                    start = bucket * width
+                    if earliest is None or start < earliest:
+                        earliest = start
+                    break
+        return None if earliest is None else earliest * self.tick_seconds
+
+    def _place(self, key: str, deadline: float) -> None:
+        tick = math.ceil(deadline / self.tick_seconds)
+        if tick <= self.current:
+            self.due[key] = deadline
+            self.locations[key] = (DUE, 0)
+            return
+        for level in range(self.levels):
+            width = self.wheel_size**level
+            if tick // width - self.current // width < self.wheel_size or level == self.levels - 1:
+                index = (tick // width) % self.wheel_size
+                self.slots[level][index][key] = deadline
+                self.locations[key] = (level, index)
+                return
+
+    def _advance(self, to_tick: int) -> None:
+        if to_tick <= self.current:
+            return
+        previous, self.current = self.current, to_tick
+        # Every bucket crossed on a level is emptied, including the one now holding
+        # the current tick. Lower levels go first so that entries cascading down
+        # only land in buckets that are still ahead.
+        for level in range(self.levels):
+            width = self.wheel_size**level
+            first, last = previous // width + 1, to_tick // width
+            for bucket in range(max(first, last - self.wheel_size + 1), last + 1):
+                index = bucket % self.wheel_size
+                entries = self.slots[level][index]
+                if not entries:
+                    continue
+                self.slots[level][index] = {}
+                for key, deadline in entries.items():
+                    self._place(key, deadline)
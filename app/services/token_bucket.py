@@ -0,0 +1,30 @@
+import time
+
+
+class TokenBucket:
+    # Hands out up to rate tokens per second, with bursts of at most capacity tokens.
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def take(self, count: int) -> int:
+        # Returns how many of the count tokens were available, those are used up.
+        self._refill()
+        taken = min(count, int(self.tokens))
+        self.tokens -= taken
+        return taken
+
+    def give_back(self, count: int) -> None:
+        self.tokens = min(self.tokens + count, self.capacity)
+
+    def wait_seconds(self) -> float:
+        # How long until the next whole token is available.
+        self._refill()
+        return max(1.0 - self.tokens, 0.0) / self.rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self.updated_at) * self.rate, self.capacity)
+        self.updated_at = now
@@ -0,0 +1,35 @@
+import argparse
+import asyncio
+
+from app.dependencies.settings import get_app_settings
+from app.dependencies.timer_repo_client import get_redis_db_client
+from app.services.redis_timer_repository import RedisTimerRepository
+from app.services.timer_codec import CODECS
+
+
+async def migrate(storage_format: str, batch_size: int) -> int:
+    settings = get_app_settings()
+    redis_client = get_redis_db_client(settings)
+    try:
+        timer_repo = RedisTimerRepository(
+            redis_client=redis_client,
+            shard_count=settings.timer_shard_count,
+            codec=CODECS[storage_format],
+        )
+        await timer_repo.load_scripts()
+        return await timer_repo.reencode_records(batch_size=batch_size)
+    finally:
+        await redis_client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rewrite stored timers in the given storage format.")
+    parser.add_argument("storage_format", choices=sorted(CODECS))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    rewritten = asyncio.run(migrate(args.storage_format, args.batch_size))
+    print(f"Rewrote {rewritten} timer records as {args.storage_format}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+
+from app.dependencies.settings import get_app_settings
+from app.dependencies.timer_repo_client import get_redis_db_client
+from app.services.redis_timer_repository import RedisTimerRepository
+
+
+async def reshard(previous_shard_count: int | None, batch_size: int) -> int:
+    settings = get_app_settings()
+    redis_client = get_redis_db_client(settings)
+    try:
+        timer_repo = RedisTimerRepository(redis_client=redis_client, shard_count=settings.timer_shard_count)
+        if previous_shard_count is None:
+            previous_shard_count = await timer_repo.stored_shard_count()
+        return await timer_repo.reshard_timers(previous_shard_count, batch_size=batch_size)
+    finally:
+        await redis_client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move pending timers to the shards of TIMER_SHARD_COUNT.")
+    parser.add_argument("--from-shard-count", type=int, help="defaults to the count the timers were stored with")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    moved = asyncio.run(reshard(args.from_shard_count, args.batch_size))
+    print(f"Moved {moved} timers to {get_app_settings().timer_shard_count} shards")
+
+
+if __name__ == "__main__":
+    main()
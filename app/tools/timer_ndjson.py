@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import sys
+import time
+from typing import IO, Iterable
+
+from app.dependencies.settings import get_app_settings
+from app.dependencies.timer_repo_client import get_redis_db_client
+from app.models.timer import TimerTask
+from app.repositories.timer_repo import TimerRepository
+from app.services.redis_timer_repository import RedisTimerRepository
+from app.services.timer_codec import CODECS
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+async def export_timers(timer_repo: RedisTimerRepository, output: IO[str], batch_size: int) -> int:
+    exported = 0
+    async for timers in timer_repo.scan_timers(batch_size=batch_size):
+        output.writelines(f"{timer.model_dump_json()}\n" for timer in timers)
+        exported += len(timers)
+    return exported
+
+
+async def import_timers(
+    timer_repo: TimerRepository, lines: Iterable[str], batch_size: int, max_rate: float | None = None
+) -> int:
+    # Timers are written a batch per round trip; max_rate paces the import when it shares
+    # Redis with a live deployment.
+    imported = 0
+    start = time.monotonic()
+    batch: list[TimerTask] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        batch.append(TimerTask.model_validate_json(line))
+        if len(batch) >= batch_size:
+            imported += await _import_batch(timer_repo, batch, imported, start, max_rate)
+            batch = []
+    if batch:
+        imported += await _import_batch(timer_repo, batch, imported, start, max_rate)
+    return imported
+
+
+async def _import_batch(
+    timer_repo: TimerRepository, batch: list[TimerTask], imported: int, start: float, max_rate: float | None
+) -> int:
+    if max_rate is not None:
+        delay = (imported + len(batch)) / max_rate - (time.monotonic() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+    errors = [error for error in await timer_repo.create_timers(batch) if error is not None]
+    if errors:
+        raise Exception(f"Failed to import {len(errors)} of {len(batch)} timers") from errors[0]
+    return len(batch)
+
+
+async def run(args: argparse.Namespace) -> int:
+    settings = get_app_settings()
+    redis_client = get_redis_db_client(settings)
+    try:
+        timer_repo = RedisTimerRepository(
+            redis_client=redis_client,
+            shard_count=settings.timer_shard_count,
+            codec=CODECS[settings.timer_storage_format],
+        )
+        await timer_repo.load_scripts()
+        if args.command == "export":
+            if args.path == "-":
+                return await export_timers(timer_repo, sys.stdout, args.batch_size)
+            with open(args.path, "w") as output:
+                return await export_timers(timer_repo, output, args.batch_size)
+        if args.path == "-":
+            return await import_timers(timer_repo, sys.stdin, args.batch_size, args.max_rate)
+        with open(args.path) as lines:
+            return await import_timers(timer_repo, lines, args.batch_size, args.max_rate)
+    finally:
+        await redis_client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export pending timers to NDJSON or import them from it.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Write every pending timer as one JSON object per line")
+    export_parser.add_argument("path", help="File to write, - for stdout")
+    import_parser = subparsers.add_parser("import", help="Create the timers read from an export")
+    import_parser.add_argument("path", help="File to read, - for stdin")
+    import_parser.add_argument("--max-rate", type=float, help="Timers per second to create at most")
+    for subparser in (export_parser, import_parser):
+        subparser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+    count = asyncio.run(run(args))
+    # Progress goes to stderr so an export can be piped straight into an import.
+    print(f"{args.command.capitalize()}ed {count} timers", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Load test the timer API and measure how precisely timers fire.
+
+Drives ``POST /timer`` and ``GET /timer/{id}`` at fixed request rates against a
+running API (with its Redis), while a local webhook receiver records when each
+callback arrives. Requests are sent open-loop, on schedule whether or not
+earlier ones have completed, so a slow API shows up as latency rather than as a
+lower request rate. Reports ingest throughput, latency percentiles of both
+endpoints and the firing lateness of every timer, e.g. against the docker
+compose setup::
+
+    python tests/benchmarks/api_load.py --api-url http://localhost:8000 \\
+        --callback-url http://host.docker.internal:9999 --create-rps 500 --read-rps 500 --duration 30
+
+Lateness is measured from the middle of the create request, so it is off by at
+most half the create latency. ``--json`` writes the results to a file so runs
+can be compared.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+
+import aiohttp
+from aiohttp import web
+
+PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class Results:
+    create_latencies: list[float] = field(default_factory=list)
+    read_latencies: list[float] = field(default_factory=list)
+    create_errors: int = 0
+    read_errors: int = 0
+    # Timer id to the time it should fire, and to the time its callback arrived.
+    expected: dict[str, float] = field(default_factory=dict)
+    arrived: dict[str, float] = field(default_factory=dict)
+
+
+def percentile(values: list[float], rank: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(int(len(ordered) * rank / 100), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(values: list[float]) -> dict[str, float]:
+    summary = {f"p{rank}": percentile(values, rank) for rank in PERCENTILES}
+    summary["max"] = max(values, default=float("nan"))
+    return summary
+
+
+async def start_receiver(results: Results, host: str, port: int) -> web.AppRunner:
+    async def callback(request: web.Request) -> web.Response:
+        arrived_at = time.time()
+        body = await request.json()
+        results.arrived.setdefault(body["id"], arrived_at)
+        return web.Response(text="OK")
+
+    app = web.Application()
+    app.router.add_post("/callback", callback)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+async def create_timer(session: aiohttp.ClientSession, results: Results, callback_url: str, delay: int) -> None:
+    minutes, seconds = divmod(delay, 60)
+    hours, minutes = divmod(minutes, 60)
+    request = {"hours": hours, "minutes": minutes, "seconds": seconds, "url": callback_url}
+    sent_at = time.time()
+    start = time.perf_counter()
+    try:
+        async with session.post("/timer", json=request) as response:
+            body = await response.json()
+            if response.status >= 300:
+                results.create_errors += 1
+                return
+    except aiohttp.ClientError:
+        results.create_errors += 1
+        return
+    latency = time.perf_counter() - start
+    results.create_latencies.append(latency)
+    results.expected[body["data"][0]["id"]] = sent_at + latency / 2 + delay
+
+
+async def read_timer(session: aiohttp.ClientSession, results: Results) -> None:
+    if not results.expected:
+        return
+    timer_id = random.choice(list(results.expected))
+    start = time.perf_counter()
+    try:
+        async with session.get(f"/timer/{timer_id}") as response:
+            await response.read()
+            if response.status >= 300:
+                results.read_errors += 1
+                return
+    except aiohttp.ClientError:
+        results.read_errors += 1
+        return
+    results.read_latencies.append(time.perf_counter() - start)
+
+
+async def run_at_rate(rps: float, duration: float, request) -> None:
+    if rps <= 0:
+        return
+    requests = set()
+    start = time.perf_counter()
+    for index in range(int(rps * duration)):
+        delay = start + index / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(request())
+        requests.add(task)
+        task.add_done_callback(requests.discard)
+    if requests:
+        await asyncio.wait(requests)
+
+
+async def main(args: argparse.Namespace) -> dict:
+    results = Results()
+    receiver = await start_receiver(results, args.receiver_host, args.receiver_port)
+    callback_url = f"{args.callback_url.rstrip('/')}/callback"
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    try:
+        async with aiohttp.ClientSession(args.api_url, connector=connector) as session:
+            start = time.perf_counter()
+            await asyncio.gather(
+                run_at_rate(
+                    args.create_rps, args.duration, lambda: create_timer(session, results, callback_url, args.delay)
+                ),
+                run_at_rate(args.read_rps, args.duration, lambda: read_timer(session, results)),
+            )
+            elapsed = time.perf_counter() - start
+        # Wait for the last timers to fire, plus some slack for the late ones.
+        deadline = max(results.expected.values(), default=time.time()) + args.grace
+        while len(results.arrived) < len(results.expected) and time.time() < deadline:
+            await asyncio.sleep(0.1)
+    finally:
+        await receiver.cleanup()
+
+    lateness = [
+        results.arrived[timer_id] - due for timer_id, due in results.expected.items() if timer_id in results.arrived
+    ]
+    return {
+        "created": len(results.expected),
+        "create_errors": results.create_errors,
+        "ingest_per_second": len(results.expected) / elapsed,
+        "create_latency_seconds": summarize(results.create_latencies),
+        "reads": len(results.read_latencies),
+        "read_errors": results.read_errors,
+        "read_latency_seconds": summarize(results.read_latencies),
+        "fired": len(lateness),
+        "missing": len(results.expected) - len(lateness),
+        "lateness_seconds": summarize(lateness),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"created   {report['created']:>10} ({report['create_errors']} errors), {report['ingest_per_second']:.0f}/s")
+    print(f"reads     {report['reads']:>10} ({report['read_errors']} errors)")
+    print(f"fired     {report['fired']:>10} ({report['missing']} missing)")
+    print(f"{'ms':<10}" + "".join(f"{name:>10}" for name in report["lateness_seconds"]))
+    for name in ("create_latency_seconds", "read_latency_seconds", "lateness_seconds"):
+        label = name.split("_")[0]
+        print(f"{label:<10}" + "".join(f"{value * 1000:>10.1f}" for value in report[name].values()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--callback-url", default="http://localhost:9999", help="Receiver URL as the API sees it")
+    parser.add_argument("--receiver-host", default="0.0.0.0")
+    parser.add_argument("--receiver-port", type=int, default=9999)
+    parser.add_argument("--create-rps", type=float, default=200)
+    parser.add_argument("--read-rps", type=float, default=200)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to send requests for")
+    parser.add_argument("--delay", type=int, default=5, help="Seconds until each created timer fires")
+    parser.add_argument("--grace", type=float, default=10, help="Seconds to wait for late callbacks")
+    parser.add_argument("--connections", type=int, default=100)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as output:
+            json.dump(report, output, indent=2)
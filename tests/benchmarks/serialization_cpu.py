@@ -0,0 +1,102 @@
+"""Measure the CPU spent per request on decoding timers and writing responses.
+
+Compares the paths the API used to take with the ones it takes now, without
+any I/O, so the difference is pure CPU time per call::
+
+    python tests/benchmarks/serialization_cpu.py --number 50000
+
+Decoding a compact record used to validate the callback URL every time; it now
+reuses URLs validated before. Responses used to be built as an ``ApiResponse``
+that FastAPI then validated and serialized again against the route's
+``response_model``; they are now written as JSON directly.
+"""
+import argparse
+import asyncio
+import time
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from fastapi.routing import APIRoute, serialize_response
+
+from app.main import app
+from app.models.api import ApiResponse
+from app.models.timer import GetTimerResponse, TimerTask
+from app.routes.timer import api_response
+from app.services.timer_codec import CODECS, EPOCH, FIELD_SEPARATOR, decode_timer
+
+TIMER_ID = "0b6e4fa4-6a63-4b8a-9f6c-5d0f3c1e2a77"
+
+
+def decode_validating_url(timer_id: str, payload: str) -> TimerTask:
+    fields = payload.split(FIELD_SEPARATOR) + [""] * 3
+    return TimerTask(
+        timer_id=timer_id,
+        url=fields[1],  # type: ignore
+        expires_at=EPOCH + timedelta(microseconds=int(fields[0])),
+        tag=fields[2] or None,
+        interval_seconds=int(fields[3]) if fields[3] else None,
+        cron=fields[4] or None,
+    )
+
+
+async def validated_response(route: APIRoute) -> None:
+    content = ApiResponse(data=[GetTimerResponse(id=TIMER_ID, time_left=3600)])
+    body = await serialize_response(field=route.response_field, response_content=content, is_coroutine=True)
+    route.response_class(body)
+
+
+async def direct_response() -> None:
+    api_response(data=[{"id": TIMER_ID, "time_left": 3600}])
+
+
+async def time_coroutine(function, number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await function()
+    return (time.perf_counter() - start) / number
+
+
+def best_of(function, number: int, repeat: int) -> float:
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def main(args: argparse.Namespace) -> dict[str, tuple[float, float]]:
+    timer = TimerTask(
+        timer_id=TIMER_ID,
+        url="https://hooks.example.com/callbacks/timer?source=bench",  # type: ignore
+        expires_at=datetime.now(timezone.utc),
+    )
+    compact = CODECS["compact"].encode(timer)
+    route = next(
+        route
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path == "/timer/{timer_id}" and "GET" in route.methods
+    )
+    loop = asyncio.new_event_loop()
+    try:
+        results = {
+            "decode compact": (
+                best_of(lambda: decode_validating_url(TIMER_ID, compact), args.number, args.repeat),
+                best_of(lambda: decode_timer(TIMER_ID, compact), args.number, args.repeat),
+            ),
+            "GET response": (
+                min(
+                    loop.run_until_complete(time_coroutine(lambda: validated_response(route), args.number))
+                    for _ in range(args.repeat)
+                ),
+                min(loop.run_until_complete(time_coroutine(direct_response, args.number)) for _ in range(args.repeat)),
+            ),
+        }
+    finally:
+        loop.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000, help="Calls per measurement")
+    parser.add_argument("--repeat", type=int, default=5, help="Measurements, the fastest is reported")
+    results = main(parser.parse_args())
+    print(f"{'us per call':<16}{'before':>10}{'after':>10}{'saved':>10}")
+    for name, (before, after) in results.items():
+        print(f"{name:<16}{before * 1e6:>10.2f}{after * 1e6:>10.2f}{(before - after) * 1e6:>10.2f}")
@@ -0,0 +1,54 @@
+"""Measure how many timers per second the SQLite backend can create.
+
+Creates timers one request at a time, both awaited in sequence and issued
+concurrently (as the API does under load, where creates share a commit),
+against a scratch database file::
+
+    python tests/benchmarks/sqlite_create_throughput.py --count 50000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.models.timer import TimerTask
+from app.services.sqlite_timer_repository import SqliteTimerRepository
+
+
+def make_timers(count: int) -> list[TimerTask]:
+    now = datetime.now(timezone.utc)
+    return [
+        TimerTask(
+            timer_id=str(uuid.uuid4()),
+            url=f"https://hooks.example.com/callbacks/{index % 50}",
+            expires_at=now + timedelta(hours=1, seconds=index),
+        )
+        for index in range(count)
+    ]
+
+
+async def main(count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        timer_repo = SqliteTimerRepository(path=os.path.join(directory, "timers.db"))
+        try:
+            timers = make_timers(count)
+            start = time.perf_counter()
+            for timer in timers:
+                await timer_repo.create_timer(timer)
+            print(f"{'sequential':<12}{count / (time.perf_counter() - start):>12.0f} creates/s")
+
+            timers = make_timers(count)
+            start = time.perf_counter()
+            await asyncio.gather(*(timer_repo.create_timer(timer) for timer in timers))
+            print(f"{'concurrent':<12}{count / (time.perf_counter() - start):>12.0f} creates/s")
+        finally:
+            await timer_repo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20_000)
+    asyncio.run(main(parser.parse_args().count))
@@ -0,0 +1,70 @@
+"""Compare Redis memory per timer for each storage format.
+
+Writes the same timers with every codec into a scratch Redis database and
+reports the growth of ``used_memory`` per timer, plus ``MEMORY USAGE`` of a
+single record. The database is flushed before each run, so point it at a
+Redis you do not need, e.g.::
+
+    TIMER_REDIS_HOST=localhost TIMER_REDIS_PORT=6380 python tests/benchmarks/timer_storage_memory.py
+"""
+import argparse
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+
+from app.models.timer import TimerTask
+from app.services.redis_timer_repository import RedisTimerRepository
+from app.services.timer_codec import CODECS
+
+BATCH_SIZE = 1000
+
+
+async def measure(redis_client: Redis, storage_format: str, count: int) -> tuple[float, int]:
+    await redis_client.flushdb()
+    timer_repo = RedisTimerRepository(redis_client=redis_client, codec=CODECS[storage_format])
+    await timer_repo.load_scripts()
+    before = (await redis_client.info("memory"))["used_memory"]
+    now = datetime.now(timezone.utc)
+    sample_id = ""
+    for start in range(0, count, BATCH_SIZE):
+        timers = [
+            TimerTask(
+                timer_id=str(uuid.uuid4()),
+                url=f"https://hooks.example.com/callbacks/{index % 50}",
+                expires_at=now + timedelta(hours=1, seconds=index),
+            )
+            for index in range(start, min(start + BATCH_SIZE, count))
+        ]
+        await timer_repo.create_timers(timers)
+        for timer in timers:
+            await timer_repo.add_executed_task(timer)
+        sample_id = timers[0].timer_id
+    after = (await redis_client.info("memory"))["used_memory"]
+    record_bytes = await redis_client.memory_usage(f"timer:{sample_id}")
+    return (after - before) / count, record_bytes or 0
+
+
+async def main(count: int) -> None:
+    redis_client = Redis(
+        host=os.environ.get("TIMER_REDIS_HOST", "localhost"),
+        port=int(os.environ.get("TIMER_REDIS_PORT", "6380")),
+        db=int(os.environ.get("TIMER_BENCHMARK_REDIS_DB", "15")),
+        decode_responses=True,
+    )
+    try:
+        print(f"{'format':<10}{'bytes/timer':>14}{'record bytes':>14}")
+        for storage_format in CODECS:
+            per_timer, record_bytes = await measure(redis_client, storage_format, count)
+            print(f"{storage_format:<10}{per_timer:>14.1f}{record_bytes:>14}")
+        await redis_client.flushdb()
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    asyncio.run(main(parser.parse_args().count))
@@ -0,0 +1,145 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from redis.asyncio import Redis
+
+from app.models.timer import TimerTask
+from app.services import redis_scripts
+from app.services.redis_shard_coordinator import RedisShardCoordinator
+from app.services.redis_timer_repository import RedisTimerRepository
+
+# A database of its own, so the executor of the running service does not claim the timers of these tests.
+SCRIPTS_DB = 15
+LEASE_SECONDS = 30
+
+
+@pytest.fixture
+async def scripts_redis_client():
+    redis_client = Redis(
+        host=os.environ.get("TIMER_REDIS_HOST"),
+        port=os.environ.get("TIMER_REDIS_PORT"),
+        db=SCRIPTS_DB,
+        ssl=os.environ.get("TIMER_REDIS_SSL_ENABLED"),
+        ssl_cert_reqs="none",
+        socket_timeout=5,
+        decode_responses=True,
+    )
+    await redis_client.flushdb()
+    yield redis_client
+    await redis_client.flushdb()
+    await redis_client.aclose()
+
+
+@pytest.fixture
+async def timer_repository(scripts_redis_client: Redis) -> RedisTimerRepository:
+    timer_repository = RedisTimerRepository(scripts_redis_client, lease_seconds=LEASE_SECONDS)
+    await timer_repository.load_scripts()
+    return timer_repository
+
+
+def make_timer(seconds: float, **kwargs) -> TimerTask:
+    return TimerTask(
+        timer_id="1",
+        url="http://test.com",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=seconds),
+        **kwargs,
+    )
+
+
+async def create_unprepared_timer(timer_repository: RedisTimerRepository, timer: TimerTask) -> None:
+    # Leaves out the next occurrence create_timer prepares, as after a failed write.
+    keys, args = timer_repository._create_timer_params(timer, timer_repository.codec.encode(timer))
+    await redis_scripts.CREATE_TIMER(timer_repository.redis_client, keys=keys, args=args)
+
+
+@pytest.mark.asyncio
+async def test_claim_and_execute(timer_repository: RedisTimerRepository) -> None:
+    timer = make_timer(-1)
+    await timer_repository.create_timer(timer)
+    now = datetime.now(timezone.utc)
+
+    assert await timer_repository.claim_due_timers(now, limit=10) == [timer]
+    assert await timer_repository.claim_due_timers(now, limit=10) == []
+    assert await timer_repository.lookup_timer("1") == timer
+    counts = await timer_repository.get_timer_counts(now)
+    assert (counts["pending"], counts["in_flight"]) == (0, 1)
+
+    await timer_repository.add_executed_task(timer)
+
+    assert await timer_repository.get_executed_task("1") == timer
+    assert (await timer_repository.get_timer_counts(now))["in_flight"] == 0
+    assert await timer_repository.requeue_expired_leases(now + timedelta(seconds=LEASE_SECONDS + 1), 10) == 0
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_requeued(timer_repository: RedisTimerRepository) -> None:
+    timer = make_timer(-1)
+    await timer_repository.create_timer(timer)
+    now = datetime.now(timezone.utc)
+    await timer_repository.claim_due_timers(now, limit=10)
+
+    await timer_repository.extend_leases([timer], now + timedelta(seconds=LEASE_SECONDS - 1))
+    assert await timer_repository.requeue_expired_leases(now + timedelta(seconds=LEASE_SECONDS + 1), 10) == 0
+    later = now + timedelta(seconds=2 * LEASE_SECONDS)
+    assert await timer_repository.requeue_expired_leases(later, 10) == 1
+
+    assert await timer_repository.claim_due_retries(later, 10) == [(timer, 0)]
+    await timer_repository.add_dead_letter(timer, 1)
+    counts = await timer_repository.get_timer_counts(later)
+    assert (counts["retrying"], counts["in_flight"], counts["dead_letter"]) == (0, 0, 1)
+
+
+@pytest.mark.asyncio
+async def test_recurring_timer_is_re_armed(timer_repository: RedisTimerRepository) -> None:
+    timer = make_timer(-1, interval_seconds=60)
+    await timer_repository.create_timer(timer)
+    now = datetime.now(timezone.utc)
+
+    assert await timer_repository.claim_due_timers(now, limit=10) == [timer]
+
+    pending = await timer_repository.get_timer("1")
+    assert pending.expires_at == timer.expires_at + timedelta(seconds=60)
+    assert await timer_repository.get_next_expiry() == pending.expires_at
+
+
+@pytest.mark.asyncio
+async def test_recurring_timer_is_re_armed_after_its_executor_died(timer_repository: RedisTimerRepository) -> None:
+    timer = make_timer(-1, interval_seconds=60)
+    await create_unprepared_timer(timer_repository, timer)
+    now = datetime.now(timezone.utc)
+    dying = RedisTimerRepository(timer_repository.redis_client, lease_seconds=LEASE_SECONDS)
+    dying._rearm = AsyncMock()  # type: ignore
+
+    assert await dying.claim_due_timers(now, limit=10) == [timer]
+    assert await timer_repository.get_timer("1") is None
+
+    later = now + timedelta(seconds=LEASE_SECONDS + 1)
+    assert await timer_repository.requeue_expired_leases(later, 10) == 1
+    assert await timer_repository.claim_due_retries(later, 10) == [(timer, 0)]
+
+    pending = await timer_repository.get_timer("1")
+    assert pending is not None and pending.expires_at > timer.expires_at
+
+
+@pytest.mark.asyncio
+async def test_shard_leases_are_taken_over(scripts_redis_client: Redis) -> None:
+    await redis_scripts.load_scripts(scripts_redis_client)
+    first = RedisShardCoordinator(scripts_redis_client, shard_count=2, worker_id="a", lease_ttl_seconds=0.5)
+    second = RedisShardCoordinator(scripts_redis_client, shard_count=2, worker_id="b", lease_ttl_seconds=0.5)
+
+    await first.rebalance()
+    assert first.owned == [0, 1]
+    # The shard assigned to the new worker is only taken once its previous owner lets go of it.
+    await second.rebalance()
+    assert second.owned == []
+    await first.rebalance()
+    await second.rebalance()
+    assert (first.owned, second.owned) == ([0], [1])
+
+    # The first worker stops renewing, as if it died, and its leases run out.
+    await asyncio.sleep(0.6)
+    await second.rebalance()
+    assert second.owned == [0, 1]
@@ -0,0 +1,64 @@
+import json
+import logging
+import logging.handlers
+
+import pytest
+
+from app.dependencies.log_config import JsonFormatter, configure_logging, stop_logging
+from app.models.settings import AppSettings
+
+
+@pytest.fixture
+def app_settings() -> AppSettings:
+    return AppSettings(timer_db_endpoint="cache", timer_db_port=6379, log_level="DEBUG", log_format="json")
+
+
+@pytest.fixture
+def restore_logging():
+    root_handlers = list(logging.getLogger().handlers)
+    app_level = logging.getLogger("app").level
+    yield
+    stop_logging()
+    logging.getLogger().handlers = root_handlers
+    logging.getLogger("app").setLevel(app_level)
+
+
+def test_json_formatter():
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, "Claimed %d due tasks", (3,), None)
+    record.timer_id = "123"
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["message"] == "Claimed 3 due tasks"
+    assert entry["timer_id"] == "123"
+    assert "args" not in entry
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_configure_logging_writes_json_from_a_queue(app_settings, capsys):
+    configure_logging(app_settings)
+    configure_logging(app_settings)
+
+    queue_handlers = [
+        handler for handler in logging.getLogger().handlers if isinstance(handler, logging.handlers.QueueHandler)
+    ]
+    assert len(queue_handlers) == 1
+    logging.getLogger("app.test").debug("Timer %s fired", "123")
+    stop_logging()
+
+    entry = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert entry["message"] == "Timer 123 fired"
+    assert entry["level"] == "DEBUG"
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_configure_logging_gates_by_level(app_settings, capsys):
+    app_settings.log_level = "WARNING"
+    configure_logging(app_settings)
+
+    logging.getLogger("app.test").info("Timer %s fired", "123")
+    stop_logging()
+
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from redis.asyncio import BlockingConnectionPool, SSLConnection
+
+from app.dependencies.timer_repo_client import get_redis_db_client, get_redis_pool_stats
+from app.models.settings import AppSettings
+
+
+@pytest.fixture
+def app_settings() -> AppSettings:
+    return AppSettings(
+        timer_db_endpoint="cache",
+        timer_db_port=6379,
+        timer_db_ssl_enabled=False,
+        redis_max_connections=20,
+        redis_health_check_interval_seconds=15,
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_redis_db_client(app_settings):
+    redis_client = get_redis_db_client(app_settings)
+
+    pool = redis_client.connection_pool
+    assert isinstance(pool, BlockingConnectionPool)
+    assert pool.max_connections == 20
+    assert pool.connection_kwargs["health_check_interval"] == 15
+    assert pool.connection_class is not SSLConnection
+    await redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_redis_db_client_with_own_pool_size(app_settings):
+    app_settings.timer_db_ssl_enabled = True
+    redis_client = get_redis_db_client(app_settings, max_connections=5)
+
+    assert redis_client.connection_pool.max_connections == 5
+    assert redis_client.connection_pool.connection_class is SSLConnection
+    await redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_redis_pool_stats(app_settings):
+    redis_client = get_redis_db_client(app_settings)
+    pool = redis_client.connection_pool
+    connection = pool.make_connection()
+    pool._in_use_connections.add(connection)
+
+    assert get_redis_pool_stats(redis_client) == {
+        "max_connections": 20,
+        "in_use": 1,
+        "idle": 0,
+        "free": 19,
+        "waiting": 0,
+    }
+    await redis_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_redis_pool_stats_counts_waiting_callers(app_settings):
+    redis_client = get_redis_db_client(app_settings, max_connections=1)
+    pool = redis_client.connection_pool
+    pool._in_use_connections.add(pool.make_connection())
+
+    waiter = asyncio.create_task(pool.get_connection("PING"))
+    await asyncio.sleep(0)
+
+    assert get_redis_pool_stats(redis_client)["waiting"] == 1
+    waiter.cancel()
+    await redis_client.aclose()
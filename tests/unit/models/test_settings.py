@@ -0,0 +1,14 @@
+import pytest
+from pydantic import ValidationError
+
+from app.models.settings import AppSettings
+
+
+def test_memory_backend_needs_executor_in_api_process():
+    with pytest.raises(ValidationError, match="API_RUN_EXECUTOR"):
+        AppSettings(timer_db_endpoint="cache", timer_db_port=6379, timer_backend="memory", api_run_executor=False)
+
+    settings = AppSettings(
+        timer_db_endpoint="cache", timer_db_port=6379, timer_backend="sqlite", api_run_executor=False
+    )
+    assert not settings.api_run_executor
@@ -97,7 +97,7 @@ def test_set_timer_invalid_request(overrides: dict, timer_url: str):
 def test_get_timer_succeed(overrides: dict, timer_url: str):
     timer_repo_service_mock = overrides[get_timer_repo_service]()
     time_stamp = datetime.now(timezone.utc).timestamp()
-    timer_repo_service_mock.get_timer.return_value = TimerTask(
+    timer_repo_service_mock.lookup_timer.return_value = TimerTask(
         timer_id="11c4dc54-759b-4172-b415-29de0373ffae",
         url="http://example.com",
         expires_at=time_stamp + 50,
@@ -114,8 +114,7 @@ def test_get_timer_succeed(overrides: dict, timer_url: str):
 
 def test_get_timer_not_found(overrides: dict, timer_url: str):
     timer_repo_service_mock = overrides[get_timer_repo_service]()
-    timer_repo_service_mock.get_timer.return_value = None
-    timer_repo_service_mock.get_executed_task.return_value = None
+    timer_repo_service_mock.lookup_timer.return_value = None
 
     response = test_client.get(f"{timer_url}/11c4dc54-759b-4172-b415-29de0373ffae")
 
@@ -129,8 +128,7 @@ def test_get_timer_not_found(overrides: dict, timer_url: str):
 def test_get_timer_expired(overrides: dict, timer_url: str):
     timer_repo_service_mock = overrides[get_timer_repo_service]()
     time_stamp = datetime.now(timezone.utc).timestamp()
-    timer_repo_service_mock.get_timer.return_value = None
-    timer_repo_service_mock.get_executed_task.return_value = TimerTask(
+    timer_repo_service_mock.lookup_timer.return_value = TimerTask(
         timer_id="11c4dc54-759b-4172-b415-29de0373ffae",
         url="http://example.com",
         expires_at=time_stamp - 50,
@@ -143,3 +141,239 @@ def test_get_timer_expired(overrides: dict, timer_url: str):
 
     assert response_content["id"] == "11c4dc54-759b-4172-b415-29de0373ffae"
     assert response_content["time_left"] == 0
+
+
+def test_set_timers_batch(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    timer_repo_service_mock.create_timers.return_value = [None, None]
+
+    response = test_client.post(
+        f"{timer_url}/batch",
+        json=[
+            {"hours": 0, "minutes": 1, "seconds": 0, "url": "http://example.com"},
+            {"hours": 0, "minutes": 0, "seconds": 0, "url": "http://example.com"},
+            {"hours": 0, "minutes": 0, "seconds": 5, "url": "not a url"},
+            {"hours": 1, "minutes": 0, "seconds": 0, "url": "http://example.org"},
+        ],
+    )
+
+    assert response.status_code == 201
+    content = json.loads(response.content)
+    assert [item["index"] for item in content["data"]] == [0, 3]
+    assert [item["time_left"] for item in content["data"]] == [60, 3600]
+    assert [error["detail"]["index"] for error in content["errors"]] == [1, 2]
+    assert content["errors"][0]["message"] == "Timer duration must be greater than 0"
+    assert content["errors"][1]["code"] == "invalid_request"
+
+    timer_repo_service_mock.create_timers.assert_called_once()
+    timers = timer_repo_service_mock.create_timers.call_args.args[0]
+    assert [timer.timer_id for timer in timers] == [item["id"] for item in content["data"]]
+
+
+def test_set_timers_batch_reports_failed_writes(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    timer_repo_service_mock.create_timers.return_value = [None, ConnectionError("Connection reset")]
+
+    response = test_client.post(
+        f"{timer_url}/batch",
+        json=[
+            {"hours": 0, "minutes": 1, "seconds": 0, "url": "http://example.com"},
+            "not an object",
+            {"hours": 0, "minutes": 2, "seconds": 0, "url": "http://example.com"},
+        ],
+    )
+
+    assert response.status_code == 201
+    content = json.loads(response.content)
+    assert [item["index"] for item in content["data"]] == [0]
+    assert [(error["code"], error["detail"]["index"]) for error in content["errors"]] == [
+        ("invalid_request", 1),
+        ("unknown", 2),
+    ]
+
+
+def test_set_timers_batch_empty(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+
+    response = test_client.post(f"{timer_url}/batch", json=[])
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["errors"][0]["message"] == "A batch must contain at least one timer"
+    timer_repo_service_mock.create_timers.assert_not_called()
+
+
+def test_set_timers_batch_all_invalid(overrides: dict, timer_url: str):
+    response = test_client.post(
+        f"{timer_url}/batch",
+        json=[{"hours": 0, "minutes": 0, "seconds": 0, "url": "http://example.com"}],
+    )
+
+    assert response.status_code == 400
+    content = json.loads(response.content)
+    assert content["data"] == []
+    assert content["errors"][0]["detail"] == {"index": 0}
+
+
+def test_set_timers_batch_too_large(overrides: dict, timer_url: str, mocker: MockFixture):
+    mocker.patch("app.routes.timer.MAX_TIMER_BATCH_SIZE", 1)
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+
+    response = test_client.post(
+        f"{timer_url}/batch",
+        json=[{"hours": 0, "minutes": 0, "seconds": 1, "url": "http://example.com"}] * 2,
+    )
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["errors"][0]["code"] == "invalid_request"
+    timer_repo_service_mock.create_timers.assert_not_called()
+
+
+def test_get_timers(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    time_stamp = datetime.now(timezone.utc).timestamp()
+    timer_repo_service_mock.lookup_timers.return_value = {
+        "a": TimerTask(timer_id="a", url="http://example.com", expires_at=time_stamp + 50),
+        "c": TimerTask(timer_id="c", url="http://example.com", expires_at=time_stamp - 50),
+    }
+
+    response = test_client.get(f"{timer_url}?ids=a,b&ids=c&ids=a")
+
+    assert response.status_code == 200
+    timer_repo_service_mock.lookup_timers.assert_called_once_with(["a", "b", "c"])
+    content = json.loads(response.content)
+    assert [item["id"] for item in content["data"]] == ["a", "c"]
+    assert 45 <= content["data"][0]["time_left"] <= 50
+    assert content["data"][1]["time_left"] == 0
+    assert content["errors"][0]["code"] == "not_found"
+    assert content["errors"][0]["detail"] == {"id": "b"}
+
+
+def test_get_timers_too_many(overrides: dict, timer_url: str, mocker: MockFixture):
+    mocker.patch("app.routes.timer.MAX_TIMER_LOOKUP_SIZE", 1)
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+
+    response = test_client.get(f"{timer_url}?ids=a,b")
+
+    assert response.status_code == 400
+    timer_repo_service_mock.lookup_timers.assert_not_called()
+
+
+def test_cancel_timer(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    time_stamp = datetime.now(timezone.utc).timestamp()
+    timer_repo_service_mock.delete_timer.return_value = TimerTask(
+        timer_id="a", url="http://example.com", expires_at=time_stamp + 50
+    )
+
+    response = test_client.delete(f"{timer_url}/a")
+
+    assert response.status_code == 200
+    timer_repo_service_mock.delete_timer.assert_called_once_with("a")
+    assert json.loads(response.content)["data"][0]["id"] == "a"
+
+
+def test_cancel_timer_not_found(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    timer_repo_service_mock.delete_timer.return_value = None
+
+    response = test_client.delete(f"{timer_url}/a")
+
+    assert response.status_code == 404
+    assert json.loads(response.content)["errors"][0]["code"] == "not_found"
+
+
+def test_reschedule_timer(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    time_stamp = datetime.now(timezone.utc).timestamp()
+    timer_repo_service_mock.reschedule_timer.return_value = TimerTask(
+        timer_id="a", url="http://example.com", expires_at=time_stamp + 120
+    )
+
+    response = test_client.patch(f"{timer_url}/a", json={"hours": 0, "minutes": 2, "seconds": 0})
+
+    assert response.status_code == 200
+    timer_id, expires_at = timer_repo_service_mock.reschedule_timer.call_args.args
+    assert timer_id == "a"
+    assert 115 <= expires_at.timestamp() - time_stamp <= 125
+    assert json.loads(response.content)["data"] == [{"id": "a", "time_left": 120}]
+
+
+def test_reschedule_timer_not_found(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    timer_repo_service_mock.reschedule_timer.return_value = None
+
+    response = test_client.patch(f"{timer_url}/a", json={"hours": 0, "minutes": 2, "seconds": 0})
+
+    assert response.status_code == 404
+
+
+def test_reschedule_timer_invalid_duration(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+
+    response = test_client.patch(f"{timer_url}/a", json={"hours": 0, "minutes": 0, "seconds": 0})
+
+    assert response.status_code == 400
+    timer_repo_service_mock.reschedule_timer.assert_not_called()
+
+
+def test_cancel_timers_by_id(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    time_stamp = datetime.now(timezone.utc).timestamp()
+    timer_repo_service_mock.delete_timers.return_value = [
+        TimerTask(timer_id="a", url="http://example.com", expires_at=time_stamp + 50)
+    ]
+
+    response = test_client.post(f"{timer_url}/cancel", json={"ids": ["a", "b", "a"]})
+
+    assert response.status_code == 200
+    timer_repo_service_mock.delete_timers.assert_called_once_with(["a", "b"])
+    content = json.loads(response.content)
+    assert [item["id"] for item in content["data"]] == ["a"]
+    assert content["errors"][0]["detail"] == {"id": "b"}
+
+
+def test_cancel_timers_by_tag(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+    timer_repo_service_mock.delete_timers_by_tag.return_value = []
+
+    response = test_client.post(f"{timer_url}/cancel", json={"tag": "campaign-1"})
+
+    assert response.status_code == 200
+    timer_repo_service_mock.delete_timers_by_tag.assert_called_once_with("campaign-1")
+
+
+def test_cancel_timers_needs_one_selector(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+
+    response = test_client.post(f"{timer_url}/cancel", json={"ids": ["a"], "tag": "campaign-1"})
+
+    assert response.status_code == 422
+    timer_repo_service_mock.delete_timers.assert_not_called()
+    timer_repo_service_mock.delete_timers_by_tag.assert_not_called()
+
+
+def test_set_recurring_timer(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+
+    response = test_client.post(
+        timer_url,
+        json={"hours": 0, "minutes": 0, "seconds": 0, "url": "http://example.com", "interval_seconds": 300},
+    )
+
+    assert response.status_code == 201
+    assert 295 <= json.loads(response.content)["data"][0]["time_left"] <= 300
+    timer = timer_repo_service_mock.create_timer.call_args.args[0]
+    assert timer.interval_seconds == 300
+
+
+def test_set_timer_invalid_cron(overrides: dict, timer_url: str):
+    timer_repo_service_mock = overrides[get_timer_repo_service]()
+
+    response = test_client.post(
+        timer_url,
+        json={"hours": 0, "minutes": 0, "seconds": 0, "url": "http://example.com", "cron": "61 * * * *"},
+    )
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["errors"][0]["message"].startswith("Invalid cron expression")
+    timer_repo_service_mock.create_timer.assert_not_called()
@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.models.timer import TimerTask
+from app.repositories.timer_repo import TimerRepository
+from app.services.cached_timer_repository import CachedTimerRepository, TimerCache
+
+
+def make_timer(timer_id: str, seconds: float = 60) -> TimerTask:
+    return TimerTask(
+        timer_id=timer_id,
+        url="http://test.com",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=seconds),
+    )
+
+
+@pytest.fixture
+def timer_repo_mock():
+    return AsyncMock(spec=TimerRepository)
+
+
+@pytest.fixture
+def timer_cache():
+    return TimerCache(max_entries=2, ttl_seconds=60)
+
+
+@pytest.fixture
+def cached_timer_repository(timer_repo_mock, timer_cache):
+    return CachedTimerRepository(timer_repository=timer_repo_mock, cache=timer_cache)
+
+
+@pytest.mark.asyncio
+async def test_lookup_timer_read_through(cached_timer_repository, timer_repo_mock, timer_cache):
+    timer = make_timer("1")
+    timer_repo_mock.lookup_timers.return_value = {"1": timer}
+
+    assert await cached_timer_repository.lookup_timer("1") == timer
+    assert await cached_timer_repository.lookup_timer("1") == timer
+
+    timer_repo_mock.lookup_timers.assert_called_once_with(["1"])
+    assert timer_cache.stats.hits == 1
+    assert timer_cache.stats.misses == 1
+    assert timer_cache.stats.hit_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_lookup_timers_only_fetches_misses(cached_timer_repository, timer_repo_mock):
+    timers = {timer_id: make_timer(timer_id) for timer_id in ("1", "2")}
+    timer_repo_mock.lookup_timers.side_effect = [{"1": timers["1"]}, {"2": timers["2"]}]
+
+    await cached_timer_repository.lookup_timers(["1"])
+    result = await cached_timer_repository.lookup_timers(["1", "2", "3"])
+
+    assert timer_repo_mock.lookup_timers.call_args.args == (["2", "3"],)
+    assert result == timers
+
+
+@pytest.mark.asyncio
+async def test_claim_invalidates_cached_timers(cached_timer_repository, timer_repo_mock, timer_cache):
+    timer = make_timer("1")
+    timer_repo_mock.lookup_timers.return_value = {"1": timer}
+    timer_repo_mock.claim_due_timers.return_value = [timer]
+    await cached_timer_repository.lookup_timer("1")
+
+    now = datetime.now(timezone.utc)
+    assert await cached_timer_repository.claim_due_timers(now, 10, [0]) == [timer]
+
+    timer_repo_mock.claim_due_timers.assert_called_once_with(now, 10, [0], None, None)
+    assert timer_cache.entries == {}
+
+
+@pytest.mark.asyncio
+async def test_cancel_by_tag_invalidates_cached_timers(cached_timer_repository, timer_repo_mock, timer_cache):
+    timer = make_timer("1")
+    timer_repo_mock.lookup_timers.return_value = {"1": timer}
+    timer_repo_mock.delete_timers_by_tag.return_value = [timer]
+    await cached_timer_repository.lookup_timer("1")
+
+    assert await cached_timer_repository.delete_timers_by_tag("a") == [timer]
+    assert timer_cache.entries == {}
+
+
+def test_cache_evicts_least_recently_used(timer_cache):
+    for timer_id in ("1", "2"):
+        timer_cache.put(make_timer(timer_id))
+    timer_cache.get("1")
+
+    timer_cache.put(make_timer("3"))
+
+    assert list(timer_cache.entries) == ["1", "3"]
+    assert timer_cache.stats.evictions == 1
+    assert timer_cache.stats.size == 2
+
+
+def test_cache_keeps_pending_timer_until_it_expires(timer_cache):
+    timer_cache.put(make_timer("executed", seconds=-1))
+    timer_cache.put(make_timer("pending", seconds=1))
+
+    now = time.monotonic()
+    assert timer_cache.entries["executed"][0] > now + 59
+    assert timer_cache.entries["pending"][0] <= now + 1
+
+
+def test_cache_expired_entry_is_a_miss(timer_cache):
+    timer_cache.put(make_timer("1"))
+    timer_cache.entries["1"] = (time.monotonic() - 1, timer_cache.entries["1"][1])
+
+    assert timer_cache.get("1") is None
+    assert "1" not in timer_cache.entries
+    assert timer_cache.stats.misses == 1
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from app.services.host_limiter import PROBE_DEFER_SECONDS, BreakerState, HostLimiter
+
+
+def test_limit_halves_on_failure_and_grows_back():
+    limiter = HostLimiter(max_limit=8, failure_threshold=100)
+
+    limiter.record(failed=True)
+    limiter.record(failed=True)
+    assert limiter.limit == 2
+
+    for _ in range(3):
+        limiter.record(failed=False)
+    assert int(limiter.limit) == 3
+
+    for _ in range(100):
+        limiter.record(failed=False)
+    assert limiter.limit == 8
+
+
+def test_limit_never_drops_below_one():
+    limiter = HostLimiter(max_limit=2, failure_threshold=100)
+    for _ in range(10):
+        limiter.record(failed=True)
+    assert limiter.limit == 1
+
+
+def test_breaker_opens_after_consecutive_failures(mocker):
+    clock = mocker.patch("app.services.host_limiter.time.monotonic", return_value=100.0)
+    limiter = HostLimiter(max_limit=4, failure_threshold=3, cooldown_seconds=30)
+
+    limiter.record(failed=True)
+    limiter.record(failed=False)
+    limiter.record(failed=True)
+    limiter.record(failed=True)
+    assert limiter.state == BreakerState.CLOSED
+    assert limiter.admit() is None
+
+    limiter.record(failed=True)
+    assert limiter.state == BreakerState.OPEN
+    assert limiter.admit() == 30
+
+    clock.return_value = 120.0
+    assert limiter.admit() == 10
+
+
+def test_breaker_probes_after_cooldown(mocker):
+    clock = mocker.patch("app.services.host_limiter.time.monotonic", return_value=100.0)
+    limiter = HostLimiter(max_limit=4, failure_threshold=1, cooldown_seconds=30)
+    limiter.record(failed=True)
+
+    clock.return_value = 130.0
+    assert limiter.admit() is None
+    assert limiter.state == BreakerState.HALF_OPEN
+    assert limiter.admit() == PROBE_DEFER_SECONDS
+
+    limiter.record(failed=True)
+    assert limiter.state == BreakerState.OPEN
+    assert limiter.admit() == 30
+
+    clock.return_value = 160.0
+    assert limiter.admit() is None
+    limiter.record(failed=False)
+    assert limiter.state == BreakerState.CLOSED
+    assert limiter.admit() is None
+
+
+@pytest.mark.asyncio
+async def test_slot_follows_the_limit():
+    limiter = HostLimiter(max_limit=2, failure_threshold=100)
+    limiter.record(failed=True)
+    release = asyncio.Event()
+    started = []
+
+    async def call(index: int) -> None:
+        async with limiter.slot():
+            started.append(index)
+            await release.wait()
+
+    calls = [asyncio.create_task(call(index)) for index in range(3)]
+    await asyncio.sleep(0.01)
+    assert started == [0]
+
+    limiter.limit = 2
+    release.set()
+    await asyncio.gather(*calls)
+    assert started == [0, 1, 2]
+    assert limiter.in_use == 0
+
+
+def test_is_idle(mocker):
+    clock = mocker.patch("app.services.host_limiter.time.monotonic", return_value=100.0)
+    limiter = HostLimiter(max_limit=4, failure_threshold=2, cooldown_seconds=30)
+    assert limiter.is_idle()
+
+    limiter.record(failed=True)
+    assert not limiter.is_idle()
+    clock.return_value = 130.0
+    assert limiter.is_idle()
+
+    limiter.record(failed=True)
+    limiter.record(failed=True)
+    clock.return_value = 150.0
+    assert not limiter.is_idle()
+    clock.return_value = 190.0
+    assert limiter.is_idle()
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.timer import TimerTask
+from app.services.in_memory_timer_repository import InMemoryTimerRepository
+
+
+def make_timer(timer_id: str, seconds: float = 60) -> TimerTask:
+    return TimerTask(
+        timer_id=timer_id,
+        url="http://test.com",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=seconds),
+    )
+
+
+@pytest.fixture
+def timer_repository():
+    return InMemoryTimerRepository()
+
+
+@pytest.mark.asyncio
+async def test_create_and_lookup(timer_repository):
+    timer = make_timer("1")
+    await timer_repository.create_timer(timer)
+
+    assert await timer_repository.get_timer("1") == timer
+    assert await timer_repository.lookup_timers(["1", "2"]) == {"1": timer}
+    assert await timer_repository.get_next_expiry() <= timer.expires_at
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers(timer_repository):
+    due, pending = make_timer("1", seconds=-1), make_timer("2")
+    await timer_repository.create_timers([due, pending])
+
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10, shards=[]) == []
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10) == [due]
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10) == []
+    assert await timer_repository.get_timer("1") is None
+
+
+@pytest.mark.asyncio
+async def test_lookup_finds_fired_timers(timer_repository):
+    timers = [make_timer(str(index), seconds=-1) for index in range(3)]
+    await timer_repository.create_timers(timers)
+    await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10)
+    await timer_repository.add_retry(timers[1], 1, datetime.now(timezone.utc))
+    await timer_repository.add_dead_letter(timers[2], 5)
+
+    # Timers being delivered, retried or given up on are still known.
+    assert await timer_repository.lookup_timers(["0", "1", "2"]) == {timer.timer_id: timer for timer in timers}
+
+
+@pytest.mark.asyncio
+async def test_delete_timer_cancels_it(timer_repository):
+    timer = make_timer("1", seconds=-1)
+    await timer_repository.create_timer(timer)
+
+    assert await timer_repository.delete_timer("1") == timer
+    assert await timer_repository.delete_timer("1") is None
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10) == []
+    assert await timer_repository.get_next_expiry() is None
+
+
+@pytest.mark.asyncio
+async def test_delete_timers_by_tag(timer_repository):
+    tagged = make_timer("1").model_copy(update={"tag": "a"})
+    await timer_repository.create_timers([tagged, make_timer("2")])
+
+    assert await timer_repository.delete_timers_by_tag("a") == [tagged]
+    assert await timer_repository.delete_timers_by_tag("a") == []
+    assert list(timer_repository.timers) == ["2"]
+
+
+@pytest.mark.asyncio
+async def test_reschedule_timer(timer_repository):
+    await timer_repository.create_timer(make_timer("1"))
+    expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+    rescheduled = await timer_repository.reschedule_timer("1", expires_at)
+
+    assert rescheduled.expires_at == expires_at
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10) == [rescheduled]
+    assert await timer_repository.reschedule_timer("1", expires_at) is None
+
+
+@pytest.mark.asyncio
+async def test_claim_re_arms_recurring_timer(timer_repository):
+    timer = make_timer("1", seconds=-1).model_copy(update={"interval_seconds": 60})
+    await timer_repository.create_timer(timer)
+
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10) == [timer]
+    pending = await timer_repository.get_timer("1")
+    assert pending.expires_at == timer.expires_at + timedelta(seconds=60)
+
+
+@pytest.mark.asyncio
+async def test_executed_timers_are_trimmed():
+    timer_repository = InMemoryTimerRepository(executed_max_count=1)
+    first, second = make_timer("1"), make_timer("2")
+    await timer_repository.add_executed_task(first)
+    await timer_repository.add_executed_task(second)
+
+    assert await timer_repository.get_executed_task("1") is None
+    assert await timer_repository.lookup_timer("2") == second
+
+
+@pytest.mark.asyncio
+async def test_dead_letters_are_trimmed():
+    timer_repository = InMemoryTimerRepository(dead_letter_max_count=1)
+    first, second = make_timer("1"), make_timer("2")
+    await timer_repository.add_dead_letter(first, 5)
+    await timer_repository.add_dead_letter(second, 5)
+
+    assert await timer_repository.lookup_timers(["1", "2"]) == {"2": second}
+
+
+@pytest.mark.asyncio
+async def test_dead_letters_expire():
+    timer_repository = InMemoryTimerRepository(dead_letter_ttl_seconds=0.01)
+    await timer_repository.add_dead_letter(make_timer("1"), 5)
+    await asyncio.sleep(0.02)
+
+    assert await timer_repository.lookup_timer("1") is None
+    counts = await timer_repository.get_timer_counts(datetime.now(timezone.utc))
+    assert counts["dead_letter"] == 0
+
+
+@pytest.mark.asyncio
+async def test_watch_new_timers(timer_repository):
+    watcher = timer_repository.watch_new_timers()
+    next_timer = asyncio.ensure_future(watcher.__anext__())
+    await asyncio.sleep(0)
+
+    timer = make_timer("1")
+    await timer_repository.create_timer(timer)
+
+    assert await asyncio.wait_for(next_timer, timeout=1) == (0, timer.expires_at)
+    await watcher.aclose()
+    assert not timer_repository.watchers
+
+
+@pytest.mark.asyncio
+async def test_claim_due_retries(timer_repository):
+    now = datetime.now(timezone.utc)
+    await timer_repository.add_retry(make_timer("1"), 1, now - timedelta(seconds=1))
+    await timer_repository.add_retry(make_timer("2"), 3, now + timedelta(seconds=60))
+
+    retries = await timer_repository.claim_due_retries(now, limit=10)
+
+    assert [(timer.timer_id, attempts) for timer, attempts in retries] == [("1", 1)]
+    assert await timer_repository.claim_due_retries(now, limit=10) == []
+
+
+@pytest.mark.asyncio
+async def test_get_timer_counts(timer_repository):
+    await timer_repository.create_timers([make_timer("1", seconds=-1), make_timer("2")])
+    await timer_repository.add_executed_task(make_timer("3"))
+    await timer_repository.add_dead_letter(make_timer("4"), 5)
+
+    counts = await timer_repository.get_timer_counts(datetime.now(timezone.utc))
+
+    assert counts == {"pending": 2, "due": 1, "retrying": 0, "dead_letter": 1, "executed": 1}
@@ -0,0 +1,64 @@
+import pytest
+
+from app.services.metrics import MetricsRegistry, timed
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+def test_render_counter_and_gauge(registry):
+    counter = registry.counter("requests_total", "Requests.", label_names=("status",))
+    gauge = registry.gauge("queue_depth", "Queue depth.")
+    counter.inc(status="200")
+    counter.inc(2, status="200")
+    counter.inc(status='5"0\\0')
+    gauge.set(1.5)
+
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{status="200"} 3\n'
+        'requests_total{status="5\\"0\\\\0"} 1\n'
+        "# HELP queue_depth Queue depth.\n"
+        "# TYPE queue_depth gauge\n"
+        "queue_depth 1.5\n"
+    )
+
+
+def test_render_histogram(registry):
+    histogram = registry.histogram("latency_seconds", "Latency.", label_names=("op",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, op="get")
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{op="get",le="0.1"} 2',
+        'latency_seconds_bucket{op="get",le="1"} 3',
+        'latency_seconds_bucket{op="get",le="+Inf"} 4',
+        'latency_seconds_sum{op="get"} 3.65',
+        'latency_seconds_count{op="get"} 4',
+    ]
+
+
+def test_metric_rejects_wrong_labels(registry):
+    counter = registry.counter("requests_total", "Requests.", label_names=("status",))
+    with pytest.raises(ValueError):
+        counter.inc(code="200")
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Requests again.")
+
+
+@pytest.mark.asyncio
+async def test_timed(registry):
+    histogram = registry.histogram("op_seconds", "Operations.", label_names=("op",))
+
+    @timed(histogram, op="fail")
+    async def fail() -> None:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await fail()
+    counts, total = histogram.values[("fail",)]
+    assert sum(counts) == 1
+    assert total[0] >= 0
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.timer import TimerTask
+from app.services.recurrence import CronSchedule, next_occurrence, parse_cron
+
+
+def at(*args: int) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "expression, after, expected",
+    [
+        ("* * * * *", at(2024, 10, 9, 0, 17, 20), at(2024, 10, 9, 0, 18)),
+        ("*/15 * * * *", at(2024, 10, 9, 0, 17), at(2024, 10, 9, 0, 30)),
+        ("0 9-17/4 * * *", at(2024, 10, 9, 14, 0), at(2024, 10, 9, 17, 0)),
+        ("30 2 * * *", at(2024, 12, 31, 3, 0), at(2025, 1, 1, 2, 30)),
+        ("0 0 29 2 *", at(2024, 3, 1), at(2028, 2, 29)),
+        # 2024-10-09 is a Wednesday, Sunday is both 0 and 7.
+        ("0 12 * * 0", at(2024, 10, 9), at(2024, 10, 13, 12)),
+        ("0 12 * * 7", at(2024, 10, 9), at(2024, 10, 13, 12)),
+        # Restricting both day fields fires on either.
+        ("0 0 15 * 1", at(2024, 10, 9), at(2024, 10, 14)),
+        ("0,30 * * * *", at(2024, 10, 9, 0, 0), at(2024, 10, 9, 0, 30)),
+    ],
+)
+def test_cron_next_after(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *", "a * * * *"])
+def test_cron_invalid_expression(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_cron_that_never_fires():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 30 2 *").next_after(at(2024, 1, 1))
+
+
+def test_parse_cron_is_cached():
+    assert parse_cron("*/5 * * * *") is parse_cron("*/5 * * * *")
+
+
+def test_interval_occurrences_do_not_drift():
+    timer = TimerTask(timer_id="1", url="http://test.com", expires_at=at(2024, 10, 9), interval_seconds=60)
+
+    # Firing late does not move the schedule.
+    assert next_occurrence(timer, at(2024, 10, 9, 0, 0, 5)) == at(2024, 10, 9, 0, 1)
+    # Missed occurrences are skipped.
+    assert next_occurrence(timer, at(2024, 10, 9, 0, 5, 30)) == at(2024, 10, 9, 0, 6)
+
+
+def test_one_off_timer_has_no_next_occurrence():
+    timer = TimerTask(timer_id="1", url="http://test.com", expires_at=at(2024, 10, 9))
+
+    assert next_occurrence(timer, at(2024, 10, 9) + timedelta(seconds=1)) is None
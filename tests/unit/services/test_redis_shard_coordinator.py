@@ -0,0 +1,87 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.services import redis_scripts
+from app.services.redis_shard_coordinator import RedisShardCoordinator, assign_shards
+
+
+@pytest.fixture
+def redis_client():
+    return AsyncMock()
+
+
+@pytest.fixture
+def shard_coordinator(redis_client):
+    return RedisShardCoordinator(redis_client, shard_count=4, worker_id="worker-b", lease_ttl_seconds=3)
+
+
+def test_assign_shards():
+    assignment = assign_shards(["worker-b", "worker-a"], 5)
+
+    assert assignment == {"worker-a": {0, 2, 4}, "worker-b": {1, 3}}
+
+
+def test_assign_shards_no_workers():
+    assert assign_shards([], 4) == {}
+
+
+@pytest.mark.asyncio
+async def test_rebalance(shard_coordinator, redis_client):
+    redis_client.evalsha.side_effect = [["worker-a", "worker-b"], [1, 3]]
+
+    await shard_coordinator.rebalance()
+
+    heartbeat, leases = redis_client.evalsha.call_args_list
+    assert heartbeat.args == (redis_scripts.HEARTBEAT_WORKER.sha, 1, "timer:workers", "worker-b", "3000")
+    assert leases.args == (
+        redis_scripts.UPDATE_SHARD_LEASES.sha,
+        4,
+        "timer:shard_lease:0",
+        "timer:shard_lease:1",
+        "timer:shard_lease:2",
+        "timer:shard_lease:3",
+        "worker-b",
+        "3000",
+        "0",
+        "1",
+        "0",
+        "1",
+    )
+    assert shard_coordinator.owned_shards() == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_start_takes_leases_and_reports_changes(shard_coordinator, redis_client):
+    redis_client.evalsha.side_effect = [["worker-b"], [0, 1, 2, 3], ["worker-a", "worker-b"], [1, 3]]
+    on_change = MagicMock()
+
+    await shard_coordinator.start(on_change)
+
+    assert shard_coordinator.owned_shards() == [0, 1, 2, 3]
+    on_change.assert_called_once_with()
+    await shard_coordinator.rebalance()
+    assert on_change.call_count == 2
+    shard_coordinator.task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_owned_shards_expire_without_renewal(shard_coordinator, redis_client):
+    redis_client.evalsha.side_effect = [["worker-b"], [0, 1, 2, 3]]
+
+    await shard_coordinator.rebalance()
+    shard_coordinator.leases_valid_until = 0
+
+    assert shard_coordinator.owned_shards() == []
+
+
+@pytest.mark.asyncio
+async def test_close_releases_leases(shard_coordinator, redis_client):
+    redis_client.evalsha.side_effect = [["worker-b"], [0, 1, 2, 3], []]
+    await shard_coordinator.rebalance()
+
+    await shard_coordinator.close()
+
+    assert redis_client.evalsha.call_args.args[-4:] == ("0", "0", "0", "0")
+    redis_client.zrem.assert_called_once_with("timer:workers", "worker-b")
+    assert shard_coordinator.owned_shards() == []
@@ -1,12 +1,15 @@
 import asyncio
 import json
-from datetime import datetime, timezone
-from unittest.mock import ANY, AsyncMock, patch
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 import pytest
+from redis.exceptions import NoScriptError, ResponseError
 
 from app.models.timer import TimerTask
+from app.services import redis_scripts
 from app.services.redis_timer_repository import RedisTimerRepository
+from app.services.timer_codec import CompactTimerCodec
 
 
 @pytest.fixture
@@ -47,20 +50,19 @@ async def test_get_timer_not_found(redis_timer_repository, redis_client):
 @pytest.mark.asyncio
 async def test_create_timer(redis_timer_repository, redis_client):
     timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
-    redis_client.zadd.return_value = 1
-    redis_client.set.return_value = None
+    redis_client.evalsha.return_value = 1
     result = await redis_timer_repository.create_timer(timer)
 
-    redis_client.set.assert_called_once_with(
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.CREATE_TIMER.sha,
+        2,
         "timer:123",
-        timer.model_dump_json(),
-    )
-    timer_mapping = {
-        timer.timer_id: timer.expires_at.timestamp(),
-    }
-    redis_client.zadd.assert_called_once_with(
         "timer:task_set",
-        timer_mapping,
+        timer.model_dump_json(),
+        str(timer.expires_at.timestamp()),
+        "123",
+        "timer:wakeup",
+        "0",
     )
     assert result is None
 
@@ -68,63 +70,796 @@ async def test_create_timer(redis_timer_repository, redis_client):
 @pytest.mark.asyncio
 async def test_create_timer_failed(redis_timer_repository, redis_client):
     timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
-    redis_client.zadd.return_value = 0
-    redis_client.set.return_value = None
+    redis_client.evalsha.return_value = 0
     with pytest.raises(Exception):
         await redis_timer_repository.create_timer(timer)
 
 
+@pytest.mark.asyncio
+async def test_create_timer_reloads_missing_script(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.evalsha.side_effect = [NoScriptError("NOSCRIPT"), 1]
+
+    await redis_timer_repository.create_timer(timer)
+
+    redis_client.script_load.assert_called_once_with(redis_scripts.CREATE_TIMER.source)
+    assert redis_client.evalsha.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_create_timers(redis_timer_repository, redis_client):
+    timers = [
+        TimerTask(timer_id=str(i), url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z") for i in range(3)
+    ]
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[1, 1, 1])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    await redis_timer_repository.create_timers(timers)
+
+    redis_client.pipeline.assert_called_once_with(transaction=False)
+    assert [call.args[2] for call in pipeline.evalsha.call_args_list] == ["timer:0", "timer:1", "timer:2"]
+    assert all(call.args[0] == redis_scripts.CREATE_TIMER.sha for call in pipeline.evalsha.call_args_list)
+    pipeline.execute.assert_called_once_with(raise_on_error=False)
+
+
+@pytest.mark.asyncio
+async def test_create_timers_reloads_missing_script(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(side_effect=[[NoScriptError("NOSCRIPT")], [1]])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    await redis_timer_repository.create_timers([timer])
+
+    assert redis_client.script_load.called
+    assert pipeline.execute.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_create_timers_partially_failed(redis_timer_repository, redis_client):
+    timers = [
+        TimerTask(timer_id=str(i), url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z") for i in range(2)
+    ]
+    error = ResponseError("OOM")
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[1, error])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    assert await redis_timer_repository.create_timers(timers) == [None, error]
+
+
+@pytest.mark.asyncio
+async def test_create_timers_failed(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[ResponseError("OOM")])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    with pytest.raises(Exception):
+        await redis_timer_repository.create_timers([timer])
+
+
+@pytest.mark.asyncio
+async def test_create_recurring_timer_prepares_next_occurrence(redis_timer_repository, redis_client):
+    timer = TimerTask(
+        timer_id="123",
+        url="http://test.com",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=60),
+        interval_seconds=60,
+    )
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[1, 1])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    await redis_timer_repository.create_timer(timer)
+
+    create, prepare = pipeline.evalsha.call_args_list
+    assert create.args[0] == redis_scripts.CREATE_TIMER.sha
+    assert prepare.args[:4] == (redis_scripts.SET_NEXT_OCCURRENCE.sha, 2, "timer:task_set", "timer:next:123")
+    assert prepare.args[6] == str(timer.expires_at.timestamp() + 60)
+    assert not redis_client.evalsha.called
+
+
+@pytest.mark.asyncio
+async def test_create_timer_with_tag(redis_timer_repository, redis_client):
+    timer = TimerTask(
+        timer_id="123", url="http://test.com", expires_at=datetime.now(timezone.utc) + timedelta(seconds=60), tag="a"
+    )
+    redis_client.evalsha.return_value = 1
+
+    await redis_timer_repository.create_timer(timer)
+
+    args = redis_client.evalsha.call_args.args
+    assert args[:5] == (redis_scripts.CREATE_TIMER.sha, 3, "timer:123", "timer:task_set", "timer:tag:a")
+    # The tag set outlives its latest timer by the margin.
+    assert 3_650_000 <= int(args[-1]) <= 3_660_000
+
+
+@pytest.mark.asyncio
+async def test_delete_timers(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="1", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[timer.model_dump_json(), None])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    result = await redis_timer_repository.delete_timers(["1", "2"])
+
+    assert result == [timer]
+    assert [call.args[3] for call in pipeline.evalsha.call_args_list] == ["timer:1", "timer:2"]
+    assert all(call.args[0] == redis_scripts.DELETE_TIMER.sha for call in pipeline.evalsha.call_args_list)
+
+
+@pytest.mark.asyncio
+async def test_delete_timers_by_tag(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="1", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z", tag="a")
+    redis_client.smembers.return_value = {"1"}
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[timer.model_dump_json()])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    assert await redis_timer_repository.delete_timers_by_tag("a") == [timer]
+
+    redis_client.smembers.assert_called_once_with("timer:tag:a")
+    redis_client.srem.assert_called_once_with("timer:tag:a", "1")
+
+
+@pytest.mark.asyncio
+async def test_reschedule_timer_retries_on_concurrent_change(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    expires_at = datetime(2024, 10, 10, tzinfo=timezone.utc)
+    redis_client.get.return_value = timer.model_dump_json()
+    redis_client.evalsha.side_effect = [-1, 1]
+
+    result = await redis_timer_repository.reschedule_timer("123", expires_at)
+
+    assert result == timer.model_copy(update={"expires_at": expires_at})
+    args = redis_client.evalsha.call_args.args
+    assert args[:4] == (redis_scripts.RESCHEDULE_TIMER.sha, 2, "timer:123", "timer:task_set")
+    assert args[4:7] == (timer.model_dump_json(), result.model_dump_json(), str(expires_at.timestamp()))
+
+
+@pytest.mark.asyncio
+async def test_reschedule_timer_no_longer_pending(redis_timer_repository, redis_client):
+    redis_client.get.return_value = None
+
+    assert await redis_timer_repository.reschedule_timer("123", datetime.now(timezone.utc)) is None
+    redis_client.evalsha.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_load_scripts(redis_timer_repository, redis_client):
+    await redis_timer_repository.load_scripts()
+
+    assert redis_client.script_load.call_count == len(redis_scripts.ALL_SCRIPTS)
+
+
 @pytest.mark.asyncio
 async def test_delete_timer(redis_timer_repository, redis_client):
     timer_id = "123"
     timer = TimerTask(timer_id=timer_id, url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
-    redis_client.getdel.return_value = timer.model_dump_json()
-    redis_client.zrem.return_value = None
+    redis_client.evalsha.return_value = timer.model_dump_json()
 
     result = await redis_timer_repository.delete_timer(timer_id)
 
-    redis_client.zrem.assert_called_once_with("timer:task_set", timer_id)
-    redis_client.getdel.assert_called_once_with(f"timer:{timer_id}")
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.DELETE_TIMER.sha,
+        5,
+        "timer:task_set",
+        f"timer:{timer_id}",
+        f"timer:next:{timer_id}",
+        f"timer:inflight:{timer_id}",
+        f"timer:retry:{timer_id}",
+        timer_id,
+    )
     assert result.model_dump_json() == timer.model_dump_json()
 
 
+@pytest.mark.asyncio
+async def test_delete_timer_being_delivered(redis_timer_repository, redis_client):
+    recurring = TimerTask(timer_id="1", url="http://test.com", expires_at="2024-10-09T00:17:20Z", interval_seconds=60)
+    one_shot = TimerTask(timer_id="2", url="http://test.com", expires_at="2024-10-09T00:17:20Z")
+
+    # Keeping a recurring timer from being re-armed cancels it, a one-shot one fires regardless.
+    redis_client.evalsha.return_value = [recurring.model_dump_json()]
+    assert await redis_timer_repository.delete_timer("1") == recurring
+    redis_client.evalsha.return_value = [one_shot.model_dump_json()]
+    assert await redis_timer_repository.delete_timer("2") is None
+
+
 @pytest.mark.asyncio
 async def test_delete_timer_not_found(redis_timer_repository, redis_client):
     timer_id = "123"
-    redis_client.getdel.return_value = None
+    redis_client.evalsha.return_value = None
 
     result = await redis_timer_repository.delete_timer(timer_id)
 
-    redis_client.getdel.assert_called_once_with(f"timer:{timer_id}")
     assert result is None
 
 
 @pytest.mark.asyncio
-async def test_get_scheduled_task_id(redis_timer_repository, redis_client):
-    timer_id = "123"
-    redis_client.zrange.return_value = [timer_id]
+async def test_claim_due_timers(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.evalsha.return_value = ["123", timer.model_dump_json(), None]
+    now = datetime.now(timezone.utc)
 
-    task_id = await redis_timer_repository.get_scheduled_task_id()
+    timers = await redis_timer_repository.claim_due_timers(now, 10)
 
-    redis_client.zrange.assert_called_once_with(
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.CLAIM_DUE_TIMERS.sha,
+        1,
         "timer:task_set",
-        start=-1,
-        end=ANY,
-        byscore=True,
+        str(now.timestamp()),
+        "10",
+        "timer:",
+        str(now.timestamp() + 30),
+        "-inf",
+        str(now.timestamp()),
+    )
+    assert [claimed.model_dump_json() for claimed in timers] == [timer.model_dump_json()]
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_between(redis_timer_repository, redis_client):
+    redis_client.evalsha.return_value = []
+    now = datetime.now(timezone.utc)
+    after, until = now - timedelta(seconds=120), now - timedelta(seconds=60)
+
+    await redis_timer_repository.claim_due_timers(now, 10, after=after, until=until)
+
+    args = redis_client.evalsha.call_args.args
+    assert args[3] == str(until.timestamp())
+    assert args[6:] == (str(now.timestamp() + 30), f"({after.timestamp()}", str(now.timestamp()))
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_skips_missing_payloads(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.evalsha.return_value = ["456", None, None, "123", timer.model_dump_json(), None]
+
+    timers = await redis_timer_repository.claim_due_timers(datetime.now(timezone.utc), 10)
+
+    assert [claimed.timer_id for claimed in timers] == ["123"]
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_prepares_next_occurrence(redis_timer_repository, redis_client):
+    timer = TimerTask(
+        timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20Z", interval_seconds=60, tag="a"
+    )
+    redis_client.evalsha.return_value = ["123", timer.model_dump_json(), str(timer.expires_at.timestamp() + 60)]
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[1])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    timers = await redis_timer_repository.claim_due_timers(timer.expires_at, 10)
+
+    assert timers == [timer]
+    pipeline.evalsha.assert_called_once_with(
+        redis_scripts.SET_NEXT_OCCURRENCE.sha,
+        3,
+        "timer:task_set",
+        "timer:next:123",
+        "timer:tag:a",
+        "123",
+        str(timer.expires_at.timestamp() + 60),
+        str(timer.expires_at.timestamp() + 120),
+        timer.model_copy(
+            update={"expires_at": datetime(2024, 10, 9, 0, 19, 20, tzinfo=timezone.utc)}
+        ).model_dump_json(),
+        ANY,
+    )
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_re_arms_unprepared_recurring_timer(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20Z", cron="*/5 * * * *")
+    redis_client.evalsha.return_value = ["123", timer.model_dump_json(), None]
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[1, 1])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    await redis_timer_repository.claim_due_timers(timer.expires_at, 10)
+
+    rearm, prepare = pipeline.evalsha.call_args_list
+    # Conditional on the flag the claim left in the in-flight record, which a cancel removes.
+    assert rearm.args[:5] == (redis_scripts.REARM_TIMER.sha, 3, "timer:123", "timer:task_set", "timer:inflight:123")
+    assert rearm.args[5] == f"{timer.occurrence}:rearm"
+    assert rearm.args[7] == str(datetime(2024, 10, 9, 0, 20, tzinfo=timezone.utc).timestamp())
+    assert prepare.args[0] == redis_scripts.SET_NEXT_OCCURRENCE.sha
+    assert prepare.args[6] == str(datetime(2024, 10, 9, 0, 25, tzinfo=timezone.utc).timestamp())
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_not_found(redis_timer_repository, redis_client):
+    redis_client.evalsha.return_value = []
+
+    timers = await redis_timer_repository.claim_due_timers(datetime.now(timezone.utc), 10)
+
+    assert timers == []
+
+
+@pytest.mark.asyncio
+async def test_get_next_expiry(redis_timer_repository, redis_client):
+    expires_at = datetime(2024, 10, 9, 0, 17, 20, 501912, tzinfo=timezone.utc)
+    redis_client.evalsha.return_value = repr(expires_at.timestamp())
+
+    next_expiry = await redis_timer_repository.get_next_expiry()
+
+    redis_client.evalsha.assert_called_once_with(redis_scripts.NEXT_EXPIRY.sha, 1, "timer:task_set")
+    assert next_expiry == expires_at
+
+
+@pytest.mark.asyncio
+async def test_get_next_expiry_empty(redis_timer_repository, redis_client):
+    redis_client.evalsha.return_value = None
+
+    assert await redis_timer_repository.get_next_expiry() is None
+
+
+@pytest.mark.asyncio
+async def test_get_next_expiry_without_shards(redis_timer_repository, redis_client):
+    assert await redis_timer_repository.get_next_expiry(shards=[]) is None
+    assert not redis_client.evalsha.called
+
+
+@pytest.mark.asyncio
+async def test_watch_new_timers(redis_timer_repository, redis_client):
+    expires_at = datetime(2024, 10, 9, 0, 17, 20, tzinfo=timezone.utc)
+    pubsub = AsyncMock()
+    pubsub.__aenter__.return_value = pubsub
+    pubsub.get_message.side_effect = [None, {"type": "message", "data": f"3:{expires_at.timestamp()}"}]
+    redis_client.pubsub = MagicMock(return_value=pubsub)
+
+    watcher = redis_timer_repository.watch_new_timers()
+    assert await anext(watcher) == (3, expires_at)
+    await watcher.aclose()
+
+    pubsub.subscribe.assert_called_once_with("timer:wakeup")
+
+
+@pytest.mark.asyncio
+async def test_sharded_timer_keys(redis_client):
+    repository = RedisTimerRepository(redis_client, shard_count=4)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.evalsha.return_value = 1
+    shard = repository.shard_for("123")
+
+    await repository.create_timer(timer)
+
+    assert 0 <= shard < 4
+    assert redis_client.evalsha.call_args.args[3] == f"timer:task_set:{shard}"
+    assert redis_client.evalsha.call_args.args[-1] == str(shard)
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_from_owned_shards(redis_client):
+    repository = RedisTimerRepository(redis_client, shard_count=4)
+    redis_client.evalsha.return_value = []
+
+    await repository.claim_due_timers(datetime.now(timezone.utc), 10, shards=[1, 3])
+    first_keys = redis_client.evalsha.call_args.args[2:4]
+    await repository.claim_due_timers(datetime.now(timezone.utc), 10, shards=[1, 3])
+    second_keys = redis_client.evalsha.call_args.args[2:4]
+
+    assert redis_client.evalsha.call_args.args[1] == 2
+    assert sorted(first_keys) == ["timer:task_set:1", "timer:task_set:3"]
+    assert first_keys != second_keys
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_without_shards(redis_timer_repository, redis_client):
+    assert await redis_timer_repository.claim_due_timers(datetime.now(timezone.utc), 10, shards=[]) == []
+    assert not redis_client.evalsha.called
+
+
+@pytest.mark.asyncio
+async def test_lookup_timer(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.mget.return_value = [None, timer.model_dump_json()]
+
+    result = await redis_timer_repository.lookup_timer("123")
+
+    redis_client.mget.assert_called_once_with(["timer:123", "executed:123"])
+    assert result.model_dump_json() == timer.model_dump_json()
+
+
+@pytest.mark.asyncio
+async def test_lookup_timers(redis_timer_repository, redis_client):
+    pending = TimerTask(timer_id="1", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    executed = TimerTask(timer_id="3", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.mget.return_value = [pending.model_dump_json(), None, None, None, None, executed.model_dump_json()]
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[{}, {}, None])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    result = await redis_timer_repository.lookup_timers(["1", "2", "3"])
+
+    redis_client.mget.assert_called_once_with(
+        ["timer:1", "executed:1", "timer:2", "executed:2", "timer:3", "executed:3"]
+    )
+    assert sorted(result) == ["1", "3"]
+    assert result["3"].model_dump_json() == executed.model_dump_json()
+
+
+@pytest.mark.asyncio
+async def test_lookup_timers_reads_fired_timers_on_a_miss(redis_timer_repository, redis_client):
+    retrying = TimerTask(timer_id="1", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    dead = TimerTask(timer_id="3", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.mget.return_value = [None] * 6
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(
+        return_value=[
+            {},
+            {f"{retrying.occurrence}:attempts": "1", f"{retrying.occurrence}:payload": retrying.model_dump_json()},
+            None,
+            {},
+            {},
+            None,
+            {},
+            {},
+            dead.model_dump_json(),
+        ]
+    )
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    result = await redis_timer_repository.lookup_timers(["1", "2", "3"])
+
+    assert [call.args for call in pipeline.hgetall.call_args_list[:2]] == [("timer:inflight:1",), ("timer:retry:1",)]
+    assert pipeline.hget.call_args_list[0].args == ("timer:dead_letter:1", "payload")
+    assert result == {"1": retrying, "3": dead}
+
+
+@pytest.mark.asyncio
+async def test_lookup_timers_empty(redis_timer_repository, redis_client):
+    assert await redis_timer_repository.lookup_timers([]) == {}
+    assert not redis_client.mget.called
+
+
+@pytest.mark.asyncio
+async def test_compact_storage_format(redis_client):
+    repository = RedisTimerRepository(redis_client, codec=CompactTimerCodec())
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    redis_client.evalsha.return_value = 1
+
+    await repository.create_timer(timer)
+    payload = redis_client.evalsha.call_args.args[4]
+    redis_client.get.return_value = payload
+
+    assert payload == CompactTimerCodec().encode(timer)
+    assert await repository.get_timer("123") == timer
+
+
+@pytest.mark.asyncio
+async def test_reencode_records(redis_client):
+    repository = RedisTimerRepository(redis_client, codec=CompactTimerCodec())
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    keys = {
+        "timer:": ["timer:123", "timer:task_set", "timer:shard_lease:0"],
+        "executed:": ["executed:123", "executed:456"],
+    }
+
+    async def scan_iter(match, count):
+        for key in keys[match[:-1]]:
+            yield key
+
+    redis_client.scan_iter = scan_iter
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(
+        side_effect=[
+            [timer.model_dump_json(), ResponseError("WRONGTYPE"), "worker-a"],
+            [1],
+            [timer.model_dump_json(), CompactTimerCodec().encode(timer)],
+            [0],
+        ]
+    )
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    rewritten = await repository.reencode_records()
+
+    assert rewritten == 1
+    replaced = [call.args for call in pipeline.evalsha.call_args_list]
+    assert replaced == [
+        (redis_scripts.REPLACE_VALUE.sha, 1, "timer:123", timer.model_dump_json(), CompactTimerCodec().encode(timer)),
+        (
+            redis_scripts.REPLACE_VALUE.sha,
+            1,
+            "executed:123",
+            timer.model_dump_json(),
+            CompactTimerCodec().encode(timer),
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_scan_timers(redis_timer_repository, redis_client):
+    timers = [
+        TimerTask(timer_id=timer_id, url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+        for timer_id in ("1", "2")
+    ]
+
+    async def scan_iter(match, count):
+        assert match == "timer:*"
+        for key in ["timer:1", "timer:task_set:0", "timer:shard_lease:0", "timer:2"]:
+            yield key
+
+    redis_client.scan_iter = scan_iter
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(
+        side_effect=[
+            [timers[0].model_dump_json(), ResponseError("WRONGTYPE"), "worker-a"],
+            [CompactTimerCodec().encode(timers[1])],
+        ]
+    )
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    batches = [batch async for batch in redis_timer_repository.scan_timers(batch_size=3)]
+
+    assert batches == [[timers[0]], [timers[1]]]
+
+
+@pytest.mark.asyncio
+async def test_add_executed_task(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+
+    await redis_timer_repository.add_executed_task(timer)
+
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.ADD_EXECUTED_TIMER.sha,
+        4,
+        "executed:123",
+        "executed:index",
+        "timer:inflight_set",
+        "timer:inflight:123",
+        timer.model_dump_json(),
+        "0",
+        "0",
+        "123",
+        ANY,
+        "executed:",
+        timer.occurrence,
+    )
+
+
+@pytest.mark.asyncio
+async def test_add_executed_task_with_retention(redis_client):
+    repository = RedisTimerRepository(redis_client, executed_ttl_seconds=3600, executed_max_count=1000)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+
+    await repository.add_executed_task(timer)
+
+    assert redis_client.evalsha.call_args.args[7:9] == ("3600000", "1000")
+
+
+@pytest.mark.asyncio
+async def test_add_retry(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    retry_at = datetime(2024, 10, 9, 0, 18, tzinfo=timezone.utc)
+
+    await redis_timer_repository.add_retry(timer, 2, retry_at)
+
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.ADD_RETRY.sha,
+        4,
+        "timer:inflight_set",
+        "timer:inflight:123",
+        "timer:retry_set",
+        "timer:retry:123",
+        "123",
+        "1728433040501912",
+        "2",
+        timer.model_dump_json(),
+        str(retry_at.timestamp()),
     )
-    assert task_id == timer_id
 
 
 @pytest.mark.asyncio
-async def test_get_scheduled_task_id_not_found(redis_timer_repository, redis_client):
-    redis_client.zrange.return_value = []
+async def test_claim_due_retries(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+    now = datetime(2024, 10, 9, 0, 18, tzinfo=timezone.utc)
+    redis_client.evalsha.return_value = ["123", "2", CompactTimerCodec().encode(timer), None, "456", "1", None, None]
+
+    retries = await redis_timer_repository.claim_due_retries(now, 10)
+
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.CLAIM_DUE_RETRIES.sha,
+        1,
+        "timer:retry_set",
+        str(now.timestamp()),
+        "10",
+        "timer:retry:",
+        str(now.timestamp() + 30),
+        "timer:",
+    )
+    assert retries == [(timer, 2)]
 
-    task_id = await redis_timer_repository.get_scheduled_task_id()
 
-    redis_client.zrange.assert_called_once_with(
+@pytest.mark.asyncio
+async def test_claim_due_retries_re_arms_requeued_recurring_timer(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20Z", interval_seconds=60)
+    now = datetime(2024, 10, 9, 0, 18, tzinfo=timezone.utc)
+    # Its executor died before re-arming it, so the flag came along through the requeue.
+    rearm_field = f"{timer.occurrence}:rearm"
+    redis_client.evalsha.return_value = ["123", "0", timer.model_dump_json(), rearm_field]
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[1, 1])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    assert await redis_timer_repository.claim_due_retries(now, 10) == [(timer, 0)]
+
+    rearm, _ = pipeline.evalsha.call_args_list
+    assert rearm.args[:6] == (
+        redis_scripts.REARM_TIMER.sha,
+        3,
+        "timer:123",
         "timer:task_set",
-        start=-1,
-        end=ANY,
-        byscore=True,
+        "timer:inflight:123",
+        rearm_field,
     )
-    assert task_id is None
+
+
+@pytest.mark.asyncio
+async def test_extend_leases(redis_timer_repository, redis_client):
+    now = datetime(2024, 10, 9, 0, 18, tzinfo=timezone.utc)
+
+    timers = [TimerTask(timer_id=str(i), url="http://test.com", expires_at=now) for i in range(2)]
+
+    await redis_timer_repository.extend_leases(timers, now)
+    await redis_timer_repository.extend_leases([], now)
+
+    lease_until = now.timestamp() + 30
+    occurrence = str(int(now.timestamp()) * 1_000_000)
+    redis_client.zadd.assert_called_once_with(
+        "timer:inflight_set", {f"0:{occurrence}": lease_until, f"1:{occurrence}": lease_until}, xx=True
+    )
+
+
+@pytest.mark.asyncio
+async def test_requeue_expired_leases(redis_timer_repository, redis_client):
+    now = datetime(2024, 10, 9, 0, 18, tzinfo=timezone.utc)
+    redis_client.evalsha.return_value = 3
+
+    requeued = await redis_timer_repository.requeue_expired_leases(now, 100)
+
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.REQUEUE_EXPIRED_LEASES.sha,
+        2,
+        "timer:inflight_set",
+        "timer:retry_set",
+        str(now.timestamp()),
+        "100",
+        "timer:",
+    )
+    assert requeued == 3
+
+
+@pytest.mark.asyncio
+async def test_add_dead_letter(redis_timer_repository, redis_client):
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+
+    await redis_timer_repository.add_dead_letter(timer, 5)
+
+    redis_client.evalsha.assert_called_once_with(
+        redis_scripts.ADD_DEAD_LETTER.sha,
+        4,
+        "timer:dead_letter:123",
+        "timer:dead_letter_set",
+        "timer:inflight_set",
+        "timer:inflight:123",
+        "5",
+        timer.model_dump_json(),
+        ANY,
+        "123",
+        "0",
+        "0",
+        "timer:dead_letter:",
+        timer.occurrence,
+    )
+
+
+@pytest.mark.asyncio
+async def test_add_dead_letter_with_retention(redis_client):
+    repository = RedisTimerRepository(redis_client, dead_letter_ttl_seconds=86400, dead_letter_max_count=1000)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at="2024-10-09T00:17:20.501912Z")
+
+    await repository.add_dead_letter(timer, 5)
+
+    assert redis_client.evalsha.call_args.args[10:12] == ("86400000", "1000")
+
+
+@pytest.mark.asyncio
+async def test_get_timer_counts(redis_client):
+    repository = RedisTimerRepository(redis_client, shard_count=2, executed_max_count=1000)
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[5, 1, 3, 2, 4, 6, 7, 100])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    counts = await repository.get_timer_counts(datetime.now(timezone.utc))
+
+    assert counts == {"pending": 8, "due": 3, "retrying": 4, "dead_letter": 6, "in_flight": 7, "executed": 100}
+    assert [call.args[0] for call in pipeline.zcard.call_args_list] == [
+        "timer:task_set:0",
+        "timer:task_set:1",
+        "timer:retry_set",
+        "timer:dead_letter_set",
+        "timer:inflight_set",
+        "executed:index",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_check_shard_count_records_count(redis_client):
+    repository = RedisTimerRepository(redis_client, shard_count=4)
+    redis_client.get.return_value = "4"
+
+    await repository.check_shard_count()
+
+    redis_client.get.assert_called_once_with("timer:shard_count")
+    redis_client.set.assert_called_once_with("timer:shard_count", 4, nx=True)
+
+
+@pytest.mark.asyncio
+async def test_check_shard_count_refuses_changed_count_with_pending_timers(redis_client):
+    repository = RedisTimerRepository(redis_client, shard_count=4)
+    redis_client.get.return_value = None
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock(return_value=[3])
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    with pytest.raises(RuntimeError, match="reshard_timers"):
+        await repository.check_shard_count()
+
+    # Without a recorded count the timers were stored in the single original task set.
+    pipeline.zcard.assert_called_once_with("timer:task_set")
+    redis_client.set.assert_not_called()
+
+    pipeline.execute.return_value = [0]
+    await repository.check_shard_count()
+    redis_client.set.assert_called_once_with("timer:shard_count", 4)
+
+
+@pytest.mark.asyncio
+async def test_reshard_timers(redis_client):
+    repository = RedisTimerRepository(redis_client, shard_count=2)
+    timer_ids = ["1", "2", "3", "4"]
+
+    async def zscan_iter(key, count):
+        assert key == "timer:task_set"
+        for index, timer_id in enumerate(timer_ids):
+            yield timer_id, float(index)
+
+    redis_client.zscan_iter = zscan_iter
+    pipeline = MagicMock()
+    pipeline.__aenter__.return_value = pipeline
+    pipeline.execute = AsyncMock()
+    redis_client.pipeline = MagicMock(return_value=pipeline)
+
+    moved = await repository.reshard_timers(1, batch_size=3)
+
+    assert moved == 4
+    assert pipeline.execute.call_count == 2
+    assert [call.args for call in pipeline.zadd.call_args_list] == [
+        (f"timer:task_set:{repository.shard_for(timer_id)}", {timer_id: float(index)})
+        for index, timer_id in enumerate(timer_ids)
+    ]
+    assert all(call.kwargs == {"nx": True} for call in pipeline.zadd.call_args_list)
+    assert [call.args for call in pipeline.zrem.call_args_list] == [
+        ("timer:task_set", timer_id) for timer_id in timer_ids
+    ]
+    redis_client.set.assert_called_once_with("timer:shard_count", 2)
@@ -0,0 +1,256 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.timer import TimerTask
+from app.services.sqlite_timer_repository import SqliteTimerRepository
+
+
+def make_timer(timer_id: str, seconds: float = 60) -> TimerTask:
+    return TimerTask(
+        timer_id=timer_id,
+        url="http://test.com",
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=seconds),
+    )
+
+
+@pytest.fixture
+async def timer_repository(tmp_path):
+    timer_repository = SqliteTimerRepository(path=str(tmp_path / "timers.db"))
+    yield timer_repository
+    await timer_repository.close()
+
+
+@pytest.mark.asyncio
+async def test_timers_survive_restart(tmp_path):
+    timer = make_timer("1")
+    timer_repository = SqliteTimerRepository(path=str(tmp_path / "timers.db"))
+    await timer_repository.create_timer(timer)
+    await timer_repository.close()
+
+    timer_repository = SqliteTimerRepository(path=str(tmp_path / "timers.db"))
+    try:
+        assert await timer_repository.get_timer("1") == timer
+        assert await timer_repository.get_next_expiry() == timer.expires_at
+    finally:
+        await timer_repository.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_share_a_commit(timer_repository, mocker):
+    insert_timers = mocker.spy(timer_repository, "_insert_timers")
+    timers = [make_timer(str(index)) for index in range(10)]
+
+    await asyncio.gather(*(timer_repository.create_timer(timer) for timer in timers))
+
+    assert insert_timers.call_count < len(timers)
+    assert await timer_repository.lookup_timers([timer.timer_id for timer in timers]) == {
+        timer.timer_id: timer for timer in timers
+    }
+
+
+@pytest.mark.asyncio
+async def test_lookup_finds_fired_timers(timer_repository):
+    timers = [make_timer(str(index), seconds=-1) for index in range(3)]
+    await timer_repository.create_timers(timers)
+    await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10)
+    await timer_repository.add_retry(timers[1], 1, datetime.now(timezone.utc))
+    await timer_repository.add_dead_letter(timers[2], 5)
+
+    # Timers being delivered, retried or given up on are still known.
+    assert await timer_repository.lookup_timers(["0", "1", "2", "3"]) == {timer.timer_id: timer for timer in timers}
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_in_expiry_order(timer_repository):
+    timers = [make_timer("late", seconds=-1), make_timer("early", seconds=-2), make_timer("pending")]
+    await timer_repository.create_timers(timers)
+
+    claimed = await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=1)
+    assert [timer.timer_id for timer in claimed] == ["early"]
+    claimed = await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10)
+    assert [timer.timer_id for timer in claimed] == ["late"]
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10, shards=[]) == []
+
+
+@pytest.mark.asyncio
+async def test_claim_due_timers_between(timer_repository):
+    timers = [make_timer("stale", seconds=-120), make_timer("late", seconds=-30), make_timer("fresh", seconds=-1)]
+    await timer_repository.create_timers(timers)
+    now = datetime.now(timezone.utc)
+
+    claimed = await timer_repository.claim_due_timers(now, limit=10, after=now - timedelta(seconds=60))
+    assert [timer.timer_id for timer in claimed] == ["late", "fresh"]
+    claimed = await timer_repository.claim_due_timers(now, limit=10, until=now - timedelta(seconds=60))
+    assert [timer.timer_id for timer in claimed] == ["stale"]
+
+
+@pytest.mark.asyncio
+async def test_delete_timer(timer_repository):
+    timer = make_timer("1")
+    await timer_repository.create_timer(timer)
+
+    assert await timer_repository.delete_timer("1") == timer
+    assert await timer_repository.delete_timer("1") is None
+    assert await timer_repository.get_next_expiry() is None
+
+
+@pytest.mark.asyncio
+async def test_cancel_and_reschedule(timer_repository):
+    tagged = make_timer("1").model_copy(update={"tag": "a"})
+    await timer_repository.create_timers([tagged, make_timer("2"), make_timer("3")])
+
+    assert await timer_repository.delete_timers_by_tag("a") == [tagged]
+    assert [timer.timer_id for timer in await timer_repository.delete_timers(["2", "4"])] == ["2"]
+
+    expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    rescheduled = await timer_repository.reschedule_timer("3", expires_at)
+    assert rescheduled.expires_at == expires_at
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10) == [rescheduled]
+    assert await timer_repository.reschedule_timer("3", expires_at) is None
+
+
+@pytest.mark.asyncio
+async def test_claim_re_arms_recurring_timer(timer_repository):
+    timer = make_timer("1", seconds=-1).model_copy(update={"cron": "*/5 * * * *", "tag": "a"})
+    await timer_repository.create_timer(timer)
+
+    assert await timer_repository.claim_due_timers(datetime.now(timezone.utc), limit=10) == [timer]
+    pending = await timer_repository.get_timer("1")
+    assert pending.expires_at.minute % 5 == 0
+    assert pending.expires_at > datetime.now(timezone.utc)
+    assert await timer_repository.delete_timers_by_tag("a") == [pending]
+
+
+@pytest.mark.asyncio
+async def test_executed_timers(tmp_path):
+    timer_repository = SqliteTimerRepository(path=str(tmp_path / "timers.db"), executed_max_count=1)
+    try:
+        first, second = make_timer("1"), make_timer("2")
+        await timer_repository.add_executed_task(first)
+        await timer_repository.add_executed_task(second)
+
+        assert await timer_repository.get_executed_task("1") is None
+        assert await timer_repository.lookup_timer("2") == second
+    finally:
+        await timer_repository.close()
+
+
+@pytest.mark.asyncio
+async def test_dead_letter_retention(tmp_path):
+    timer_repository = SqliteTimerRepository(
+        path=str(tmp_path / "timers.db"), dead_letter_ttl_seconds=0.05, dead_letter_max_count=1
+    )
+    try:
+        first, second = make_timer("1"), make_timer("2")
+        await timer_repository.add_dead_letter(first, 5)
+        await timer_repository.add_dead_letter(second, 5)
+        assert await timer_repository.lookup_timers(["1", "2"]) == {"2": second}
+
+        await asyncio.sleep(0.1)
+        assert await timer_repository.lookup_timer("2") is None
+        await timer_repository.add_dead_letter(make_timer("3"), 5)
+        counts = await timer_repository.get_timer_counts(datetime.now(timezone.utc))
+        assert counts["dead_letter"] == 1
+    finally:
+        await timer_repository.close()
+
+
+@pytest.mark.asyncio
+async def test_claim_due_retries(timer_repository):
+    now = datetime.now(timezone.utc)
+    retry = make_timer("1")
+    await timer_repository.add_retry(retry, 1, now - timedelta(seconds=1))
+    await timer_repository.add_retry(make_timer("2"), 3, now + timedelta(seconds=60))
+
+    assert await timer_repository.claim_due_retries(now, limit=10) == [(retry, 1)]
+    assert await timer_repository.claim_due_retries(now, limit=10) == []
+
+
+@pytest.mark.asyncio
+async def test_requeue_expired_leases(timer_repository):
+    now = datetime.now(timezone.utc)
+    await timer_repository.create_timers([make_timer("1", seconds=-1), make_timer("2", seconds=-1)])
+    claimed = await timer_repository.claim_due_timers(now, limit=10)
+    await timer_repository.add_executed_task(next(timer for timer in claimed if timer.timer_id == "1"))
+
+    assert (await timer_repository.get_timer_counts(now))["in_flight"] == 1
+    assert await timer_repository.requeue_expired_leases(now, limit=10) == 0
+    later = now + timedelta(seconds=timer_repository.lease_seconds)
+    assert await timer_repository.requeue_expired_leases(later, limit=10) == 1
+
+    retries = await timer_repository.claim_due_retries(later, limit=10)
+    assert [(timer.timer_id, attempts) for timer, attempts in retries] == [("2", 0)]
+    await timer_repository.add_dead_letter(retries[0][0], 5)
+    assert (await timer_repository.get_timer_counts(later))["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_extend_leases(timer_repository):
+    now = datetime.now(timezone.utc)
+    await timer_repository.create_timers([make_timer("1", seconds=-1), make_timer("2", seconds=-1)])
+    claimed = await timer_repository.claim_due_timers(now, limit=10)
+
+    later = now + timedelta(seconds=timer_repository.lease_seconds)
+    renewed = [timer for timer in claimed if timer.timer_id == "1"] + [make_timer("3")]
+    await timer_repository.extend_leases(renewed, later - timedelta(seconds=1))
+    assert await timer_repository.requeue_expired_leases(later, limit=10) == 1
+    retries = await timer_repository.claim_due_retries(later, limit=10)
+    assert [timer.timer_id for timer, _ in retries] == ["2"]
+
+
+@pytest.mark.asyncio
+async def test_overlapping_occurrences_keep_their_own_records(timer_repository):
+    now = datetime.now(timezone.utc)
+    first = make_timer("1", seconds=-2).model_copy(update={"interval_seconds": 1})
+    await timer_repository.create_timer(first)
+    (claimed,) = await timer_repository.claim_due_timers(now, limit=10)
+    (following,) = await timer_repository.claim_due_timers(now + timedelta(seconds=1), limit=10)
+    assert following.expires_at > claimed.expires_at
+
+    # Both occurrences are in flight at once; recording one leaves the lease of the other.
+    await timer_repository.add_retry(claimed, 1, now)
+    assert (await timer_repository.get_timer_counts(now))["in_flight"] == 1
+    later = now + timedelta(seconds=timer_repository.lease_seconds + 1)
+    assert await timer_repository.requeue_expired_leases(later, limit=10) == 1
+
+    retries = await timer_repository.claim_due_retries(later, limit=10)
+    assert sorted((timer.expires_at, attempts) for timer, attempts in retries) == [
+        (claimed.expires_at, 1),
+        (following.expires_at, 0),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_retries_and_leases_keyed_by_id_are_migrated(tmp_path):
+    path = str(tmp_path / "timers.db")
+    connection = sqlite3.connect(path)
+    for table, column in (("retries", "retry_at"), ("inflight", "lease_until")):
+        connection.execute(
+            f"CREATE TABLE {table} (timer_id TEXT PRIMARY KEY, url TEXT NOT NULL, expires_at REAL NOT NULL, "
+            f"tag TEXT, interval_seconds INTEGER, cron TEXT, attempts INTEGER NOT NULL, {column} REAL NOT NULL)"
+        )
+    connection.execute("INSERT INTO retries VALUES ('1', 'http://test.com/', 1.5, NULL, NULL, NULL, 2, 0)")
+    connection.commit()
+    connection.close()
+
+    timer_repository = SqliteTimerRepository(path=path)
+    try:
+        retries = await timer_repository.claim_due_retries(datetime.now(timezone.utc), limit=10)
+        assert [(timer.timer_id, attempts) for timer, attempts in retries] == [("1", 2)]
+        assert timer_repository._primary_key("inflight") == ["timer_id", "expires_at"]
+    finally:
+        await timer_repository.close()
+
+
+@pytest.mark.asyncio
+async def test_get_timer_counts(timer_repository):
+    await timer_repository.create_timers([make_timer("1", seconds=-1), make_timer("2")])
+    await timer_repository.add_executed_task(make_timer("3"))
+    await timer_repository.add_retry(make_timer("4"), 1, datetime.now(timezone.utc))
+
+    counts = await timer_repository.get_timer_counts(datetime.now(timezone.utc))
+
+    assert counts == {"pending": 2, "due": 1, "retrying": 1, "dead_letter": 0, "in_flight": 0, "executed": 1}
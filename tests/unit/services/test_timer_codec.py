@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.timer import TimerTask
+from app.services.timer_codec import CompactTimerCodec, JsonTimerCodec, decode_timer
+
+
+@pytest.fixture
+def timer() -> TimerTask:
+    return TimerTask(
+        timer_id="123",
+        url="http://test.com/hook?a=1|2",
+        expires_at=datetime(2024, 10, 9, 0, 17, 20, 501912, tzinfo=timezone.utc),
+    )
+
+
+def test_json_codec_round_trip(timer):
+    payload = JsonTimerCodec().encode(timer)
+
+    assert payload == timer.model_dump_json()
+    assert decode_timer("123", payload) == timer
+
+
+def test_compact_codec_round_trip(timer):
+    payload = CompactTimerCodec().encode(timer)
+
+    assert payload == "1728433040501912\x1fhttp://test.com/hook?a=1|2"
+    assert decode_timer("123", payload) == timer
+
+
+def test_compact_codec_round_trip_with_tag(timer):
+    timer = timer.model_copy(update={"tag": "campaign-1"})
+    payload = CompactTimerCodec().encode(timer)
+
+    assert payload == "1728433040501912\x1fhttp://test.com/hook?a=1|2\x1fcampaign-1"
+    assert decode_timer("123", payload) == timer
+
+
+def test_compact_codec_round_trip_recurring(timer):
+    timer = timer.model_copy(update={"cron": "*/5 * * * *"})
+    payload = CompactTimerCodec().encode(timer)
+
+    assert payload == "1728433040501912\x1fhttp://test.com/hook?a=1|2\x1f\x1f\x1f*/5 * * * *"
+    assert decode_timer("123", payload) == timer
+
+
+def test_compact_codec_is_smaller(timer):
+    assert len(CompactTimerCodec().encode(timer)) < len(JsonTimerCodec().encode(timer)) / 2
+
+
+def test_compact_decode_shares_validated_urls(timer):
+    payload = CompactTimerCodec().encode(timer)
+
+    first, second = decode_timer("1", payload), decode_timer("2", payload)
+
+    assert first.url is second.url
+    with pytest.raises(ValidationError):
+        decode_timer("3", "1728433040501912\x1fnot a url")
@@ -1,21 +1,31 @@
 import asyncio
+import itertools
 import time
 from datetime import datetime, timedelta, timezone
 from types import coroutine
-from unittest.mock import AsyncMock, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 import aiohttp
 import pytest
 
 from app.models.timer import TimerTask
+from app.repositories.shard_coordinator import ShardCoordinator
 from app.repositories.timer_repo import TimerRepository
 from app.services.redis_timer_repository import RedisTimerRepository
-from app.services.timer_executor import Response, TimerExecutor, get_response_message
+from app.services.timer_executor import (
+    DeliveryResult,
+    Response,
+    TimerExecutor,
+    get_delivery_result,
+    get_response_message,
+)
 
 
 @pytest.fixture
 async def timer_repo_mock():
     mock = AsyncMock(spec=TimerRepository)
+    mock.get_next_expiry.return_value = None
+    mock.requeue_expired_leases.return_value = 0
     return mock
 
 
@@ -54,10 +64,13 @@ async def test_timer_executor_start_exception(timer_executor):
 
 @pytest.mark.asyncio
 async def test_timer_executor_stop(timer_executor):
-    timer_executor.timer_repository.get_scheduled_task_id.return_value = None
+    timer_executor.timer_repository.claim_due_timers.return_value = []
     await timer_executor.start()
+    assert timer_executor.is_running()
     await timer_executor.close()
     assert timer_executor.task._state == "CANCELLED"
+    await asyncio.sleep(0)
+    assert not timer_executor.is_running()
 
 
 @pytest.mark.asyncio
@@ -68,7 +81,7 @@ async def test_timer_executor_execute_task(timer_executor):
         expires_at=(datetime.now(timezone.utc) + timedelta(seconds=5)).isoformat(),
     )
 
-    timer_executor.timer_repository.get_scheduled_task_id.return_value = timer.timer_id
+    timer_executor.timer_repository.claim_due_timers.return_value = []
     timer_executor.timer_repository.get_timer.return_value = timer
 
     await timer_executor.start()
@@ -86,7 +99,7 @@ async def test_timer_executor_execute_task_exception(timer_executor):
         expires_at=(datetime.now(timezone.utc) + timedelta(seconds=5)).isoformat(),
     )
 
-    timer_executor.timer_repository.get_scheduled_task_id.return_value = timer.timer_id
+    timer_executor.timer_repository.claim_due_timers.return_value = []
     timer_executor.timer_repository.get_timer.return_value = timer
     timer_executor.logger.error = AsyncMock()
 
@@ -106,14 +119,503 @@ async def test_timer_scheduler_start(timer_executor):
         expires_at=(datetime.now(timezone.utc) + timedelta(seconds=5)).isoformat(),
     )
 
-    timer_executor.timer_repository.get_scheduled_task_id.return_value = timer.timer_id
-    timer_executor.timer_repository.delete_timer.return_value = timer
+    timer_executor.timer_repository.claim_due_timers.side_effect = itertools.chain([[timer]], itertools.repeat([]))
+    timer_executor.execute_task = AsyncMock()
 
     await timer_executor.start()
     await asyncio.sleep(0.1)
     assert timer_executor.task is not None
     assert timer_executor.task._state == "PENDING"
-    await asyncio.sleep(2)
+    await asyncio.sleep(0.2)
     timer_executor.task.cancel()
-    assert timer_executor.timer_repository.delete_timer.called
-    assert timer_executor.timer_repository.get_scheduled_task_id.called
+    assert timer_executor.timer_repository.claim_due_timers.called
+    timer_executor.execute_task.assert_called_once_with("http://test.com/", "123")
+    timer_executor.timer_repository.add_executed_task.assert_called_once_with(timer)
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_drains_full_batches(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, claim_batch_size=2)
+    timers = [
+        TimerTask(
+            timer_id=str(i),
+            url="http://test.com",
+            expires_at=datetime.now(timezone.utc).isoformat(),
+        )
+        for i in range(3)
+    ]
+    timer_repo_mock.claim_due_timers.side_effect = itertools.chain([timers[:2], timers[2:]], itertools.repeat([]))
+    timer_executor.execute_task = AsyncMock()
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    timer_executor.task.cancel()
+
+    assert timer_repo_mock.claim_due_timers.call_count == 2
+    assert timer_executor.execute_task.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_survives_claim_errors(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock)
+    timer = TimerTask(timer_id="1", url="http://test.com", expires_at=datetime.now(timezone.utc))
+    timer_repo_mock.claim_due_timers.side_effect = itertools.chain(
+        [ConnectionError("Connection reset"), [timer]], itertools.repeat([])
+    )
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.DELIVERED)
+
+    with patch("app.services.timer_executor.SCHEDULER_RETRY_SECONDS", 0.01):
+        await timer_executor.start()
+        await asyncio.sleep(0.05)
+
+    assert not timer_executor.task.done()
+    timer_executor.execute_task.assert_called_once_with("http://test.com/", "1")
+    await timer_executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_claims_fresh_timers_before_backlog(timer_repo_mock):
+    timer_executor = TimerExecutor(
+        timer_repository=timer_repo_mock, claim_batch_size=10, catchup_after_seconds=60, catchup_max_rate=3
+    )
+    fresh = TimerTask(timer_id="fresh", url="http://test.com", expires_at=datetime.now(timezone.utc))
+    stale = [
+        TimerTask(timer_id=str(i), url="http://test.com", expires_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        for i in range(3)
+    ]
+    timer_repo_mock.claim_due_timers.side_effect = itertools.chain(
+        [[stale[0]], [fresh], stale[1:]], itertools.repeat([])
+    )
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.DELIVERED)
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    await timer_executor.close()
+
+    # A single claim until a stale timer shows that a backlog has built up.
+    detect, fresh_claim, stale_claim = timer_repo_mock.claim_due_timers.call_args_list[:3]
+    assert detect.args[1] == 10 and "after" not in detect.kwargs and "until" not in detect.kwargs
+    assert fresh_claim.args[1] == 10 and fresh_claim.kwargs["after"] < fresh_claim.args[0] - timedelta(seconds=59)
+    # The backlog gets what is left of the batch, capped by the tokens left after the first stale timer.
+    assert stale_claim.args[1] == 2 and stale_claim.kwargs["until"] == fresh_claim.kwargs["after"]
+    assert timer_executor.execute_task.call_count == 4
+    assert timer_executor.catching_up
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_claims_once_without_backlog(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, claim_batch_size=10, catchup_after_seconds=60)
+    fresh = TimerTask(timer_id="fresh", url="http://test.com", expires_at=datetime.now(timezone.utc))
+    timer_repo_mock.claim_due_timers.side_effect = itertools.chain([[fresh]], itertools.repeat([]))
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.DELIVERED)
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    await timer_executor.close()
+
+    # One round trip per iteration while no timer is late enough to form a backlog.
+    assert timer_repo_mock.claim_due_timers.call_count == 1
+    assert timer_repo_mock.claim_due_timers.call_args.kwargs == {}
+    timer_executor.execute_task.assert_called_once_with("http://test.com/", "fresh")
+    assert not timer_executor.catching_up
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_drops_timers_that_are_too_late(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, catchup_drop_after_seconds=300)
+    late = TimerTask(timer_id="1", url="http://test.com", expires_at=datetime.now(timezone.utc) - timedelta(hours=1))
+    on_time = TimerTask(timer_id="2", url="http://test.com", expires_at=datetime.now(timezone.utc))
+    timer_repo_mock.claim_due_timers.side_effect = itertools.chain([[late, on_time]], itertools.repeat([]))
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.DELIVERED)
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    await timer_executor.close()
+
+    timer_executor.execute_task.assert_called_once_with("http://test.com/", "2")
+    timer_repo_mock.add_dead_letter.assert_called_once_with(late, 0)
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_limits_in_flight_per_host(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, max_in_flight=10, max_in_flight_per_host=2)
+    timers = [
+        TimerTask(
+            timer_id=str(i),
+            url="http://slow.com" if i < 4 else "http://fast.com",
+            expires_at=datetime.now(timezone.utc).isoformat(),
+        )
+        for i in range(6)
+    ]
+    timer_repo_mock.claim_due_timers.side_effect = itertools.chain([timers], itertools.repeat([]))
+    release = asyncio.Event()
+    started = []
+
+    async def execute_task(url: str, timer_id: str) -> None:
+        started.append(timer_id)
+        if "slow" in url:
+            await release.wait()
+
+    timer_executor.execute_task = execute_task
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    assert sorted(started) == ["0", "1", "4", "5"]
+    assert timer_repo_mock.add_executed_task.call_count == 2
+
+    release.set()
+    await asyncio.sleep(0.05)
+    assert sorted(started) == ["0", "1", "2", "3", "4", "5"]
+    assert timer_repo_mock.add_executed_task.call_count == 6
+    assert timer_executor.host_limiters == {}
+    await timer_executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_limits_outstanding_dispatches(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, max_in_flight=2)
+    timer_repo_mock.claim_due_timers.return_value = []
+    release = asyncio.Event()
+
+    async def execute_task(url: str, timer_id: str) -> None:
+        await release.wait()
+
+    timer_executor.execute_task = execute_task
+    for i in range(4):
+        timer = TimerTask(timer_id=str(i), url="http://test.com", expires_at=datetime.now(timezone.utc).isoformat())
+        dispatch = asyncio.create_task(timer_executor.dispatch(timer))
+        timer_executor.dispatches.add(dispatch)
+        dispatch.add_done_callback(timer_executor.dispatches.discard)
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    assert not timer_repo_mock.claim_due_timers.called
+
+    release.set()
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.claim_due_timers.called
+    await timer_executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_does_not_let_slow_host_delay_others(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, max_in_flight=10, max_in_flight_per_host=2)
+    slow = [
+        TimerTask(timer_id=str(i), url="http://slow.com", expires_at=datetime.now(timezone.utc).isoformat())
+        for i in range(20)
+    ]
+    fast = TimerTask(timer_id="fast", url="http://fast.com", expires_at=datetime.now(timezone.utc).isoformat())
+    timer_repo_mock.claim_due_timers.side_effect = itertools.chain([slow, [fast]], itertools.repeat([]))
+    release = asyncio.Event()
+
+    async def execute_task(url: str, timer_id: str) -> DeliveryResult:
+        if "slow" in url:
+            await release.wait()
+        return DeliveryResult.DELIVERED
+
+    timer_executor.execute_task = AsyncMock(side_effect=execute_task)
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    # Only a backlog of twice the host's limit is kept, the rest goes back to the retry queue.
+    timer_repo_mock.add_executed_task.assert_called_once_with(fast)
+    assert timer_repo_mock.add_retry.call_count == 16
+    assert {call.args[1] for call in timer_repo_mock.add_retry.call_args_list} == {0}
+    assert timer_executor.host_backlog == {"slow.com": 2}
+
+    release.set()
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.add_executed_task.call_count == 5
+    assert not timer_executor.parked
+    assert not timer_executor.host_backlog
+    await timer_executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_sleeps_until_next_expiry(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock)
+    timer_repo_mock.claim_due_timers.return_value = []
+    timer_repo_mock.get_next_expiry.side_effect = itertools.chain(
+        [datetime.now(timezone.utc) + timedelta(milliseconds=100)], itertools.repeat(None)
+    )
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.claim_due_timers.call_count == 1
+    await asyncio.sleep(0.1)
+    assert timer_repo_mock.claim_due_timers.call_count == 2
+    await timer_executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_wakes_up_for_earlier_timer(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock)
+    timer_repo_mock.claim_due_timers.return_value = []
+    timer_repo_mock.get_next_expiry.return_value = datetime.now(timezone.utc) + timedelta(hours=1)
+    new_timers: asyncio.Queue = asyncio.Queue()
+
+    async def watch_new_timers():
+        while True:
+            yield await new_timers.get()
+
+    timer_repo_mock.watch_new_timers = watch_new_timers
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.claim_due_timers.call_count == 1
+
+    await new_timers.put((0, datetime.now(timezone.utc) + timedelta(hours=2)))
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.claim_due_timers.call_count == 1
+
+    await new_timers.put((0, datetime.now(timezone.utc)))
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.claim_due_timers.call_count == 2
+    await timer_executor.close()
+
+
+@pytest.mark.asyncio
+async def test_timer_scheduler_claims_owned_shards(timer_repo_mock):
+    shard_coordinator = AsyncMock(spec=ShardCoordinator)
+    shard_coordinator.owned_shards = MagicMock(return_value=[1, 3])
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, shard_coordinator=shard_coordinator)
+    timer_repo_mock.claim_due_timers.return_value = []
+    new_timers: asyncio.Queue = asyncio.Queue()
+
+    async def watch_new_timers():
+        while True:
+            yield await new_timers.get()
+
+    timer_repo_mock.watch_new_timers = watch_new_timers
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    shard_coordinator.start.assert_called_once_with(timer_executor.wakeup.set)
+    timer_repo_mock.claim_due_timers.assert_called_once_with(ANY, 100, [1, 3])
+    timer_repo_mock.get_next_expiry.assert_called_once_with([1, 3])
+
+    await new_timers.put((2, datetime.now(timezone.utc)))
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.claim_due_timers.call_count == 1
+
+    await new_timers.put((3, datetime.now(timezone.utc)))
+    await asyncio.sleep(0.05)
+    assert timer_repo_mock.claim_due_timers.call_count == 2
+
+    await timer_executor.close()
+    shard_coordinator.close.assert_called_once()
+
+
+def test_get_delivery_result():
+    assert get_delivery_result(200) == DeliveryResult.DELIVERED
+    assert get_delivery_result(302) == DeliveryResult.DELIVERED
+    assert get_delivery_result(408) == DeliveryResult.FAILED
+    assert get_delivery_result(429) == DeliveryResult.FAILED
+    assert get_delivery_result(503) == DeliveryResult.FAILED
+    assert get_delivery_result(400) == DeliveryResult.REJECTED
+    assert get_delivery_result(404) == DeliveryResult.REJECTED
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_execute_task_timeout(timer_executor):
+    await timer_executor.start()
+    with patch("aiohttp.ClientSession.post") as mock:
+        mock.side_effect = asyncio.TimeoutError()
+        assert await timer_executor.execute_task(url="http://test.com", timer_id="123") == DeliveryResult.FAILED
+    await timer_executor.close()
+
+
+def test_timer_executor_retry_delay(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, retry_base_seconds=2, retry_max_seconds=10)
+    for _ in range(100):
+        assert timedelta(seconds=1) <= timer_executor.retry_delay(1) <= timedelta(seconds=2)
+        assert timedelta(seconds=4) <= timer_executor.retry_delay(3) <= timedelta(seconds=8)
+        assert timedelta(seconds=5) <= timer_executor.retry_delay(10) <= timedelta(seconds=10)
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_schedules_retry_for_failed_delivery(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, retry_base_seconds=10)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at=datetime.now(timezone.utc).isoformat())
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.FAILED)
+
+    before = datetime.now(timezone.utc)
+    await timer_executor.dispatch(timer)
+
+    timer_repo_mock.add_retry.assert_called_once_with(timer, 1, ANY)
+    retry_at = timer_repo_mock.add_retry.call_args.args[2]
+    assert before + timedelta(seconds=5) <= retry_at <= datetime.now(timezone.utc) + timedelta(seconds=10)
+    assert not timer_repo_mock.add_executed_task.called
+    assert not timer_repo_mock.add_dead_letter.called
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_dead_letters_after_max_attempts(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, retry_max_attempts=3)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at=datetime.now(timezone.utc).isoformat())
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.FAILED)
+
+    await timer_executor.dispatch(timer, attempts=2)
+
+    timer_repo_mock.add_dead_letter.assert_called_once_with(timer, 3)
+    assert not timer_repo_mock.add_retry.called
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_dead_letters_rejected_delivery(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at=datetime.now(timezone.utc).isoformat())
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.REJECTED)
+
+    await timer_executor.dispatch(timer)
+
+    timer_repo_mock.add_dead_letter.assert_called_once_with(timer, 1)
+    assert not timer_repo_mock.add_retry.called
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_renews_leases_of_outstanding_dispatches(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, max_in_flight_per_host=1, lease_seconds=0.3)
+    release = asyncio.Event()
+
+    async def execute_task(url: str, timer_id: str) -> DeliveryResult:
+        await release.wait()
+        return DeliveryResult.DELIVERED
+
+    timer_executor.execute_task = execute_task
+    timers = [
+        TimerTask(timer_id=str(i), url="http://test.com", expires_at=datetime.now(timezone.utc)) for i in range(3)
+    ]
+    dispatches = [asyncio.create_task(timer_executor.dispatch(timer)) for timer in timers]
+    await asyncio.sleep(0.01)
+
+    # Timers waiting for the busy host are renewed along with the one being delivered.
+    assert timer_executor.reap_interval_seconds == pytest.approx(0.1)
+    await timer_executor.renew_leases()
+    timer_repo_mock.extend_leases.assert_called_once_with(timers, ANY)
+
+    release.set()
+    await asyncio.gather(*dispatches)
+    assert not timer_executor.leased_timers
+    await timer_executor.renew_leases()
+    assert timer_repo_mock.extend_leases.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_close_renews_leases_until_dispatches_finish(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, lease_seconds=0.03)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at=datetime.now(timezone.utc))
+    timer_repo_mock.claim_due_timers.side_effect = [[timer], []]
+    timer_repo_mock.claim_due_retries.return_value = []
+
+    async def execute_task(url: str, timer_id: str) -> DeliveryResult:
+        await asyncio.sleep(0.1)
+        return DeliveryResult.DELIVERED
+
+    timer_executor.execute_task = execute_task
+    await timer_executor.start()
+    await asyncio.sleep(0.01)
+    timer_repo_mock.extend_leases.reset_mock()
+
+    await timer_executor.close()
+
+    # The delivery outlasted several leases while shutting down, and each was renewed.
+    assert [call.args[0] for call in timer_repo_mock.extend_leases.call_args_list].count([timer]) >= 2
+    timer_repo_mock.add_executed_task.assert_called_once_with(timer)
+    assert timer_executor.reap_task.done()
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_redelivers_due_retries(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock)
+    timer = TimerTask(timer_id="123", url="http://test.com", expires_at=datetime.now(timezone.utc).isoformat())
+    timer_repo_mock.claim_due_timers.return_value = []
+    timer_repo_mock.claim_due_retries.side_effect = itertools.chain([[(timer, 2)]], itertools.repeat([]))
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.DELIVERED)
+
+    await timer_executor.start()
+    await asyncio.sleep(0.05)
+    await timer_executor.close()
+
+    timer_executor.execute_task.assert_called_once_with("http://test.com/", "123")
+    timer_repo_mock.add_executed_task.assert_called_once_with(timer)
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_reaps_expired_leases_in_batches(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, claim_batch_size=10)
+    timer_repo_mock.requeue_expired_leases.side_effect = [10, 10, 3]
+
+    assert await timer_executor.reap_expired_leases() == 23
+    assert timer_repo_mock.requeue_expired_leases.call_count == 3
+    assert timer_repo_mock.requeue_expired_leases.call_args.args[1] == 10
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_defers_callbacks_to_unhealthy_host(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, breaker_failure_threshold=2)
+    timers = [
+        TimerTask(timer_id=str(i), url=url, expires_at=datetime.now(timezone.utc).isoformat())
+        for i, url in enumerate(["http://down.com", "http://down.com", "http://down.com", "http://up.com"])
+    ]
+
+    async def execute_task(url: str, timer_id: str) -> DeliveryResult:
+        return DeliveryResult.FAILED if "down" in url else DeliveryResult.DELIVERED
+
+    timer_executor.execute_task = AsyncMock(side_effect=execute_task)
+    for timer in timers:
+        await timer_executor.dispatch(timer)
+
+    assert [call.args[1] for call in timer_executor.execute_task.call_args_list] == ["0", "1", "3"]
+    # The third callback was never sent, so it is deferred without counting an attempt.
+    assert [call.args[:2] for call in timer_repo_mock.add_retry.call_args_list] == [
+        (timers[0], 1),
+        (timers[1], 1),
+        (timers[2], 0),
+    ]
+    timer_repo_mock.add_executed_task.assert_called_once_with(timers[3])
+    assert list(timer_executor.host_limiters) == ["down.com"]
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_dead_letters_callbacks_deferred_for_too_long(timer_repo_mock):
+    timer_executor = TimerExecutor(timer_repository=timer_repo_mock, breaker_failure_threshold=1, defer_max_seconds=60)
+    now = datetime.now(timezone.utc)
+    failing, recent, old = (
+        TimerTask(timer_id=str(i), url="http://down.com", expires_at=expires_at)
+        for i, expires_at in enumerate([now, now - timedelta(seconds=30), now - timedelta(minutes=2)])
+    )
+    timer_executor.execute_task = AsyncMock(return_value=DeliveryResult.FAILED)
+
+    for timer in (failing, recent, old):
+        await timer_executor.dispatch(timer, attempts=2)
+
+    assert [call.args[:2] for call in timer_repo_mock.add_retry.call_args_list] == [(failing, 3), (recent, 2)]
+    timer_repo_mock.add_dead_letter.assert_called_once_with(old, 2)
+
+
+@pytest.mark.asyncio
+async def test_timer_executor_http_pool(timer_repo_mock):
+    timer_executor = TimerExecutor(
+        timer_repository=timer_repo_mock,
+        http_max_connections=50,
+        http_max_connections_per_host=5,
+        http_keepalive_seconds=30,
+    )
+    assert timer_executor.http_pool_stats() is None
+    timer_repo_mock.claim_due_timers.return_value = []
+
+    await timer_executor.start()
+
+    assert timer_executor.http_session.connector.limit == 50
+    assert timer_executor.http_session.connector.limit_per_host == 5
+    assert timer_executor.http_pool_stats() == {
+        "max_connections": 50,
+        "max_connections_per_host": 5,
+        "in_use": 0,
+        "idle": 0,
+        "waiting": 0,
+        "dispatches": 0,
+        "retry_dispatches": 0,
+    }
+    await timer_executor.close()
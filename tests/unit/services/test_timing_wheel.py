@@ -0,0 +1,92 @@
+import random
+
+from app.services.timing_wheel import HierarchicalTimingWheel
+
+
+def test_pop_due_returns_expired_keys_in_deadline_order():
+    wheel = HierarchicalTimingWheel(start=1000.0)
+    wheel.add("late", 1000.5)
+    wheel.add("early", 1000.2)
+    wheel.add("future", 1100.0)
+
+    assert wheel.pop_due(1000.1, limit=10) == []
+    assert wheel.pop_due(1001.0, limit=10) == ["early", "late"]
+    assert len(wheel) == 1
+    assert "future" in wheel
+
+
+def test_pop_due_respects_limit():
+    wheel = HierarchicalTimingWheel(start=0.0)
+    for index in range(5):
+        wheel.add(str(index), 1.0 + index)
+
+    assert wheel.pop_due(10.0, limit=2) == ["0", "1"]
+    assert wheel.pop_due(10.0, limit=10) == ["2", "3", "4"]
+
+
+def test_pop_due_between():
+    wheel = HierarchicalTimingWheel(start=0.0)
+    for index in range(5):
+        wheel.add(str(index), 1.0 + index)
+
+    assert wheel.pop_due(10.0, limit=10, after=2.0) == ["2", "3", "4"]
+    assert wheel.pop_due(10.0, limit=10, until=1.0) == ["0"]
+    assert wheel.pop_due(10.0, limit=10) == ["1"]
+
+
+def test_remove_and_re_add():
+    wheel = HierarchicalTimingWheel(start=0.0)
+    wheel.add("1", 5.0)
+
+    assert wheel.remove("1")
+    assert not wheel.remove("1")
+    assert wheel.next_deadline() is None
+
+    wheel.add("1", 5.0)
+    wheel.add("1", 2.0)
+    assert len(wheel) == 1
+    assert wheel.pop_due(3.0, limit=10) == ["1"]
+
+
+def test_next_deadline_is_a_lower_bound():
+    wheel = HierarchicalTimingWheel(start=0.0)
+    wheel.add("1", 100.0)
+
+    next_deadline = wheel.next_deadline()
+    assert next_deadline is not None and 0.0 < next_deadline <= 100.0
+
+    # Waking up at the bucket start cascades the timer down until the bound is exact.
+    while wheel.next_deadline() != 100.0:
+        assert wheel.pop_due(wheel.next_deadline(), limit=10) == []
+    assert wheel.pop_due(100.0, limit=10) == ["1"]
+
+
+def test_deadlines_beyond_the_top_level_wrap_around():
+    wheel = HierarchicalTimingWheel(start=0.0, tick_seconds=1.0, wheel_size=4, levels=2)
+    wheel.add("1", 50.0)
+
+    assert wheel.pop_due(49.0, limit=10) == []
+    assert wheel.pop_due(50.0, limit=10) == ["1"]
+
+
+def test_matches_reference_model():
+    random.seed(7)
+    wheel = HierarchicalTimingWheel(start=0.0, wheel_size=8, levels=3)
+    deadlines: dict[str, float] = {}
+    now = 0.0
+    for _ in range(2000):
+        timer_id = str(random.randrange(50))
+        action = random.random()
+        if action < 0.5:
+            deadlines[timer_id] = now + random.choice([0.001, 0.1, 10.0, 1000.0]) * random.random()
+            wheel.add(timer_id, deadlines[timer_id])
+        elif action < 0.6:
+            assert wheel.remove(timer_id) == (timer_id in deadlines)
+            deadlines.pop(timer_id, None)
+        else:
+            now += random.choice([0.001, 0.1, 10.0, 1000.0])
+            popped = wheel.pop_due(now, limit=len(deadlines) + 1)
+            for timer_id in popped:
+                assert deadlines.pop(timer_id) <= now + wheel.tick_seconds
+            assert all(deadline > now - wheel.tick_seconds for deadline in deadlines.values())
+        assert len(wheel) == len(deadlines)
@@ -0,0 +1,28 @@
+from app.services.token_bucket import TokenBucket
+
+
+def test_take_is_limited_to_available_tokens():
+    bucket = TokenBucket(rate=10)
+
+    assert bucket.take(4) == 4
+    assert bucket.take(10) == 6
+    assert bucket.take(1) == 0
+    assert 0 < bucket.wait_seconds() <= 0.1
+
+
+def test_tokens_refill_up_to_capacity():
+    bucket = TokenBucket(rate=10)
+    bucket.take(10)
+
+    bucket.updated_at -= 0.5
+    assert bucket.take(10) == 5
+    bucket.updated_at -= 60
+    assert bucket.take(100) == 10
+
+
+def test_give_back():
+    bucket = TokenBucket(rate=10)
+    bucket.take(10)
+
+    bucket.give_back(3)
+    assert bucket.take(10) == 3
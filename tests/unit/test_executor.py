@@ -0,0 +1,44 @@
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from pytest_mock import MockFixture
+
+from app.dependencies.dependencies_resolver import DependenciesResolver
+from app.executor import create_app, run
+from app.models.settings import AppSettings
+
+
+@pytest.mark.asyncio
+async def test_executor_healthcheck_and_metrics(mocker: MockFixture):
+    timer_repository = mocker.patch.object(DependenciesResolver, "get_timer_repository").return_value
+    timer_repository.get_timer_counts = mocker.AsyncMock(return_value={"pending": 7})
+    timer_executor = mocker.patch.object(DependenciesResolver, "get_timer_executor").return_value
+    timer_executor.is_running.return_value = True
+
+    async with TestClient(TestServer(create_app())) as client:
+        response = await client.get("/healthcheck")
+        assert response.status == 200
+        assert await response.json() == {"message": "OK"}
+
+        response = await client.get("/metrics")
+        assert response.status == 200
+        assert 'timer_count{state="pending"} 7' in await response.text()
+
+
+@pytest.mark.asyncio
+async def test_executor_healthcheck_reports_stopped_executor(mocker: MockFixture):
+    timer_executor = mocker.patch.object(DependenciesResolver, "get_timer_executor").return_value
+    timer_executor.is_running.return_value = False
+
+    async with TestClient(TestServer(create_app())) as client:
+        response = await client.get("/healthcheck")
+        assert response.status == 503
+
+
+@pytest.mark.asyncio
+async def test_executor_refuses_in_memory_backend(mocker: MockFixture):
+    init_dependencies = mocker.patch.object(DependenciesResolver, "init_dependencies")
+    settings = AppSettings(timer_db_endpoint="cache", timer_db_port=6379, timer_backend="memory")
+
+    with pytest.raises(RuntimeError, match="in-memory"):
+        await run(settings)
+    init_dependencies.assert_not_called()
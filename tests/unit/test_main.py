@@ -1,8 +1,11 @@
 import pytest
 from fastapi.testclient import TestClient
+from pytest_mock import MockFixture
 
+from app.dependencies.dependencies_resolver import DependenciesResolver
 from app.main import app
 from app.models.settings import AppSettings
+from app.services.cached_timer_repository import TimerCache
 
 client = TestClient(app)
 
@@ -30,3 +33,33 @@ def test_healthcheck():
     response = client.get("/healthcheck")
     assert response.status_code == 200
     assert response.json() == {"message": "OK"}
+
+
+def test_stats(mocker: MockFixture):
+    timer_cache = TimerCache()
+    timer_cache.stats.hits = 3
+    timer_cache.stats.misses = 1
+    mocker.patch.object(DependenciesResolver, "get_timer_cache", return_value=timer_cache)
+    mocker.patch.object(DependenciesResolver, "get_redis_pool_stats", return_value={"api": {"in_use": 2}})
+    timer_executor = mocker.patch.object(DependenciesResolver, "get_timer_executor").return_value
+    timer_executor.http_pool_stats.return_value = {"in_use": 1}
+
+    response = client.get("/stats")
+
+    assert response.status_code == 200
+    assert response.json()["timer_cache"] == {"hits": 3, "misses": 1, "evictions": 0, "size": 0, "hit_rate": 0.75}
+    assert response.json()["redis_pools"] == {"api": {"in_use": 2}}
+    assert response.json()["http_pool"] == {"in_use": 1}
+
+
+def test_metrics(mocker: MockFixture):
+    timer_repository = mocker.patch.object(DependenciesResolver, "get_timer_repository").return_value
+    timer_repository.get_timer_counts = mocker.AsyncMock(return_value={"pending": 7, "due": 2})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'timer_count{state="pending"} 7' in response.text
+    assert 'timer_count{state="due"} 2' in response.text
+    assert "# TYPE timer_firing_lateness_seconds histogram" in response.text
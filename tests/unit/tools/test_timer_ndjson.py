@@ -0,0 +1,40 @@
+import io
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.models.timer import TimerTask
+from app.services.in_memory_timer_repository import InMemoryTimerRepository
+from app.tools.timer_ndjson import export_timers, import_timers
+
+
+def make_timer(timer_id: str) -> TimerTask:
+    return TimerTask(
+        timer_id=timer_id,
+        url="http://test.com",
+        expires_at=datetime.now(timezone.utc) + timedelta(minutes=5),
+    )
+
+
+@pytest.mark.asyncio
+async def test_export_and_import_round_trip():
+    timers = [make_timer(str(index)) for index in range(5)]
+
+    async def scan_timers(batch_size):
+        for start in range(0, len(timers), batch_size):
+            yield timers[start : start + batch_size]
+
+    source = MagicMock()
+    source.scan_timers = scan_timers
+    output = io.StringIO()
+
+    assert await export_timers(source, output, batch_size=2) == 5
+    assert len(output.getvalue().splitlines()) == 5
+
+    target = InMemoryTimerRepository()
+    lines = io.StringIO(output.getvalue() + "\n")
+    assert await import_timers(target, lines, batch_size=2) == 5
+    assert await target.lookup_timers([timer.timer_id for timer in timers]) == {
+        timer.timer_id: timer for timer in timers
+    }